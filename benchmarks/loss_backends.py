@@ -0,0 +1,196 @@
+import argparse
+import time
+import numpy as np
+from shapely import Polygon
+
+from optimizers.differential_evolution_optimizer import DifferentialEvolutionOptimizer
+from templates.slab_template import SlabTemplate
+from templates.t_girder_template import TGirderTemplate
+from templates.tapered_t_girder_template import TaperedTGirderTemplate
+from tools.parameter_extractor import ParameterExtractor
+
+
+# Parameter vectors at typical scan resolution (pixels), without the leading offsets
+TEMPLATE_SHAPES = {
+    "slab": (SlabTemplate, [120, 60, 250, 1400]),
+    "t_girder": (TGirderTemplate, [80, 60, 300, 700, 450]),
+    "tapered_t_girder": (TaperedTGirderTemplate, [80, 60, 300, 600, 300, 120]),
+}
+
+
+def make_reference_polygon(template_class, shape_params, rng: np.random.Generator, noise: float = 0.02):
+    """
+    Creates a synthetic reference polygon by perturbing the vertices of a template polygon,
+    mimicking the output of `PolygonSimplifier` on a SAM mask.
+
+    Args:
+        template_class: Template class providing `make_vertices_from_params`.
+        shape_params (Sequence[float]): Template parameters without the offsets.
+        rng (np.random.Generator): Random number generator.
+        noise (float): Vertex noise relative to the size of the polygon.
+
+    Returns:
+        Polygon: Perturbed reference polygon.
+    """
+    vertices = template_class.make_vertices_from_params([500, 400] + list(shape_params))
+    scale = np.ptp(vertices, axis=0).max()
+    vertices = vertices + rng.normal(scale=noise * scale, size=vertices.shape)
+
+    polygon = Polygon(vertices)
+    if not polygon.is_valid:
+        polygon = polygon.buffer(0)
+
+    return polygon
+
+
+def sample_candidates(template, reference_polygon: Polygon, n_candidates: int, rng: np.random.Generator):
+    """
+    Samples candidate parameter vectors uniformly within the optimizer's search bounds.
+
+    Args:
+        template: Template instance used for the initial estimate and the bounds.
+        reference_polygon (Polygon): Reference polygon.
+        n_candidates (int): Number of parameter vectors to sample.
+        rng (np.random.Generator): Random number generator.
+
+    Returns:
+        np.ndarray: Candidate parameter vectors of shape (n_candidates, P).
+    """
+    initial_parameters = template.estimate_initial_parameters_simple(reference_polygon)
+    bounds = np.array(template.create_bounds(initial_parameters))
+
+    return rng.uniform(bounds[:, 0], bounds[:, 1], size=(n_candidates, len(bounds)))
+
+
+def overlay_ciou_loss(extractor: ParameterExtractor, params, template):
+    """
+    Evaluates the CIoU loss with separate shapely overlays per term, as a baseline for the backends.
+
+    Returns:
+        float: Combined geometric loss value.
+    """
+    candidate_polygon = template.make_polygon_from_params(params)
+    reference_polygon = extractor.reference_polygon
+
+    overlap_loss = extractor.iou_loss(reference_polygon, candidate_polygon)
+    centroid_loss = extractor.centroid_alignment_loss(reference_polygon, candidate_polygon)
+    aspect_loss = extractor.aspect_ratio_loss(reference_polygon, candidate_polygon)
+
+    return extractor.w_overlap*overlap_loss + extractor.w_distance*centroid_loss + extractor.w_aspect_ratio*aspect_loss
+
+
+def compare_losses(extractor: ParameterExtractor, template, reference_polygon: Polygon, candidates: np.ndarray):
+    """
+    Evaluates the overlay baseline and the configured loss backend for the same candidates,
+    once per parameter vector and once as a batch.
+
+    Returns:
+        tuple: Baseline, backend and batched backend losses, followed by the mean evaluation
+            time per candidate of each in seconds.
+    """
+    extractor.set_reference(reference_polygon, template)
+
+    start = time.perf_counter()
+    baseline_losses = np.array([overlay_ciou_loss(extractor, params, template) for params in candidates])
+    baseline_time = (time.perf_counter() - start) / len(candidates)
+
+    start = time.perf_counter()
+    backend_losses = np.array([extractor.ciou_loss(params, template) for params in candidates])
+    backend_time = (time.perf_counter() - start) / len(candidates)
+
+    start = time.perf_counter()
+    batch_losses = extractor.ciou_loss_batch(candidates, template)
+    batch_time = (time.perf_counter() - start) / len(candidates)
+
+    return baseline_losses, backend_losses, batch_losses, baseline_time, backend_time, batch_time
+
+
+def compare_fits(template, reference_polygon: Polygon, resolution: int, maxiter: int, seed: int):
+    """
+    Runs the full optimization with every backend and scores each result with the exact IoU,
+    next to the IoU that the backend itself estimates for its result. All backends use
+    differential evolution, since the "raster" backend requires a batched optimizer.
+
+    Returns:
+        dict: Exact IoU, estimated IoU and run time per backend.
+    """
+    results = {}
+    for backend in ParameterExtractor.LOSS_BACKENDS:
+        extractor = ParameterExtractor(1.0, 1.0, 1.0, loss_backend=backend, raster_resolution=resolution,
+                                       optimizer=DifferentialEvolutionOptimizer())
+
+        start = time.perf_counter()
+        parameters = extractor.optimize(template, reference_polygon, maxiter=maxiter, seed=seed)
+        elapsed = time.perf_counter() - start
+
+        fitted_polygon = template.make_polygon_from_params(parameters)
+        iou = 1 - extractor.iou_loss(reference_polygon, fitted_polygon)
+
+        intersection = extractor.overlap.intersection_area(template.make_vertices_from_params(parameters))
+        estimated_iou = intersection / (extractor.overlap.area + fitted_polygon.area - intersection)
+        results[backend] = (iou, estimated_iou, elapsed)
+
+    return results
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare the accuracy and speed of the loss backends against separate shapely overlays.")
+    parser.add_argument("--references", type=int, default=5, help="Synthetic reference polygons per template (default: 5).")
+    parser.add_argument("--candidates", type=int, default=500, help="Random candidates per reference polygon (default: 500).")
+    parser.add_argument("--resolution", type=int, default=256, help="Raster resolution (default: 256).")
+    parser.add_argument("--raster-resolutions", type=int, nargs="*", default=[32, 64, 128, 512],
+                        help="Further raster resolutions for the accuracy versus speed rows (default: 32 64 128 512).")
+    parser.add_argument("--fit", action="store_true", help="Also compare full optimization runs (slow).")
+    parser.add_argument("--maxiter", type=int, default=100, help="Generations of differential evolution for --fit (default: 100).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    extractors = {
+        backend: ParameterExtractor(1.0, 1.0, 1.0, loss_backend=backend, raster_resolution=args.resolution,
+                                    optimizer=DifferentialEvolutionOptimizer())
+        for backend in ParameterExtractor.LOSS_BACKENDS
+    }
+    for resolution in sorted(set(args.raster_resolutions) - {args.resolution}):
+        extractors[f"raster@{resolution}"] = ParameterExtractor(
+            1.0, 1.0, 1.0, loss_backend="raster", raster_resolution=resolution, optimizer=DifferentialEvolutionOptimizer())
+
+    print(
+        f"{'template':<18}{'backend':<12}{'mean |err|':>12}{'p99 |err|':>12}{'max |err|':>12}{'batch |err|':>12}"
+        f"{'overlays':>12}{'backend':>12}{'batch':>12}{'speedup':>10}"
+    )
+    for name, (template_class, shape_params) in TEMPLATE_SHAPES.items():
+        template = template_class()
+        references = [make_reference_polygon(template_class, shape_params, rng) for _ in range(args.references)]
+        candidates = [sample_candidates(template, reference, args.candidates, rng) for reference in references]
+
+        for backend, extractor in extractors.items():
+            errors, batch_errors, times = [], [], []
+
+            for reference_polygon, reference_candidates in zip(references, candidates):
+                baseline_losses, backend_losses, batch_losses, *reference_times = compare_losses(
+                    extractor, template, reference_polygon, reference_candidates)
+
+                errors.append(np.abs(baseline_losses - backend_losses))
+                batch_errors.append(np.abs(backend_losses - batch_losses))
+                times.append(reference_times)
+
+            errors = np.concatenate(errors)
+            batch_errors = np.concatenate(batch_errors)
+            baseline_time, backend_time, batch_time = np.mean(times, axis=0)
+
+            print(
+                f"{name:<18}{backend:<12}{errors.mean():>12.2e}{np.percentile(errors, 99):>12.2e}{errors.max():>12.2e}"
+                f"{batch_errors.max():>12.2e}{baseline_time * 1e6:>10.1f}us{backend_time * 1e6:>10.1f}us"
+                f"{batch_time * 1e6:>10.1f}us{baseline_time / batch_time:>9.1f}x"
+            )
+
+        if args.fit:
+            fits = compare_fits(template, references[-1], args.resolution, args.maxiter, args.seed)
+            exact_iou = fits["shapely"][0]
+            for backend, (iou, estimated_iou, elapsed) in fits.items():
+                print(
+                    f"    fit [{backend:<8}] exact IoU = {iou:.4f} ({iou - exact_iou:+.4f} vs shapely), "
+                    f"estimated IoU = {float(estimated_iou):.4f} in {elapsed:.2f}s"
+                )
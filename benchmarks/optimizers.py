@@ -0,0 +1,76 @@
+import argparse
+import time
+import numpy as np
+
+from benchmarks.loss_backends import TEMPLATE_SHAPES, make_reference_polygon
+from optimizers.cma_es_optimizer import CMAESOptimizer
+from optimizers.differential_evolution_optimizer import DifferentialEvolutionOptimizer
+from optimizers.dual_annealing_optimizer import DualAnnealingOptimizer
+from tools.parameter_extractor import ParameterExtractor
+
+
+def make_optimizers(args, seed: int):
+    """
+    Creates one instance of every optimizer strategy with the benchmark settings, and the
+    two-phase mode of a short dual annealing search followed by L-BFGS-B refinement.
+
+    Returns:
+        dict: Tuples (optimizer instance, refine) keyed by their name.
+    """
+    return {
+        "dual_annealing": (DualAnnealingOptimizer(maxiter=args.maxiter, seed=seed), False),
+        "differential_evolution": (DifferentialEvolutionOptimizer(maxiter=args.max_generations, popsize=args.popsize, seed=seed), False),
+        "cma_es": (CMAESOptimizer(maxiter=args.max_generations, popsize=args.popsize * 2, seed=seed), False),
+        "dual_annealing+refine": (DualAnnealingOptimizer(maxiter=args.two_phase_maxiter, seed=seed), True),
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare wall-clock time and final IoU of the optimizer strategies.")
+    parser.add_argument("--references", type=int, default=5, help="Synthetic reference polygons per template (default: 5).")
+    parser.add_argument("--loss-backend", default="shapely", choices=ParameterExtractor.LOSS_BACKENDS, help="Loss backend (default: shapely).")
+    parser.add_argument("--maxiter", type=int, default=1000, help="Dual annealing iterations (default: 1000).")
+    parser.add_argument("--max-generations", type=int, default=200, help="Generations of the population-based strategies (default: 200).")
+    parser.add_argument("--popsize", type=int, default=15, help="Population size setting (default: 15).")
+    parser.add_argument("--two-phase-maxiter", type=int, default=50, help="Dual annealing iterations before the L-BFGS-B refinement (default: 50).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'template':<18}{'optimizer':<24}{'time [s]':>10}{'mean IoU':>10}{'min IoU':>10}{'evals':>10}")
+
+    for name, (template_class, shape_params) in TEMPLATE_SHAPES.items():
+        template = template_class()
+        references = [make_reference_polygon(template_class, shape_params, rng) for _ in range(args.references)]
+        results = {}
+
+        for index, reference_polygon in enumerate(references):
+            for optimizer_name, (optimizer, refine) in make_optimizers(args, args.seed + index).items():
+                extractor = ParameterExtractor(1.0, 1.0, 1.0, loss_backend=args.loss_backend, optimizer=optimizer, refine=refine)
+
+                # Count loss evaluations by wrapping all loss entry points
+                evaluations = [0]
+                ciou_loss, ciou_loss_batch, smooth_loss = extractor.ciou_loss, extractor.ciou_loss_batch, extractor.smooth_loss
+                def counted_loss(params, template, ciou_loss=ciou_loss, evaluations=evaluations):
+                    evaluations[0] += 1
+                    return ciou_loss(params, template)
+                def counted_loss_batch(params_matrix, template, ciou_loss_batch=ciou_loss_batch, evaluations=evaluations):
+                    evaluations[0] += len(np.atleast_2d(params_matrix))
+                    return ciou_loss_batch(params_matrix, template)
+                def counted_smooth_loss(params, template, smooth_loss=smooth_loss, evaluations=evaluations):
+                    evaluations[0] += 1
+                    return smooth_loss(params, template)
+                extractor.ciou_loss, extractor.ciou_loss_batch, extractor.smooth_loss = counted_loss, counted_loss_batch, counted_smooth_loss
+
+                start = time.perf_counter()
+                parameters = extractor.optimize(template, reference_polygon)
+                elapsed = time.perf_counter() - start
+
+                iou = 1 - extractor.iou_loss(reference_polygon, template.make_polygon_from_params(parameters))
+                results.setdefault(optimizer_name, []).append((elapsed, iou, evaluations[0]))
+
+        for optimizer_name, runs in results.items():
+            elapsed, iou, evaluations = np.array(runs).T
+            print(f"{name:<18}{optimizer_name:<24}{elapsed.mean():>10.2f}{iou.mean():>10.4f}{iou.min():>10.4f}{evaluations.mean():>10.0f}")
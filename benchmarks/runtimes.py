@@ -0,0 +1,155 @@
+import argparse
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+import yaml
+
+from tools.cross_section_detector import CrossSectionDetector
+from tools.mask_generator import MaskGenerator
+from tools.onnx_mask_generator import OnnxMaskGenerator
+from utils import geometry_utils
+
+
+def detect(detector: CrossSectionDetector, image: np.ndarray, config: dict):
+    """
+    Detects the cross-sections of an image and measures the latency.
+
+    Returns:
+        tuple: Boxes of shape (N, 4) as [x0, y0, x1, y1], classes of shape (N,) and the latency in seconds.
+    """
+    start = time.perf_counter()
+    result = detector.predict(
+        source=image,
+        conf=config["CrossSectionDetector"]["conf"],
+        iou=config["CrossSectionDetector"]["iou"],
+        imgsz=config["CrossSectionDetector"]["imgsz"],
+        device="cpu",
+        verbose=False
+    )[0]
+    elapsed = time.perf_counter() - start
+
+    return result.boxes.xyxy.cpu().numpy().reshape(-1, 4), result.boxes.cls.cpu().numpy().astype(int), elapsed
+
+
+def segment(mask_generator: MaskGenerator, image: np.ndarray, boxes: np.ndarray):
+    """
+    Embeds an image, predicts the masks of the boxes and measures the latency of both steps.
+
+    Returns:
+        tuple: Masks of shape (N, H, W), encoder latency and decoder latency in seconds.
+    """
+    start = time.perf_counter()
+    mask_generator.set_image(image)
+    encoded = time.perf_counter()
+    masks, _, _ = mask_generator.predict_boxes(boxes)
+    decoded = time.perf_counter()
+
+    return masks[:, 0], encoded - start, decoded - encoded
+
+
+def match_boxes(reference_boxes: np.ndarray, reference_classes: np.ndarray, boxes: np.ndarray, classes: np.ndarray):
+    """
+    Matches every reference box to the box of the same class with the highest IoU.
+
+    Returns:
+        np.ndarray: IoU of the best match per reference box, 0 without a match.
+    """
+    if len(reference_boxes) == 0 or len(boxes) == 0:
+        return np.zeros(len(reference_boxes))
+
+    intersection = geometry_utils.box_intersection_areas(reference_boxes, boxes)
+    area = lambda b: (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    iou = intersection / np.maximum(area(reference_boxes)[:, None] + area(boxes)[None, :] - intersection, 1e-9)
+    iou[reference_classes[:, None] != classes[None, :]] = 0.0
+
+    return iou.max(axis=1)
+
+
+def mask_iou(masks_a: np.ndarray, masks_b: np.ndarray):
+    """
+    Computes the IoU of pairs of binary masks.
+
+    Returns:
+        np.ndarray: IoU per pair of masks.
+    """
+    intersection = np.logical_and(masks_a, masks_b).sum(axis=(1, 2))
+    union = np.logical_or(masks_a, masks_b).sum(axis=(1, 2))
+
+    return intersection / np.maximum(union, 1)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare latency and box/mask agreement of the exported models with the PyTorch models on CPU.")
+    parser.add_argument("-i", "--input", type=Path, required=True, help="Path to a PNG image or a folder containing PNG images.")
+    parser.add_argument("-c", "--config", type=Path, default=Path("default.yaml"), help="Configuration file with the PyTorch model paths (default: default.yaml).")
+    parser.add_argument("--detector", type=str, default=None, help="Exported detector (.onnx or .torchscript); detection is not compared if unset.")
+    parser.add_argument("--encoder", type=str, default=None, help="ONNX export of the SAM image encoder; segmentation is not compared if unset.")
+    parser.add_argument("--decoder", type=str, default=None, help="ONNX export of the SAM prompt encoder and mask decoder.")
+    parser.add_argument("--warmup", type=int, default=1, help="Images processed before the latency is measured (default: 1).")
+    args = parser.parse_args()
+
+    with open(str(args.config), 'r') as config_file:
+        config = yaml.safe_load(config_file)
+
+    image_paths = [args.input] if args.input.is_file() else sorted(f for f in args.input.iterdir() if f.suffix.lower() == ".png")
+    images = [cv2.imread(str(image_path)) for image_path in image_paths]
+
+    torch_detector = CrossSectionDetector(weight_path=config["CrossSectionDetector"]["model"])
+    export_detector = CrossSectionDetector(weight_path=args.detector) if args.detector else None
+
+    torch_mask_generator = export_mask_generator = None
+    if args.encoder:
+        torch_mask_generator = MaskGenerator(
+            sam_chkpt=config["MaskGenerator"]["sam_chkpt"],
+            model_type=config["MaskGenerator"]["model_type"],
+            device="cpu"
+        )
+        export_mask_generator = OnnxMaskGenerator(encoder_path=args.encoder, decoder_path=args.decoder)
+
+    latencies = {}
+    box_ious, box_counts, mask_ious = [], [], []
+
+    for index, image in enumerate(images):
+        measured = index >= args.warmup or len(images) <= args.warmup
+        # SAM expects RGB images
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        boxes, classes, elapsed = detect(torch_detector, image, config)
+        run_latencies = {"detect torch": elapsed}
+
+        if export_detector is not None:
+            export_boxes, export_classes, elapsed = detect(export_detector, image, config)
+            run_latencies["detect export"] = elapsed
+            box_ious.extend(match_boxes(boxes, classes, export_boxes, export_classes))
+            box_counts.append((len(boxes), len(export_boxes)))
+
+        if torch_mask_generator is not None:
+            masks, encode_time, decode_time = segment(torch_mask_generator, image_rgb, boxes)
+            run_latencies.update({"encode torch": encode_time, "decode torch": decode_time})
+
+            export_masks, encode_time, decode_time = segment(export_mask_generator, image_rgb, boxes)
+            run_latencies.update({"encode onnx": encode_time, "decode onnx": decode_time})
+            mask_ious.extend(mask_iou(masks, export_masks))
+
+        if measured:
+            for name, elapsed in run_latencies.items():
+                latencies.setdefault(name, []).append(elapsed)
+
+    print(f"{'step':<16}{'mean [ms]':>12}{'median [ms]':>14}")
+    for name, values in latencies.items():
+        print(f"{name:<16}{1000 * np.mean(values):>12.1f}{1000 * np.median(values):>14.1f}")
+
+    if box_counts:
+        counts = np.array(box_counts)
+        box_ious = np.array(box_ious)
+        print(f"\nboxes torch/export: {counts[:, 0].sum()}/{counts[:, 1].sum()}, "
+              f"matched IoU mean {box_ious.mean() if len(box_ious) else float('nan'):.4f}, "
+              f"min {box_ious.min() if len(box_ious) else float('nan'):.4f}, "
+              f"recall@0.5 {(box_ious >= 0.5).mean() if len(box_ious) else float('nan'):.4f}")
+
+    if torch_mask_generator is not None:
+        mask_ious = np.array(mask_ious)
+        print(f"\nmask IoU torch/onnx: mean {mask_ious.mean() if len(mask_ious) else float('nan'):.4f}, "
+              f"min {mask_ious.min() if len(mask_ious) else float('nan'):.4f} over {len(mask_ious)} boxes")
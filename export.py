@@ -0,0 +1,169 @@
+import argparse
+from pathlib import Path
+import yaml
+
+
+def export_detector(weight_path: str, output_dir: Path, export_format: str = "onnx", imgsz: int = 1024, int8: bool = False):
+    """
+    Exports the YOLO detector to ONNX or TorchScript. The export is written next to the weights
+    by ultralytics and moved to the output directory.
+
+    Args:
+        weight_path (str): Path to the YOLO model weights.
+        output_dir (Path): Directory of the exported model.
+        export_format (str): "onnx" or "torchscript".
+        imgsz (int): Input image size of the export.
+        int8 (bool): If True, additionally writes an ONNX model with dynamically quantized INT8 weights.
+
+    Returns:
+        list: Paths of the exported models.
+    """
+    from ultralytics import YOLO
+
+    # Dynamic input shapes allow batches of images and the tile size of tiled detection
+    exported_path = Path(YOLO(weight_path).export(format=export_format, imgsz=imgsz, dynamic=export_format == "onnx"))
+    output_path = exported_path.replace(output_dir / exported_path.name)
+    paths = [output_path]
+
+    if int8:
+        if export_format != "onnx":
+            raise ValueError("INT8 quantization requires the ONNX format.")
+        paths.append(quantize_onnx(output_path))
+
+    return paths
+
+
+def export_sam(sam_chkpt: str, model_type: str, output_dir: Path, opset: int = 17, int8: bool = False):
+    """
+    Exports SAM to ONNX as two models, the image encoder and the prompt encoder with mask decoder,
+    for `OnnxMaskGenerator`.
+
+    The encoder takes the normalized and padded image of shape (1, 3, 1024, 1024). The decoder
+    follows the export of the SAM repository, but returns the single-mask output together with
+    the multimask outputs, so that both modes of `predict` are available.
+
+    Args:
+        sam_chkpt (str): Path to the SAM model checkpoint file.
+        model_type (str): Variant of the SAM model ('vit_h', 'vit_l', or 'vit_b').
+        output_dir (Path): Directory of the exported models.
+        opset (int): ONNX opset version.
+        int8 (bool): If True, additionally writes models with dynamically quantized INT8 weights.
+
+    Returns:
+        list: Paths of the exported models.
+    """
+    import torch
+    from segment_anything import sam_model_registry
+    from segment_anything.utils.onnx import SamOnnxModel
+
+    sam = sam_model_registry[model_type](checkpoint=sam_chkpt)
+    sam.eval()
+
+    encoder_path = output_dir / f"sam_{model_type}_encoder.onnx"
+    decoder_path = output_dir / f"sam_{model_type}_decoder.onnx"
+
+    image_size = sam.image_encoder.img_size
+    with torch.no_grad():
+        # Checkpoints above 2 GB are written with external data files
+        torch.onnx.export(
+            sam.image_encoder,
+            torch.randn(1, 3, image_size, image_size, dtype=torch.float),
+            str(encoder_path),
+            opset_version=opset,
+            do_constant_folding=True,
+            input_names=["image"],
+            output_names=["image_embeddings"],
+        )
+
+        embed_dim = sam.prompt_encoder.embed_dim
+        embed_size = sam.prompt_encoder.image_embedding_size
+        dummy_inputs = {
+            "image_embeddings": torch.randn(1, embed_dim, *embed_size, dtype=torch.float),
+            "point_coords": torch.randint(low=0, high=image_size, size=(1, 5, 2), dtype=torch.float),
+            "point_labels": torch.randint(low=0, high=4, size=(1, 5), dtype=torch.float),
+            "mask_input": torch.randn(1, 1, *[4 * x for x in embed_size], dtype=torch.float),
+            "has_mask_input": torch.tensor([1], dtype=torch.float),
+            "orig_im_size": torch.tensor([1500, 2250], dtype=torch.float),
+        }
+        torch.onnx.export(
+            SamOnnxModel(model=sam, return_single_mask=False),
+            tuple(dummy_inputs.values()),
+            str(decoder_path),
+            opset_version=opset,
+            do_constant_folding=True,
+            input_names=list(dummy_inputs.keys()),
+            output_names=["masks", "iou_predictions", "low_res_masks"],
+            dynamic_axes={"point_coords": {1: "num_points"}, "point_labels": {1: "num_points"}},
+        )
+
+    paths = [encoder_path, decoder_path]
+    if int8:
+        paths += [quantize_onnx(encoder_path), quantize_onnx(decoder_path)]
+
+    return paths
+
+
+def quantize_onnx(model_path: Path):
+    """
+    Writes a copy of an ONNX model with dynamically quantized INT8 weights. Activations are
+    quantized at runtime, so no calibration data is needed.
+
+    Args:
+        model_path (Path): Path to the ONNX model.
+
+    Returns:
+        Path: Path of the quantized model, with the suffix '_int8'.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = model_path.with_name(f"{model_path.stem}_int8{model_path.suffix}")
+    quantize_dynamic(model_input=str(model_path), model_output=str(quantized_path), weight_type=QuantType.QUInt8)
+
+    return quantized_path
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Export the detector and SAM for CPU inference with onnxruntime or TorchScript.")
+    parser.add_argument("-o", "--output", type=Path, required=True,
+                        help="Path to the output directory.")
+    parser.add_argument("-c", "--config", type=Path, default=Path("default.yaml"),
+                        help="Optional path to a configuration file with the model paths (default: default.yaml).")
+    parser.add_argument("--format", default="onnx", choices=["onnx", "torchscript"],
+                        help="Export format of the detector; SAM is always exported to ONNX (default: onnx).")
+    parser.add_argument("--int8", action="store_true",
+                        help="Additionally write ONNX models with dynamically quantized INT8 weights (default: False).")
+    parser.add_argument("--skip-detector", action="store_true",
+                        help="Do not export the detector (default: False).")
+    parser.add_argument("--skip-sam", action="store_true",
+                        help="Do not export SAM (default: False).")
+    parser.add_argument("--opset", type=int, default=17,
+                        help="ONNX opset version of the SAM export (default: 17).")
+    args = parser.parse_args()
+
+    with open(str(args.config), 'r') as config_file:
+        config = yaml.safe_load(config_file)
+
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    exported_paths = []
+    if not args.skip_detector:
+        exported_paths += export_detector(
+            weight_path=config["CrossSectionDetector"]["model"],
+            output_dir=args.output,
+            export_format=args.format,
+            imgsz=config["CrossSectionDetector"]["imgsz"],
+            int8=args.int8
+        )
+    if not args.skip_sam:
+        exported_paths += export_sam(
+            sam_chkpt=config["MaskGenerator"]["sam_chkpt"],
+            model_type=config["MaskGenerator"]["model_type"],
+            output_dir=args.output,
+            opset=args.opset,
+            int8=args.int8
+        )
+
+    # The detector export replaces 'CrossSectionDetector.model', the SAM exports are set as 'MaskGenerator.onnx_encoder' and 'onnx_decoder'
+    for path in exported_paths:
+        print(path)
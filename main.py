@@ -1,18 +1,16 @@
+import time
+STARTUP_TIME = time.perf_counter()
+
 import yaml
 import argparse
-import csv
 
-from tools.cross_section_detector import CrossSectionDetector
-from tools.mask_generator import MaskGenerator
-from tools.polygon_simplifier import PolygonSimplifier
-from tools.parameter_extractor import ParameterExtractor
+# Model and geometry dependencies are imported on first use, see CrossSectionReconstructor
+from tools.result_writer import ResultWriter
+from tools.run_manifest import RunManifest
+from tools.startup_profiler import StartupProfiler
 
 from pathlib import Path
-import cv2
 from tqdm import tqdm
-import numpy as np
-
-from utils import drawing_utils, general_utils
 
 if __name__ == "__main__":
     
@@ -28,6 +26,15 @@ if __name__ == "__main__":
                         help="Draw and save intermediate results (default: False).")
     parser.add_argument("--save-coco", action="store_true",
                         help="Save detections and segmentations in COCO format (default: False).")
+    parser.add_argument("--pipeline-stats", action="store_true",
+                        help="Print queue depths and throughput of the pipeline stages after the run (default: False).")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print the import and model load times of the run (default: False).")
+    parser.add_argument("--server", type=str, default=None,
+                        help="Address of a running reconstruction service (see server.py) to process the images, "
+                             "e.g. http://127.0.0.1:8765 or unix:/tmp/crosssectai.sock (default: 'Server.address' of the configuration).")
+    parser.add_argument("--force", action="store_true",
+                        help="Process all images, including those that are complete in the run manifest of the output directory (default: False).")
 
 
     args = parser.parse_args()
@@ -39,6 +46,12 @@ if __name__ == "__main__":
 
     DRAW_RESULTS = args.draw_results
     SAVE_COCO = args.save_coco
+    PIPELINE_STATS = args.pipeline_stats
+    PROFILE_STARTUP = args.profile_startup
+    FORCE = args.force
+
+    profiler = StartupProfiler(start_time=STARTUP_TIME)
+    profiler.add("import core modules", STARTUP_TIME, time.perf_counter())
     
 
     if input_path.is_file():
@@ -47,295 +60,91 @@ if __name__ == "__main__":
         else:
             raise ValueError(f"The provided file is not a PNG image: {input_path}")
     elif input_path.is_dir():
-        image_paths = [f for f in input_path.iterdir() if input_path.suffix.lower() == ".png"]
+        image_paths = sorted(f for f in input_path.iterdir() if f.suffix.lower() == ".png")
     else:
         raise FileNotFoundError(f"The provided path does not exist: {input_path}")
     
 
-    if not output_dir.exists():
-        output_dir.mkdir(parents=True, exist_ok=True)
+    with profiler.measure("load config"):
+        with open(str(config_file), 'r') as config_file:
+            config = yaml.safe_load(config_file)
 
 
-    if DRAW_RESULTS:
-        result_image_folder = Path.joinpath(output_dir, "Results")
-        result_image_folder.mkdir(parents=True, exist_ok=True)
-        
+    # Skip the drawings that an earlier run into the output directory completed with the same image and configuration
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = RunManifest(output_dir)
+    config_hash = RunManifest.hash_config(config)
+    content_hashes = {img_path.name: RunManifest.hash_file(img_path) for img_path in image_paths}
+    input_files = [img_path.name for img_path in image_paths]
 
+    pending_paths = [
+        img_path for img_path in image_paths
+        if FORCE or not manifest.is_complete(img_path.name, content_hashes[img_path.name], config_hash, SAVE_COCO, DRAW_RESULTS)
+    ]
+    if len(pending_paths) < len(image_paths):
+        print(f"Skipping {len(image_paths) - len(pending_paths)} of {len(image_paths)} images that are complete in {manifest.path}")
+        image_paths = pending_paths
 
-    with open(str(config_file), 'r') as config_file:
-        config = yaml.safe_load(config_file)
- 
-    
+    manifest.start([(img_path.name, content_hashes[img_path.name]) for img_path in image_paths], config_hash)
 
-    # Init components
-    cross_section_detector = CrossSectionDetector(
-        weight_path=config["CrossSectionDetector"]["model"]
-    )
+    result_writer = ResultWriter(output_dir, save_coco=SAVE_COCO, draw_results=DRAW_RESULTS, manifest=manifest, input_files=input_files)
 
-    mask_generator = MaskGenerator(
-        sam_chkpt=config["MaskGenerator"]["sam_chkpt"],
-        model_type=config["MaskGenerator"]["model_type"],
-        device=config["MaskGenerator"]["device"]
-    )
+    server_address = args.server or config["Server"]["address"]
 
-    polygon_simplifier = PolygonSimplifier(
-        factor_arclength = config["PolygonSimplifier"]["factor_arclength"],
-        approx_method = cv2.CHAIN_APPROX_NONE
-    )
 
-    parameter_extractor = ParameterExtractor(
-        weight_overlap = config["ParameterOptimizer"]["weight_overlap"],
-        weight_distance = config["ParameterOptimizer"]["weight_distance"],
-        weight_aspect_ratio = config["ParameterOptimizer"]["weight_aspect_ratio"]
-    )
+    if server_address:
+        # The service keeps the models loaded; its configuration applies to the reconstruction
+        from tools.reconstruction_service import ReconstructionClient
 
+        client = ReconstructionClient(server_address)
+        image_results = client.reconstruct(image_paths, draw_results=DRAW_RESULTS, save_coco=SAVE_COCO)
 
-    
+        first_result = True
+        for image_result in tqdm(image_results, total=len(image_paths)):
+            if first_result:
+                profiler.mark("first result")
+                first_result = False
 
-    
-  
+            result_writer.write(image_result)
 
-    
-    if SAVE_COCO:
-        coco_results = general_utils.create_coco_result_file()
-        img_counter = 0
-        annotation_counter = 0
-        
-        
-    csv_header = [
-        "Bbox_x0",
-        "Bbox_y0",
-        "Bbox_x1",
-        "Bbox_y1",
-        "template_class_id",
-        "P1",
-        "P2",
-        "P3",
-        "P4",
-        "P5",
-        "P6",
-        "P7",
-        "P8"
-    ]
-    
-    
-    allplan_script_written = False
-        
-    
-    for img_path in tqdm(image_paths):
-        img = cv2.imread(str(img_path))
-        img_height, img_width, _ = img.shape
-
-        if DRAW_RESULTS:
-            result_image_bbox = drawing_utils.clone_image(img)
-            result_image_mask = drawing_utils.clone_image(img)
-            result_image_polygon = drawing_utils.clone_image(img)
-            result_image_final_polygon = drawing_utils.clone_image(img)
-
-
-        csv_result_file = []
-        csv_result_file.append(csv_header)
-        
-        
-        detection_results = cross_section_detector.predict(
-            source=img,
-            conf=config["CrossSectionDetector"]["conf"],
-            iou=config["CrossSectionDetector"]["iou"],
-            imgsz=config["CrossSectionDetector"]["imgsz"],
-            device=config["CrossSectionDetector"]["device"]
-        )        
-
-
-                
-        if len(detection_results[0].boxes) == 0:
-            continue
-
-        mask_generator.set_image(img)
-
-        
-        
-        for box in detection_results[0].boxes:
-            template_class_id = int(box.cls.cpu().tolist()[0])
-
-            x0, y0, x1, y1 = box.xyxy.cpu().tolist()[0]
-            bbox = [x0, y0, x1-x0, y1-y0]
-
-            
-                        
-            masks, scores, logits = mask_generator.predict(
-                box=np.array([x0, y0, x1, y1]),
-                multimask_output=config["MaskGenerator"]["multimask"]
-            )
-
-            bi_mask = masks[0]
-
-
-            if SAVE_COCO:
-                rle = general_utils.binary_mask_to_rle_compressed(bi_mask)
-                
-                area = (x1 - x0)*(y1 - y0)
-                
-                coco_results["annotation"].append({
-                    "id": annotation_counter, 
-                    "image_id": img_counter, 
-                    "category_id": 0, 
-                    "segmentation": rle, 
-                    "area": area, 
-                    "bbox": bbox, 
-                    "iscrowd": 1,
-                })
-                
-                annotation_counter += 1
-
-            # Load templates
-            match template_class_id:
-                case 0:
-                    from templates.slab_template import SlabTemplate
-                    template = SlabTemplate()
-                case 1:
-                    from templates.t_girder_template import TGirderTemplate
-                    template = TGirderTemplate()
-                case 2:
-                    from templates.tapered_t_girder_template import TaperedTGirderTemplate
-                    template = TaperedTGirderTemplate()
-
-            reference_polygon = polygon_simplifier.simplify(bi_mask)          
-    
-            initial_parameters = template.estimate_initial_parameters_simple(reference_polygon)
-
-            final_parameters = parameter_extractor.optimize(
-                template, 
-                reference_polygon, 
-                maxiter=config["ParameterOptimizer"]["maxiter"], 
-                initial_temp=config["ParameterOptimizer"]["initial_temp"])
-            
-            match template_class_id:
-                case 0:
-                    P1 = final_parameters[0]
-                    P2 = final_parameters[1]
-                    P3 = final_parameters[2]
-                    P4 = final_parameters[3]
-                    P5 = 0
-                    P6 = final_parameters[4]
-                    P7 = final_parameters[5]
-                    P8 = 0
-                case 1:
-                    P1 = final_parameters[0]
-                    P2 = final_parameters[1]
-                    P3 = final_parameters[2]
-                    P4 = final_parameters[3]
-                    P5 = final_parameters[4]
-                    P6 = final_parameters[5]
-                    P7 = final_parameters[6]
-                    P8 = 0
-                case 2:
-                    P1 = final_parameters[0]
-                    P2 = final_parameters[1]
-                    P3 = final_parameters[2]
-                    P4 = final_parameters[3]
-                    P5 = final_parameters[4]
-                    P6 = final_parameters[5]
-                    P7 = final_parameters[6]
-                    P8 = final_parameters[7]
-                    
-            
-
-            csv_result_file.append(
-                [
-                    round(x0, 4), round(y0,4), round(x1,4), round(y1,4),
-                    template_class_id,
-                    round(P1, 4), round(P2, 4), round(P3, 4), round(P4, 4),
-                    round(P5, 4), round(P6, 4), round(P7, 4), round(P8, 4)
-                ]
-            )
-            
-            
-            # Currently, only the first cross-section is exported to the Allplan Bridge script
-            if allplan_script_written == False:
-                general_utils.write_allplan_parameter_file(output_dir, [P1, P2, P3, P4, P5, P6, P7, P8], template_class_id)
-                allplan_script_written = True
-            
-            
-           
-       
-            if DRAW_RESULTS:
-                result_image_bbox = drawing_utils.draw_bbox(
-                    result_image_bbox, 
-                    bbox,
-                    color_hex=config["General"]["bbox_color"],
-                    alpha=0.5
-                )
-
-                result_image_bbox = drawing_utils.draw_text(
-                    result_image_bbox, 
-                    str(template_class_id),
-                    (int(bbox[0]), int(bbox[1])),
-                    color_hex=config["General"]["bbox_color"],
-                )
-                
-                result_image_mask = drawing_utils.draw_mask(
-                    result_image_mask, 
-                    bi_mask,
-                    color_hex=config["General"]["mask_color"],
-                    alpha=0.5
-                )
-
-                result_image_polygon = drawing_utils.draw_polygon(
-                    result_image_polygon, 
-                    reference_polygon,
-                    color_hex=config["General"]["polygon_color"],
-                    alpha=0.5
-                )
-                
-                final_polygon = template.__class__.make_polygon_from_params(final_parameters)
-                result_image_final_polygon = drawing_utils.draw_polygon(
-                    result_image_final_polygon, 
-                    final_polygon,
-                    color_hex=config["General"]["final_polygon_color"],
-                    alpha=0.5
-                )
-          
-        if SAVE_COCO:
-            coco_results["images"].append({
-                "id": img_counter, 
-                "width": img_width, 
-                "height": img_height, 
-                "file_name": img_path.name, 
-                "license": 0, 
-                "flickr_url": "", 
-                "coco_url": "", 
-                "date_captured": "",
-            })
-
-            img_counter += 1
-
-        if DRAW_RESULTS:
-            
-            img_filepath_bbox = Path.joinpath(result_image_folder, f"{img_path.stem}_bbox.png")
-            cv2.imwrite(str(img_filepath_bbox), result_image_bbox)
-            
-            img_filepath_mask = Path.joinpath(result_image_folder, f"{img_path.stem}_mask.png")
-            cv2.imwrite(str(img_filepath_mask), result_image_mask)
-            
-            img_filepath_polygon = Path.joinpath(result_image_folder, f"{img_path.stem}_polygon.png")
-            cv2.imwrite(str(img_filepath_polygon), result_image_polygon)
-            
-            img_filepath_final_polygon = Path.joinpath(result_image_folder, f"{img_path.stem}_final_polygon.png")          
-            cv2.imwrite(str(img_filepath_final_polygon), result_image_final_polygon)
-            
-            
-        csv_filepath = Path.joinpath(output_dir, f"{img_path.stem}.csv")
-        with open(str(csv_filepath), 'w') as fw:
-            writer = csv.writer(fw, delimiter=';')
-            writer.writerows(csv_result_file)
-            
-    if SAVE_COCO:
-        import json
-        
-        coco_filepath = Path.joinpath(output_dir, "coco.json")
-        with open(str(coco_filepath), "w") as fw:
-            json.dump(coco_results, fw)
-        
-
-        
-    
\ No newline at end of file
+        result_writer.close()
+        manifest.close()
+
+        if PIPELINE_STATS:
+            from tools.fit_cache import format_cache_stats
+            from tools.pipeline import format_stats
+            service_stats = client.stats()
+            print(format_stats(service_stats["stages"]))
+            if service_stats["result_cache"] is not None:
+                print(format_cache_stats(service_stats["result_cache"]))
+
+    else:
+        from tools.cross_section_reconstructor import CrossSectionReconstructor
+
+        reconstructor = CrossSectionReconstructor(config, profiler)
+
+        first_result = True
+        progress_bar = tqdm(reconstructor.run(image_paths), total=len(image_paths))
+        for img_path, img, boxes in progress_bar:
+            if first_result:
+                profiler.mark("first result")
+                first_result = False
+
+            progress_bar.set_postfix_str(reconstructor.pipeline.format_queue_depths(), refresh=False)
+
+            result_writer.write(reconstructor.make_image_result(img_path, img, boxes, DRAW_RESULTS, SAVE_COCO))
+
+        result_writer.close()
+        manifest.close()
+
+        reconstructor.close()
+
+        if PIPELINE_STATS:
+            print(reconstructor.pipeline.format_stats())
+            if reconstructor.result_cache is not None:
+                from tools.fit_cache import format_cache_stats
+                print(format_cache_stats(reconstructor.result_cache.stats()))
+
+    if PROFILE_STARTUP:
+        profiler.mark("end of run")
+        print(profiler.format_report())
@@ -0,0 +1,52 @@
+from typing import Callable, Sequence
+import numpy as np
+
+class BaseOptimizer():
+    """
+    Base class for the global optimization strategies used by the ParameterExtractor.
+
+    A strategy minimizes a loss over box-bounded template parameters. It is given both a scalar 
+    loss and a batched loss, so that population-based strategies can score a whole generation 
+    in a single call.
+
+    Args:
+        seed (int, optional): Seed of the random number generator for reproducible runs.
+
+    Attributes:
+        COARSE_TO_FINE (bool): Whether the strategy profits from the two-stage fit of
+            `ParameterExtractor.optimize_run`; otherwise the option is ignored for it.
+        BATCHED (bool): Whether the strategy scores its candidates with the batched loss; otherwise
+            it evaluates one parameter vector at a time, which the "raster" backend does not support.
+    """
+    COARSE_TO_FINE = True
+    BATCHED = True
+
+    def __init__(self, seed: int = None):
+        self.seed = seed
+
+
+    def minimize(
+        self,
+        loss: Callable[[np.ndarray], float],
+        loss_batch: Callable[[np.ndarray], np.ndarray],
+        bounds: Sequence[Sequence[float]],
+        x0: Sequence[float],
+        callback: Callable[[np.ndarray, float], bool] = None,
+        **kwargs
+    ):
+        """
+        Minimizes the loss within the given bounds.
+
+        Args:
+            loss (Callable): Loss of a single parameter vector of shape (P,).
+            loss_batch (Callable): Losses of a parameter matrix of shape (N, P), returned with shape (N,).
+            bounds (Sequence[Sequence[float]]): List of [lower_bound, upper_bound] pairs for each parameter.
+            x0 (Sequence[float]): Initial parameter estimate.
+            callback (Callable, optional): Called with the best parameter vector and its loss after 
+                every iteration. Returning True stops the optimization.
+            **kwargs: Strategy-specific options overriding those given on construction.
+
+        Returns:
+            scipy.optimize.OptimizeResult: Result with at least the attributes `x`, `fun`, `nfev` and `message`.
+        """
+        raise NotImplementedError
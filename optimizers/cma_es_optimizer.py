@@ -0,0 +1,165 @@
+from typing import Callable, Sequence
+import math
+import numpy as np
+from scipy.optimize import OptimizeResult
+from optimizers.base_optimizer import BaseOptimizer
+
+class CMAESOptimizer(BaseOptimizer):
+    """
+    Global optimization with the covariance matrix adaptation evolution strategy (CMA-ES).
+
+    Implements the (mu/mu_w, lambda)-CMA-ES with cumulative step-size adaptation, rank-one and
+    rank-mu covariance updates. The search runs in coordinates normalized to the unit box of the
+    bounds and starts at the initial estimate. Samples outside the bounds are repaired to the
+    nearest feasible point and penalized by their squared repair distance. Every generation is
+    scored with a single call of the batched loss.
+
+    Args:
+        maxiter (int): Maximum number of generations.
+        popsize (int, optional): Number of samples per generation; defaults to 4 + 3 ln(P).
+        sigma0 (float): Initial step size relative to the width of the bounds.
+        tolfun (float): Stop when the best losses of recent generations and the current
+            generation's losses all lie within this range.
+        tolx (float): Stop when the step size relative to the bounds falls below this value.
+        seed (int, optional): Seed of the random number generator for reproducible runs.
+    """
+    # The narrow bounds of a fine stage shrink the initial step size, and the coarse result
+    # biases the mean, which lowered the fitted IoU for any split of the generations
+    COARSE_TO_FINE = False
+
+    def __init__(
+        self,
+        maxiter: int = 200,
+        popsize: int = None,
+        sigma0: float = 0.25,
+        tolfun: float = 1e-6,
+        tolx: float = 1e-6,
+        seed: int = None
+    ):
+        super().__init__(seed)
+        self.maxiter = maxiter
+        self.popsize = popsize
+        self.sigma0 = sigma0
+        self.tolfun = tolfun
+        self.tolx = tolx
+
+
+    def minimize(
+        self,
+        loss: Callable[[np.ndarray], float],
+        loss_batch: Callable[[np.ndarray], np.ndarray],
+        bounds: Sequence[Sequence[float]],
+        x0: Sequence[float],
+        callback: Callable[[np.ndarray, float], bool] = None,
+        **kwargs
+    ):
+        """
+        Minimizes the loss within the given bounds using CMA-ES.
+        See `BaseOptimizer.minimize` for the arguments. Keyword arguments override the
+        options given on construction (maxiter, popsize, sigma0, tolfun, tolx, seed).
+        """
+        options = {
+            "maxiter": self.maxiter, "popsize": self.popsize, "sigma0": self.sigma0,
+            "tolfun": self.tolfun, "tolx": self.tolx, "seed": self.seed,
+        }
+        options.update(kwargs)
+
+        rng = np.random.default_rng(options["seed"])
+
+        lower, upper = np.asarray(bounds, dtype=float).T
+        scale = upper - lower
+        n = len(lower)
+
+        # Selection and recombination weights
+        lam = options["popsize"] or 4 + int(3 * math.log(n))
+        mu = lam // 2
+        weights = math.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        weights /= weights.sum()
+        mu_eff = 1 / (weights ** 2).sum()
+
+        # Adaptation rates
+        c_sigma = (mu_eff + 2) / (n + mu_eff + 5)
+        d_sigma = 1 + 2 * max(0, math.sqrt((mu_eff - 1) / (n + 1)) - 1) + c_sigma
+        c_c = (4 + mu_eff / n) / (n + 4 + 2 * mu_eff / n)
+        c_1 = 2 / ((n + 1.3) ** 2 + mu_eff)
+        c_mu = min(1 - c_1, 2 * (mu_eff - 2 + 1 / mu_eff) / ((n + 2) ** 2 + mu_eff))
+        chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        # State in normalized coordinates
+        mean = np.clip((np.asarray(x0, dtype=float) - lower) / scale, 0, 1)
+        sigma = options["sigma0"]
+        covariance = np.eye(n)
+        path_sigma = np.zeros(n)
+        path_c = np.zeros(n)
+
+        best_x = lower + mean * scale
+        best_fun = float(loss_batch(best_x[None])[0])
+        nfev = 1
+        recent_best = []
+        generation = 0
+        message = "Maximum number of generations reached."
+
+        for generation in range(1, options["maxiter"] + 1):
+            eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+            eigenvalues = np.maximum(eigenvalues, 1e-20)
+            sqrt_covariance = eigenvectors * np.sqrt(eigenvalues)
+            inv_sqrt_covariance = (eigenvectors / np.sqrt(eigenvalues)) @ eigenvectors.T
+
+            steps = rng.standard_normal((lam, n)) @ sqrt_covariance.T
+            samples = mean + sigma * steps
+
+            # Repair to the bounds and penalize the repair distance
+            repaired = np.clip(samples, 0, 1)
+            losses = loss_batch(lower + repaired * scale)
+            fitness = losses + ((samples - repaired) ** 2).sum(axis=1)
+            nfev += lam
+
+            # Repaired samples are feasible, so their unpenalized loss is a valid candidate for the best
+            best_index = np.argmin(losses)
+            if losses[best_index] < best_fun:
+                best_fun = float(losses[best_index])
+                best_x = lower + repaired[best_index] * scale
+
+            order = np.argsort(fitness)
+
+            # Update the mean with the best samples
+            selected_steps = steps[order[:mu]]
+            mean_step = weights @ selected_steps
+            mean = mean + sigma * mean_step
+
+            # Cumulative step-size adaptation
+            path_sigma = (1 - c_sigma) * path_sigma + math.sqrt(c_sigma * (2 - c_sigma) * mu_eff) * inv_sqrt_covariance @ mean_step
+            norm_path_sigma = np.linalg.norm(path_sigma)
+            sigma *= math.exp((c_sigma / d_sigma) * (norm_path_sigma / chi_n - 1))
+
+            # Covariance adaptation (rank-one and rank-mu)
+            stalled = norm_path_sigma / math.sqrt(1 - (1 - c_sigma) ** (2 * generation)) >= (1.4 + 2 / (n + 1)) * chi_n
+            path_c = (1 - c_c) * path_c + (not stalled) * math.sqrt(c_c * (2 - c_c) * mu_eff) * mean_step
+            rank_mu = (selected_steps.T * weights) @ selected_steps
+            covariance = (
+                (1 - c_1 - c_mu) * covariance
+                + c_1 * (np.outer(path_c, path_c) + stalled * c_c * (2 - c_c) * covariance)
+                + c_mu * rank_mu
+            )
+            covariance = (covariance + covariance.T) / 2
+
+            if callback is not None and callback(best_x, best_fun):
+                message = "Stopped by callback."
+                break
+
+            recent_best.append(fitness[order[0]])
+            recent_best = recent_best[-(10 + int(30 * n / lam)):]
+            if max(recent_best + [fitness.max()]) - min(recent_best + [fitness.min()]) < options["tolfun"]:
+                message = "Loss range below tolfun."
+                break
+            if sigma * math.sqrt(eigenvalues.max()) < options["tolx"]:
+                message = "Step size below tolx."
+                break
+
+        return OptimizeResult(
+            x=best_x,
+            fun=best_fun,
+            nfev=nfev,
+            nit=generation,
+            success=True,
+            message=message)
@@ -0,0 +1,56 @@
+from typing import Callable, Sequence
+import numpy as np
+from scipy.optimize import differential_evolution
+from optimizers.base_optimizer import BaseOptimizer
+
+class DifferentialEvolutionOptimizer(BaseOptimizer):
+    """
+    Global optimization with `scipy.optimize.differential_evolution` in vectorized mode.
+
+    Every generation is scored with a single call of the batched loss. The initial estimate 
+    is inserted into the initial population, and the best member is polished with L-BFGS-B.
+
+    Args:
+        maxiter (int): Maximum number of generations.
+        popsize (int): Population size multiplier; a generation holds popsize * P parameter vectors.
+        tol (float): Relative tolerance of the population spread for convergence.
+        seed (int, optional): Seed of the random number generator for reproducible runs.
+    """
+    def __init__(self, maxiter: int = 200, popsize: int = 15, tol: float = 0.01, seed: int = None):
+        super().__init__(seed)
+        self.maxiter = maxiter
+        self.popsize = popsize
+        self.tol = tol
+
+
+    def minimize(
+        self,
+        loss: Callable[[np.ndarray], float],
+        loss_batch: Callable[[np.ndarray], np.ndarray],
+        bounds: Sequence[Sequence[float]],
+        x0: Sequence[float],
+        callback: Callable[[np.ndarray, float], bool] = None,
+        **kwargs
+    ):
+        """
+        Minimizes the loss within the given bounds using differential evolution.
+        See `BaseOptimizer.minimize` for the arguments. Keyword arguments are passed to `differential_evolution`.
+        """
+        options = {"maxiter": self.maxiter, "popsize": self.popsize, "tol": self.tol, "seed": self.seed}
+        options.update(kwargs)
+
+        if callback is not None:
+            def evolution_callback(intermediate_result):
+                return callback(intermediate_result.x, intermediate_result.fun)
+        else:
+            evolution_callback = None
+
+        # The vectorized objective receives the population as columns: (P, S)
+        return differential_evolution(
+            func=lambda population: loss_batch(population.T),
+            bounds=bounds,
+            x0=np.clip(x0, *np.transpose(bounds)),
+            callback=evolution_callback,
+            vectorized=True,
+            updating="deferred",
+            **options)
@@ -0,0 +1,159 @@
+from typing import Callable, Sequence
+import numpy as np
+from scipy.optimize import OptimizeResult, dual_annealing, minimize
+from optimizers.base_optimizer import BaseOptimizer
+
+class DualAnnealingOptimizer(BaseOptimizer):
+    """
+    Global optimization with `scipy.optimize.dual_annealing`, evaluating one parameter vector at a time.
+
+    The search starts from a random point within the bounds, the initial estimate is not used.
+
+    Args:
+        maxiter (int): Maximum number of global search iterations.
+        initial_temp (float): Initial temperature; higher values facilitate a wider search.
+        seed (int, optional): Seed of the random number generator for reproducible runs.
+    """
+    BATCHED = False
+
+    def __init__(self, maxiter: int = 1000, initial_temp: float = 5230, seed: int = None):
+        super().__init__(seed)
+        self.maxiter = maxiter
+        self.initial_temp = initial_temp
+
+
+    def minimize(
+        self,
+        loss: Callable[[np.ndarray], float],
+        loss_batch: Callable[[np.ndarray], np.ndarray],
+        bounds: Sequence[Sequence[float]],
+        x0: Sequence[float],
+        callback: Callable[[np.ndarray, float], bool] = None,
+        **kwargs
+    ):
+        """
+        Minimizes the loss within the given bounds using dual annealing.
+        See `BaseOptimizer.minimize` for the arguments. Keyword arguments are passed to `dual_annealing`.
+        """
+        options = {"maxiter": self.maxiter, "initial_temp": self.initial_temp, "seed": self.seed}
+        options.update(kwargs)
+
+        if callback is None:
+            return dual_annealing(func=loss, bounds=bounds, **options)
+
+        # dual_annealing calls its own callback only for new minima, so the iterations are counted here
+        iterations = _AnnealingIterations(loss, callback, len(bounds))
+        options["minimizer_kwargs"] = iterations.wrap_local_search(options.get("minimizer_kwargs"), bounds)
+
+        try:
+            results = dual_annealing(func=iterations.loss, bounds=bounds, **options)
+            iterations.end_iteration()
+        except _StopAnnealing:
+            results = OptimizeResult(
+                x=iterations.best_x,
+                fun=iterations.best_fun,
+                nfev=iterations.evaluations,
+                nit=iterations.iterations,
+                success=False,
+                message="Stopped by callback.")
+
+        return results
+
+
+class _StopAnnealing(Exception):
+    """
+    Raised from within the loss to abort `dual_annealing` when the callback returns True.
+    """
+
+
+class _AnnealingIterations():
+    """
+    Calls a callback after every iteration of `dual_annealing`.
+
+    After the evaluation of its starting point, every iteration of `dual_annealing` visits 2 * P
+    points, followed by local searches of varying length. The loss counts the visits outside of
+    local searches, so an iteration ends when the first visit of the next one is evaluated, or
+    when the search ends. A re-annealing restart evaluates one extra random point, which ends
+    the following iterations one visit early.
+
+    Args:
+        loss (Callable): Loss of a single parameter vector.
+        callback (Callable): Called with the best parameter vector and its loss after every iteration.
+        num_params (int): Number of parameters P.
+    """
+    # Local search of dual_annealing if no minimizer is given, see scipy.optimize._dual_annealing
+    LS_MAXITER_RATIO = 6
+    LS_MAXITER_MIN = 100
+    LS_MAXITER_MAX = 1000
+
+    def __init__(self, loss: Callable[[np.ndarray], float], callback: Callable[[np.ndarray, float], bool], num_params: int):
+        self._loss = loss
+        self.callback = callback
+        self.visits_per_iteration = 2 * num_params
+        self.num_params = num_params
+
+        self.evaluations = 0
+        self.visits = 0
+        self.iterations = 0
+        self.in_local_search = False
+        self.best_x = None
+        self.best_fun = np.inf
+
+
+    def loss(self, params: np.ndarray):
+        """
+        Evaluates the loss and ends the current iteration at the first visit of the next one.
+        """
+        if not self.in_local_search:
+            if self.visits > 0 and self.visits % self.visits_per_iteration == 1:
+                self.end_iteration()
+            self.visits += 1
+
+        value = self._loss(params)
+        self.evaluations += 1
+        if value < self.best_fun:
+            self.best_fun = value
+            self.best_x = np.array(params, dtype=float)
+
+        return value
+
+
+    def end_iteration(self):
+        """
+        Reports the best parameter vector of the finished iteration to the callback.
+        """
+        # The first visit is the starting point, which precedes the first iteration
+        if self.visits <= 1:
+            return
+
+        self.iterations += 1
+        if self.callback(self.best_x, self.best_fun):
+            raise _StopAnnealing()
+
+
+    def wrap_local_search(self, minimizer_kwargs: dict, bounds: Sequence[Sequence[float]]):
+        """
+        Makes the local search of `dual_annealing` run with the given, or its default, minimizer
+        while the loss evaluations are excluded from the visits.
+
+        Returns:
+            dict: Keyword arguments of `scipy.optimize.minimize` for the local search.
+        """
+        if minimizer_kwargs:
+            minimizer_kwargs = dict(minimizer_kwargs)
+        else:
+            ls_maxiter = min(max(self.num_params * self.LS_MAXITER_RATIO, self.LS_MAXITER_MIN), self.LS_MAXITER_MAX)
+            minimizer_kwargs = {"method": "L-BFGS-B", "options": {"maxiter": ls_maxiter}, "bounds": [tuple(bound) for bound in bounds]}
+        method = minimizer_kwargs.get("method")
+
+        # `minimize` passes the options of a custom method as keyword arguments
+        def local_search(fun, x0, args=(), jac=None, hess=None, hessp=None, bounds=None, constraints=(), callback=None, tol=None, **options):
+            self.in_local_search = True
+            try:
+                return minimize(fun, x0, args, method, jac, hess, hessp, bounds, constraints, tol, callback, options)
+            finally:
+                self.in_local_search = False
+
+        minimizer_kwargs["method"] = local_search
+
+        return minimizer_kwargs
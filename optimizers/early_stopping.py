@@ -0,0 +1,155 @@
+import time
+from typing import Callable
+import numpy as np
+
+
+class StopOptimization(Exception):
+    """
+    Raised from within a monitored loss to abort the running optimizer.
+    """
+
+
+class EarlyStopping():
+    """
+    Monitors the loss evaluations of an optimization run and stops it early.
+
+    The monitor wraps the scalar and batched loss functions handed to an optimizer strategy.
+    It counts evaluations, tracks the best parameter vector seen so far and raises
+    `StopOptimization` as soon as a stopping criterion is met. The target loss and the time
+    budget are checked after every evaluation.
+
+    Patience counts iterations of the strategy, i.e. generations of the population-based
+    strategies and annealing iterations of dual annealing. They are reported through the
+    per-iteration callback of the strategy, wrapped with `wrap_callback`. Evaluations outside
+    of the iterations, such as local searches or the polishing of differential evolution,
+    count towards the evaluations only.
+
+    Args:
+        target_loss (float, optional): Stop once a loss at or below this value is reached.
+        patience (int, optional): Stop after this many consecutive iterations without an
+            improvement of the best loss by more than `min_delta`.
+        max_time (float, optional): Wall-clock budget of a run in seconds.
+        min_delta (float): Minimum decrease of the best loss that counts as an improvement.
+
+    Attributes:
+        evaluations (int): Number of loss evaluations of the current run.
+        iterations (int): Number of iterations the strategy reported in the current run.
+        best_x (np.ndarray): Best parameter vector of the current run.
+        best_fun (float): Loss of the best parameter vector.
+        stop_reason (str): "target_loss", "patience" or "max_time" once stopped, otherwise None.
+    """
+    def __init__(self, target_loss: float = None, patience: int = None, max_time: float = None, min_delta: float = 1e-9):
+        self.target_loss = target_loss
+        self.patience = patience
+        self.max_time = max_time
+        self.min_delta = min_delta
+
+        self.reset()
+
+
+    def reset(self, restart_clock: bool = True):
+        """
+        Resets the monitor for a new optimization run and starts its clock.
+
+        Args:
+            restart_clock (bool): If False, the wall-clock budget continues from the previous run,
+                e.g. for the stages of a coarse-to-fine fit.
+        """
+        self.evaluations = 0
+        self.iterations = 0
+        self.best_x = None
+        self.best_fun = np.inf
+        self.stop_reason = None
+        self.last_improvement = 0
+        if restart_clock:
+            self.start_time = time.perf_counter()
+
+
+    def wrap(self, loss: Callable[[np.ndarray], float]):
+        """
+        Wraps a scalar loss function with the monitor.
+
+        Args:
+            loss (Callable): Loss of a single parameter vector.
+
+        Returns:
+            Callable: Monitored loss function with the same signature.
+        """
+        def monitored_loss(params):
+            value = loss(params)
+            self.evaluations += 1
+            self._record_best(params, value)
+            self._check()
+            return value
+
+        return monitored_loss
+
+
+    def wrap_batch(self, loss_batch: Callable[[np.ndarray], np.ndarray]):
+        """
+        Wraps a batched loss function with the monitor.
+
+        Args:
+            loss_batch (Callable): Losses of a parameter matrix of shape (N, P).
+
+        Returns:
+            Callable: Monitored batched loss function with the same signature.
+        """
+        def monitored_loss_batch(params_matrix):
+            values = loss_batch(params_matrix)
+            best_index = int(np.argmin(values))
+            self.evaluations += len(values)
+            self._record_best(np.atleast_2d(params_matrix)[best_index], float(values[best_index]))
+            self._check()
+            return values
+
+        return monitored_loss_batch
+
+
+    def wrap_callback(self, callback: Callable[[np.ndarray, float], bool] = None):
+        """
+        Wraps the per-iteration callback of an optimizer strategy with the monitor, which counts
+        the iterations and checks the patience at the end of each one.
+
+        Args:
+            callback (Callable, optional): Called with the best parameter vector and its loss after
+                every iteration.
+
+        Returns:
+            Callable: Monitored callback with the same signature.
+        """
+        def monitored_callback(x, f):
+            self.iterations += 1
+            if self.patience is not None and self.iterations - self.last_improvement >= self.patience:
+                self.stop_reason = "patience"
+                raise StopOptimization(self.stop_reason)
+
+            return callback(x, f) if callback is not None else None
+
+        return monitored_callback
+
+
+    def _record_best(self, params: np.ndarray, value: float):
+        """
+        Updates the best parameter vector and the iteration of the last improvement.
+        """
+        if value < self.best_fun:
+            if value < self.best_fun - self.min_delta:
+                # The improvement belongs to the iteration in progress
+                self.last_improvement = self.iterations + 1
+            self.best_fun = value
+            # Optimizers may reuse the parameter buffer, so keep a copy
+            self.best_x = np.array(params, dtype=float)
+
+
+    def _check(self):
+        """
+        Raises `StopOptimization` if a stopping criterion is met.
+        """
+        if self.target_loss is not None and self.best_fun <= self.target_loss:
+            self.stop_reason = "target_loss"
+        elif self.max_time is not None and time.perf_counter() - self.start_time >= self.max_time:
+            self.stop_reason = "max_time"
+
+        if self.stop_reason is not None:
+            raise StopOptimization(self.stop_reason)
@@ -0,0 +1,53 @@
+import time
+STARTUP_TIME = time.perf_counter()
+
+import yaml
+import argparse
+from pathlib import Path
+
+from tools.cross_section_reconstructor import CrossSectionReconstructor
+from tools.reconstruction_service import DEFAULT_ADDRESS, ReconstructionService, make_server
+from tools.startup_profiler import StartupProfiler
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Run the reconstruction as a local service that keeps the models loaded between requests.")
+
+    parser.add_argument("-c", "--config", type=Path, default=Path("default.yaml"),
+                        help="Optional path to a configuration file (default: default.yaml).")
+    parser.add_argument("--address", type=str, default=None,
+                        help=f"Address to listen on, 'http://host:port' or 'unix:/path/to/socket' (default: 'Server.address' of the configuration or {DEFAULT_ADDRESS}).")
+    parser.add_argument("--lazy", action="store_true",
+                        help="Load the models on the first request instead of at startup (default: False).")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print the import and model load times at startup (default: False).")
+
+    args = parser.parse_args()
+
+    profiler = StartupProfiler(start_time=STARTUP_TIME)
+    profiler.add("import core modules", STARTUP_TIME, time.perf_counter())
+
+    with profiler.measure("load config"):
+        with open(str(args.config), 'r') as config_file:
+            config = yaml.safe_load(config_file)
+
+    address = args.address or config["Server"]["address"] or DEFAULT_ADDRESS
+
+    reconstructor = CrossSectionReconstructor(config, profiler)
+    if not args.lazy:
+        reconstructor.preload()
+
+    if args.profile_startup:
+        print(profiler.format_report())
+
+    service = ReconstructionService(reconstructor, fairness=config["Server"]["fairness"])
+    server = make_server(service, address)
+
+    print(f"Serving on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
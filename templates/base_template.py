@@ -1,12 +1,60 @@
 import math
 from typing import Sequence
+import numpy as np
 from shapely import Polygon
 
 class BaseTemplate():
       """
       Base class for geometric template processing and line classification.
       Initializes default thresholds and tolerances used for edge filtering and orientation detection.
+
+      Subclasses declare their parameters (`PARAMETER_NAMES`, starting with the offsets x and y)
+      and the corners of their outline relative to the offset (`vertex_layout`), which must be
+      linear in the parameters. The layout is turned into the constant linear map `VERTEX_MAP`
+      of shape (V, 2, P) once per class, so that the vertices of a parameter vector are a single
+      matrix-vector product and those of a batch a single matrix product.
+
+      Subclasses with a `CLASS_ID`, the class predicted by the cross-section detector, are added
+      to the template registry (see `templates.registry`) on import. `ALLPLAN_PARAMETERS` maps
+      the parameters to the parameters P1 to P8 of the Allplan Bridge scripts.
+
+      Templates are shared by all boxes of their class within a process and are pickled by
+      class id, so that worker processes use their own shared instance. They therefore hold no
+      state of a fit: initial estimates and bounds are returned to the `ParameterExtractor`,
+      which passes them on, so that fits in several threads can share a template.
       """
+      CLASS_ID = None
+      PARAMETER_NAMES = ()
+      VERTEX_MAP = None
+      # Parameter name for each of P1 to P8, None for parameters that are 0
+      ALLPLAN_PARAMETERS = ()
+
+      def __init_subclass__(cls, **kwargs):
+            super().__init_subclass__(**kwargs)
+
+            if cls.PARAMETER_NAMES and "vertex_layout" in cls.__dict__:
+                  # The layout is linear, so its values for the unit vectors are the columns of the map
+                  columns = [np.asarray(cls.vertex_layout(*unit_vector[2:]), dtype=float) for unit_vector in np.eye(len(cls.PARAMETER_NAMES))]
+                  vertex_map = np.stack(columns, axis=-1)
+
+                  # Every vertex is shifted by the offsets x and y
+                  vertex_map[:, 0, 0] = 1
+                  vertex_map[:, 1, 1] = 1
+
+                  cls.VERTEX_MAP = vertex_map
+                  cls._vertex_matrix = vertex_map.reshape(-1, len(cls.PARAMETER_NAMES))
+
+            if cls.CLASS_ID is not None:
+                  from templates.registry import register_template
+                  register_template(cls)
+
+      def __reduce__(self):
+            if self.CLASS_ID is None:
+                  return super().__reduce__()
+
+            from templates.registry import get_template
+            return get_template, (self.CLASS_ID,)
+
       def __init__(self):            
             self.horizontal_angle_threshold = 15
             self.vertical_angle_threshold = 35
@@ -16,20 +64,118 @@ class BaseTemplate():
             
             self.min_bound = 10 
             
-      def create_bounds(self, params: Sequence[float]):         
+      @staticmethod
+      def vertex_layout(*shape_params):
+            """
+            Defines the corners of the outline relative to the offset, as linear expressions of the
+            parameters after the offsets x and y. Evaluated once per class to build `VERTEX_MAP`.
+
+            Args:
+                  *shape_params (float): Parameter values after the offsets, in the order of `PARAMETER_NAMES`.
+
+            Returns:
+                  list: (x, y) pair per corner.
+            """
+            raise NotImplementedError
+
+      @classmethod
+      def make_vertices_from_params(cls, params: Sequence[float]):
+            """
+            Creates the vertex array of the outline from a parameter vector.
+
+            Args:
+                  params (Sequence[float]): Parameter values in the order of `PARAMETER_NAMES`.
+
+            Returns:
+                  np.ndarray: Array of shape (V, 2) with the polygon corners (without repeated closing vertex).
+            """
+            return (cls._vertex_matrix @ np.asarray(params, dtype=float)).reshape(-1, 2)
+
+      @classmethod
+      def make_vertices_batch(cls, params: np.ndarray):
+            """
+            Creates the vertex arrays of many outlines at once.
+
+            Args:
+                  params (np.ndarray): Parameter matrix of shape (N, P) with rows in the order of `PARAMETER_NAMES`.
+
+            Returns:
+                  np.ndarray: Array of shape (N, V, 2) with the polygon corners (without repeated closing vertex).
+            """
+            params = np.asarray(params, dtype=float)
+
+            return (params @ cls._vertex_matrix.T).reshape(len(params), -1, 2)
+
+      @classmethod
+      def is_valid_params(cls, params: np.ndarray):
+            """
+            Checks analytically that parameters describe a simple polygon: every layout of the
+            templates is a simple polygon as long as all heights and widths are positive.
+
+            Args:
+                  params (np.ndarray): Parameter vector of shape (P,) or matrix of shape (N, P).
+
+            Returns:
+                  bool or np.ndarray: Validity, scalar or of shape (N,).
+            """
+            return np.all(np.asarray(params, dtype=float)[..., 2:] > 0, axis=-1)
+
+      @classmethod
+      def make_polygon_from_params(cls, params: Sequence[float]):
+            """
+            Creates the shapely polygon of the outline, for callers that need one, e.g. for drawing.
+            Invalid parameters are repaired by a zero-width buffer.
+
+            Args:
+                  params (Sequence[float]): Parameter values in the order of `PARAMETER_NAMES`.
+
+            Returns:
+                  Polygon: A Shapely polygon representing the cross-section.
+            """
+            polygon = Polygon(cls.make_vertices_from_params(params))
+
+            if not cls.is_valid_params(params):
+                  polygon = polygon.buffer(0)
+
+            return polygon
+
+      @classmethod
+      def allplan_parameters(cls, params: Sequence[float]):
+            """
+            Maps fitted parameters to the parameters P1 to P8 of the Allplan Bridge scripts.
+
+            Args:
+                  params (Sequence[float]): Parameter values in the order of `PARAMETER_NAMES`.
+
+            Returns:
+                  list: Values of P1 to P8.
+            """
+            return [
+                  params[cls.PARAMETER_NAMES.index(name)] if name is not None else 0
+                  for name in cls.ALLPLAN_PARAMETERS
+            ]
+
+      def create_bounds(self, params: Sequence[float], range_limit: float = None):         
             """
             Creates search bounds for each parameter by applying a symmetric range around the initial value.
+            The lower bounds of the dimensions are at least `min_bound`, those of the offsets x and y are not
+            limited, so that a fit translates with the reference polygon (see `FitCache`).
 
             Args:
                   params (Sequence[float]): List of initial parameter values.
+                  range_limit (float, optional): Half-width of the range; defaults to `parameter_range_limit`.
+                        Narrower ranges around a previous fit focus the search, see `ParameterExtractor`.
 
             Returns:
                   list: A list of [lower_bound, upper_bound] pairs for each parameter.
             """
+            if range_limit is None:
+                  range_limit = self.parameter_range_limit
+
             bounds = []
-            for param in params:
-                  lower = max(self.min_bound, param - self.parameter_range_limit)
-                  upper = param + self.parameter_range_limit
+            for index, param in enumerate(params):
+                  lower = param - range_limit if index < 2 else max(self.min_bound, param - range_limit)
+                  upper = param + range_limit
                   bounds.append([lower, upper])
             return bounds
 
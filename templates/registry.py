@@ -0,0 +1,106 @@
+import importlib
+import threading
+from importlib.metadata import entry_points
+
+
+# Entry point group of third-party templates, e.g. in a pyproject.toml:
+# [project.entry-points."crosssectai.templates"]
+# box_girder = "my_package.box_girder_template:BoxGirderTemplate"
+ENTRY_POINT_GROUP = "crosssectai.templates"
+
+BUILTIN_TEMPLATE_MODULES = (
+    "templates.slab_template",
+    "templates.t_girder_template",
+    "templates.tapered_t_girder_template",
+)
+
+_template_classes = {}
+_template_instances = {}
+_templates_loaded = False
+_lock = threading.RLock()
+
+
+def register_template(template_class):
+    """
+    Registers a template class under its `CLASS_ID`. Called for every `BaseTemplate` subclass
+    that declares a class id, when its module is imported.
+
+    Args:
+        template_class (type): Template class.
+
+    Returns:
+        type: The template class.
+    """
+    with _lock:
+        registered = _template_classes.get(template_class.CLASS_ID)
+        if registered is not None and _qualified_name(registered) != _qualified_name(template_class):
+            raise ValueError(
+                f"Template class id {template_class.CLASS_ID} of {_qualified_name(template_class)} "
+                f"is already registered for {_qualified_name(registered)}"
+            )
+
+        _template_classes[template_class.CLASS_ID] = template_class
+        _template_instances.pop(template_class.CLASS_ID, None)
+
+    return template_class
+
+
+def load_templates():
+    """
+    Imports the built-in templates and the templates of installed plugins (entry point group
+    `crosssectai.templates`) once per process.
+    """
+    global _templates_loaded
+
+    with _lock:
+        if _templates_loaded:
+            return
+
+        for module_name in BUILTIN_TEMPLATE_MODULES:
+            importlib.import_module(module_name)
+
+        # Loading an entry point imports its module, which registers its templates
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            entry_point.load()
+
+        _templates_loaded = True
+
+
+def template_classes():
+    """
+    Returns:
+        dict: Registered template classes keyed by class id.
+    """
+    load_templates()
+    return dict(_template_classes)
+
+
+def get_template(class_id: int):
+    """
+    Returns the template of a class id. Each template is instantiated once per process and
+    shared by all boxes of that class.
+
+    Args:
+        class_id (int): Class id of the template, as predicted by the cross-section detector.
+
+    Returns:
+        BaseTemplate: Template instance.
+    """
+    template = _template_instances.get(class_id)
+    if template is not None:
+        return template
+
+    load_templates()
+
+    with _lock:
+        if class_id not in _template_classes:
+            raise ValueError(f"Unknown template class id: {class_id}")
+
+        if class_id not in _template_instances:
+            _template_instances[class_id] = _template_classes[class_id]()
+
+        return _template_instances[class_id]
+
+
+def _qualified_name(template_class):
+    return f"{template_class.__module__}.{template_class.__qualname__}"
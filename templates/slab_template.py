@@ -1,5 +1,4 @@
 from shapely import Polygon
-from typing import Sequence
 from templates.base_template import BaseTemplate
 
 class SlabTemplate(BaseTemplate): 
@@ -7,6 +6,26 @@ class SlabTemplate(BaseTemplate):
         Template class for slab-type bridge cross-sections.
         Inherits default settings and utilities from BaseTemplate.
         """
+
+        # Class predicted by the cross-section detector
+        CLASS_ID = 0
+
+        # Parameters in the order of the parameter vectors
+        PARAMETER_NAMES = (
+            "offset_x",
+            "offset_y",
+            "flange_height",
+            "flange_taper_height",
+            "flange_width",
+            "web_width",
+        )
+
+        # Parameters P1 to P8 of the Allplan Bridge scripts
+        ALLPLAN_PARAMETERS = ("offset_x", "offset_y", "flange_height", "flange_taper_height", None, "flange_width", "web_width", None)
+
+        # Vertex indices of the convex pieces the polygon decomposes into (the slab outline itself is convex)
+        CONVEX_PIECES = [[0, 1, 2, 3, 4, 5]]
+
         def __init__(self):
             super().__init__()
 
@@ -43,42 +62,21 @@ class SlabTemplate(BaseTemplate):
                 web_width,
             ]
 
-            # Build and save the initial candidate polygon
-            self.candidate_polygon = SlabTemplate.make_polygon_from_params(initial_parameters)
-
             return initial_parameters
         
         @staticmethod
-        def make_polygon_from_params(params: Sequence[float]):
+        def vertex_layout(flange_height, flange_taper_height, flange_width, web_width):
             """
-            Creates a slab-type cross-section polygon from a set of geometric parameters.
-
-            Args:
-                params (Sequence[float]): List of parameter values in the order:
-                    [offset_x, offset_y, flange_height, flange_taper_height, flange_width, web_width].
+            Defines the 6 corners of the cross-section relative to its offset, see `BaseTemplate.vertex_layout`.
 
             Returns:
-                Polygon: A Shapely polygon representing the cross-section.
+                list: (x, y) pair per corner (without repeated closing vertex).
             """
-            offset_x, offset_y, flange_height, flange_taper_height, flange_width, web_width = params            
-            
-            # relative offsets for the 6 corners
-            offsets = [
+            return [
                 (0, 0),
                 (2 * flange_width + web_width, 0),
                 (2 * flange_width + web_width, flange_height),
                 (flange_width + web_width, flange_height + flange_taper_height),
                 (flange_width, flange_height + flange_taper_height),
                 (0, flange_height),
-                (0, 0)
             ]
-
-            coords = [(offset_x + dx, offset_y + dy) for dx, dy in offsets]
-            polygon = Polygon(coords)
-
-            if not polygon.is_valid:
-                polygon = polygon.buffer(0)
-
-            return polygon
-
-                
\ No newline at end of file
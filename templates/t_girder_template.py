@@ -1,5 +1,4 @@
 from shapely import Polygon
-from typing import Sequence
 from templates.base_template import BaseTemplate
             
            
@@ -8,6 +7,28 @@ class TGirderTemplate(BaseTemplate):
     Template class for t-type bridge cross-sections.
     Inherits default settings and utilities from BaseTemplate.
     """ 
+
+    # Class predicted by the cross-section detector
+    CLASS_ID = 1
+
+    # Parameters in the order of the parameter vectors
+    PARAMETER_NAMES = (
+        "offset_x",
+        "offset_y",
+        "flange_height",
+        "flange_taper_height",
+        "web_height",
+        "flange_width",
+        "web_width",
+    )
+
+    # Parameters P1 to P8 of the Allplan Bridge scripts
+    ALLPLAN_PARAMETERS = ("offset_x", "offset_y", "flange_height", "flange_taper_height", "web_height", "flange_width", "web_width", None)
+
+    # Vertex indices of the convex pieces the polygon decomposes into: flange with taper, and web.
+    # Shorter pieces repeat their last vertex, which adds a zero-length edge only.
+    CONVEX_PIECES = [[0, 1, 2, 3, 6, 7], [6, 3, 4, 5, 5, 5]]
+
     def __init__(self):
         super().__init__()
         
@@ -48,29 +69,19 @@ class TGirderTemplate(BaseTemplate):
         ]
 
 
-        # Build and save the initial candidate polygon
-        self.candidate_polygon = TGirderTemplate.make_polygon_from_params(initial_parameters)
-
         return initial_parameters
       
       
  
     @staticmethod
-    def make_polygon_from_params(params: Sequence[float]):
+    def vertex_layout(flange_height, flange_taper_height, web_height, flange_width, web_width):
         """
-        Creates a t-type cross-section polygon from a set of geometric parameters.
-
-        Args:
-            params (Sequence[float]): List of parameter values in the order:
-                [offset_x, offset_y, flange_height, flange_taper_height, web_height, flange_width, web_width].
+        Defines the 8 corners of the cross-section relative to its offset, see `BaseTemplate.vertex_layout`.
 
         Returns:
-            Polygon: A Shapely polygon representing the cross-section.
+            list: (x, y) pair per corner (without repeated closing vertex).
         """
-        offset_x, offset_y, flange_height, flange_taper_height, web_height, flange_width, web_width = params           
-            
-        # relative offsets for the 8 corners
-        offsets = [
+        return [
             (0, 0),
             (2 * flange_width + web_width, 0),
             (2 * flange_width + web_width, flange_height),
@@ -79,16 +90,4 @@ class TGirderTemplate(BaseTemplate):
             (flange_width, flange_height + flange_taper_height + web_height),
             (flange_width, flange_height + flange_taper_height),
             (0, flange_height),
-            (0, 0)
         ]
-
-        coords = [(offset_x + dx, offset_y + dy) for dx, dy in offsets]
-        polygon = Polygon(coords)
-
-        if not polygon.is_valid:
-            polygon = polygon.buffer(0)
-
-        return polygon
-      
-        
-
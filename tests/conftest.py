@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from shapely import Polygon
+
+from templates.slab_template import SlabTemplate
+from templates.t_girder_template import TGirderTemplate
+from templates.tapered_t_girder_template import TaperedTGirderTemplate
+
+
+# Parameter vectors at typical scan resolution (pixels), without the leading offsets
+TEMPLATE_SHAPES = {
+    "slab": (SlabTemplate, [120, 60, 250, 1400]),
+    "t_girder": (TGirderTemplate, [80, 60, 300, 700, 450]),
+    "tapered_t_girder": (TaperedTGirderTemplate, [80, 60, 300, 600, 300, 120]),
+}
+
+
+def make_reference_polygon(template_class, shape_params, rng: np.random.Generator, noise: float = 0.02):
+    """
+    Creates a synthetic reference polygon by perturbing the vertices of a template polygon,
+    mimicking the output of `PolygonSimplifier` on a SAM mask.
+    """
+    vertices = template_class.make_vertices_from_params([500, 400] + list(shape_params))
+    scale = np.ptp(vertices, axis=0).max()
+    vertices = vertices + rng.normal(scale=noise * scale, size=vertices.shape)
+
+    polygon = Polygon(vertices)
+    if not polygon.is_valid:
+        polygon = polygon.buffer(0)
+
+    return polygon
+
+
+def overlay_ciou_loss(extractor, params, template):
+    """
+    Evaluates the CIoU loss with separate shapely overlays per term, the baseline of the loss backends.
+    """
+    candidate_polygon = template.make_polygon_from_params(params)
+    reference_polygon = extractor.reference_polygon
+
+    overlap_loss = extractor.iou_loss(reference_polygon, candidate_polygon)
+    centroid_loss = extractor.centroid_alignment_loss(reference_polygon, candidate_polygon)
+    aspect_loss = extractor.aspect_ratio_loss(reference_polygon, candidate_polygon)
+
+    return extractor.w_overlap*overlap_loss + extractor.w_distance*centroid_loss + extractor.w_aspect_ratio*aspect_loss
+
+
+@pytest.fixture(params=list(TEMPLATE_SHAPES))
+def template_name(request):
+    return request.param
+
+
+@pytest.fixture
+def template(template_name):
+    return TEMPLATE_SHAPES[template_name][0]()
+
+
+@pytest.fixture
+def shape_params(template_name):
+    return list(TEMPLATE_SHAPES[template_name][1])
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def reference_polygon(template, shape_params, rng):
+    return make_reference_polygon(type(template), shape_params, rng)
+
+
+@pytest.fixture
+def candidates(template, reference_polygon, rng):
+    """
+    Random parameter vectors within the search bounds of the reference polygon, of shape (50, P).
+    """
+    initial_parameters = template.estimate_initial_parameters_simple(reference_polygon)
+    bounds = np.array(template.create_bounds(initial_parameters))
+
+    return rng.uniform(bounds[:, 0], bounds[:, 1], size=(50, len(bounds)))
+
+
+
+@pytest.fixture(scope="session")
+def sam_checkpoint(tmp_path_factory):
+    """
+    Checkpoint of the smallest SAM variant with random weights; the tests compare code paths, not mask quality.
+    """
+    torch = pytest.importorskip("torch")
+    segment_anything = pytest.importorskip("segment_anything")
+
+    torch.manual_seed(0)
+    path = tmp_path_factory.mktemp("weights") / "sam_vit_b.pth"
+    torch.save(segment_anything.sam_model_registry["vit_b"]().state_dict(), path)
+
+    return str(path)
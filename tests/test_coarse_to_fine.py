@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from optimizers.cma_es_optimizer import CMAESOptimizer
+from optimizers.differential_evolution_optimizer import DifferentialEvolutionOptimizer
+from tools.parameter_extractor import ParameterExtractor
+
+
+def recording(optimizer_class):
+    """
+    Makes a subclass of the optimizer that records the starting point, bounds, options and result of every run.
+    """
+    class RecordingOptimizer(optimizer_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.runs = []
+
+        def minimize(self, loss, loss_batch, bounds, x0, callback=None, **kwargs):
+            result = super().minimize(loss, loss_batch, bounds, x0, callback, **kwargs)
+            self.runs.append({"x0": np.array(x0, dtype=float), "bounds": np.array(bounds), "kwargs": kwargs, "x": result.x})
+            return result
+
+    return RecordingOptimizer
+
+
+@pytest.fixture
+def optimizer():
+    return recording(DifferentialEvolutionOptimizer)(maxiter=50, popsize=5, seed=0)
+
+
+def test_stages_split_the_budget_and_narrow_the_bounds(template, reference_polygon, optimizer):
+    extractor = ParameterExtractor(
+        1.0, 1.0, 1.0, optimizer=optimizer, coarse_to_fine=True, coarse_budget=0.2, fine_budget=0.1, fine_range=0.05
+    )
+
+    result = extractor.optimize(template, reference_polygon, return_result=True)
+
+    coarse, fine = optimizer.runs
+    assert (coarse["kwargs"]["maxiter"], fine["kwargs"]["maxiter"]) == (10, 5)
+
+    initial_bounds = np.array(template.create_bounds(template.estimate_initial_parameters_simple(reference_polygon)))
+    np.testing.assert_array_equal(coarse["bounds"], initial_bounds)
+
+    # The fine stage starts at the coarse result, with bounds scaled to the size of the cross-section
+    min_x, min_y, max_x, max_y = reference_polygon.bounds
+    range_limit = 0.05 * max(max_x - min_x, max_y - min_y)
+    np.testing.assert_allclose(fine["x0"], np.clip(coarse["x"], *initial_bounds.T))
+    np.testing.assert_allclose(fine["bounds"][:, 1] - fine["x0"], range_limit)
+    assert np.all(fine["bounds"][:, 0] >= fine["x0"] - range_limit - 1e-9)
+
+    assert result.coarse_fun is not None
+    assert result.nfev > extractor.early_stopping.evaluations
+    # The fine stage evaluates the coarse result on the full reference first
+    assert result.fun <= extractor.ciou_loss(fine["x0"], template)
+    assert result.fun == pytest.approx(extractor.ciou_loss(result.x, template))
+
+
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_fine_range_is_capped_by_the_template_range(template, reference_polygon, optimizer):
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, optimizer=optimizer, coarse_to_fine=True, fine_range=10.0)
+
+    extractor.optimize(template, reference_polygon)
+
+    fine = optimizer.runs[-1]
+    np.testing.assert_allclose(fine["bounds"][:, 1] - fine["x0"], template.parameter_range_limit)
+
+
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_iterations_of_both_stages_are_recorded(template, reference_polygon, optimizer):
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, optimizer=optimizer, coarse_to_fine=True)
+
+    _, iterations = extractor.optimize(template, reference_polygon, record_iterations=True)
+
+    assert len(iterations) >= 2
+
+
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_cma_es_fits_in_a_single_stage(template, reference_polygon):
+    optimizer = recording(CMAESOptimizer)(maxiter=5, seed=0)
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, optimizer=optimizer, coarse_to_fine=True)
+
+    result = extractor.optimize(template, reference_polygon, return_result=True)
+
+    assert len(optimizer.runs) == 1
+    assert "maxiter" not in optimizer.runs[0]["kwargs"]
+    assert getattr(result, "coarse_fun", None) is None
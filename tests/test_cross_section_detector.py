@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("ultralytics")
+
+from tools.cross_section_detector import CrossSectionDetector
+
+
+class RecordingDetector:
+    """
+    Stands in for the YOLO model of a detector without weights. The model call returns the
+    shapes of the images and records the batches.
+    """
+    predict_batch = CrossSectionDetector.predict_batch
+
+    def __init__(self):
+        self.batches = []
+        self.pulled = 0
+
+
+    def predict(self, source, stream: bool = False, **kwargs):
+        self.batches.append(len(source))
+        return (image.shape for image in source)
+
+
+def test_predict_batch_streams_results_in_source_order():
+    detector = RecordingDetector()
+    images = [np.zeros((10 + index, 20, 3), dtype=np.uint8) for index in range(7)]
+
+    results = list(detector.predict_batch(images, batch_size=3))
+
+    assert results == [image.shape for image in images]
+    assert detector.batches == [3, 3, 1]
+
+
+def test_predict_batch_consumes_sources_lazily():
+    detector = RecordingDetector()
+
+    def sources():
+        for index in range(10):
+            detector.pulled += 1
+            yield np.zeros((5, 5, 3), dtype=np.uint8)
+
+    results = detector.predict_batch(sources(), batch_size=4)
+    next(results)
+
+    assert detector.pulled == 4
+
+
+class Array:
+    """
+    Stands in for a tensor of a YOLO result.
+    """
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=float)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class PaintedObjectDetector(RecordingDetector):
+    """
+    Detects the bounding boxes of the painted regions of each tile with confidence 0.9.
+    """
+    predict_tiled = CrossSectionDetector.predict_tiled
+    _tile_starts = staticmethod(CrossSectionDetector._tile_starts)
+    _merge_cut_off_boxes = staticmethod(CrossSectionDetector._merge_cut_off_boxes)
+
+    def predict(self, source, stream: bool = False, **kwargs):
+        self.batches.append(len(source))
+        for tile in source:
+            contours, _ = cv2.findContours((tile[..., 0] > 0).astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            boxes = [[x, y, x + w, y + h] for x, y, w, h in map(cv2.boundingRect, contours)]
+            yield SimpleNamespace(boxes=SimpleNamespace(
+                xyxy=Array(np.reshape(boxes, (-1, 4))), conf=Array([0.9] * len(boxes)), cls=Array([0] * len(boxes))
+            ))
+
+
+def test_tiles_cover_the_image_with_the_last_tile_at_the_border():
+    assert CrossSectionDetector._tile_starts(250, 100, 75) == [0, 75, 150]
+    assert CrossSectionDetector._tile_starts(175, 100, 75) == [0, 75]
+    assert CrossSectionDetector._tile_starts(80, 100, 75) == [0]
+
+
+def test_tiled_detection_restores_objects_larger_than_a_tile():
+    image = np.zeros((100, 250, 3), dtype=np.uint8)
+    # Spans all three tiles
+    image[20:80, 60:190] = 255
+    # Within the first tile only
+    image[10:30, 10:30] = 255
+    detector = PaintedObjectDetector()
+
+    boxes, scores, classes = detector.predict_tiled(image, tile_size=100, stride=75)
+
+    order = np.argsort(boxes[:, 0])
+    np.testing.assert_array_equal(boxes[order], [[10, 10, 30, 30], [60, 20, 190, 80]])
+    np.testing.assert_array_equal(scores, [0.9, 0.9])
+    np.testing.assert_array_equal(classes, [0, 0])
+    assert detector.batches == [3]
@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+import pytest
+
+from optimizers.cma_es_optimizer import CMAESOptimizer
+from tools.cross_section_fitter import CrossSectionFitter
+from tools.parameter_extractor import ParameterExtractor
+from tools.polygon_simplifier import PolygonSimplifier
+
+
+@pytest.fixture
+def mask(template, shape_params):
+    """
+    Image-sized mask of the template polygon at the offset (500, 400).
+    """
+    vertices = template.make_vertices_from_params([500, 400] + shape_params)
+    mask = np.zeros((1400, 2400), dtype=np.uint8)
+    cv2.fillPoly(mask, [np.round(vertices).astype(np.int32)], 1)
+
+    return mask
+
+
+def make_fitter(workers: int = 0):
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, optimizer=CMAESOptimizer(maxiter=5, seed=0))
+    return CrossSectionFitter(PolygonSimplifier(0.001), extractor, workers)
+
+
+def test_crop_to_foreground_keeps_padding_within_the_mask():
+    mask = np.zeros((20, 30), dtype=np.uint8)
+    mask[5:10, 0:8] = 1
+
+    crop, offset = CrossSectionFitter.crop_to_foreground(mask, padding=2)
+
+    assert offset == (0, 3)
+    assert crop.shape == (9, 10)
+    assert crop.sum() == mask.sum()
+
+
+def test_cropped_fit_matches_fit_of_the_full_mask(template, mask):
+    fitter = make_fitter()
+
+    reference_polygon, params = fitter.submit(mask, template).result()
+
+    assert reference_polygon.equals(fitter.polygon_simplifier.simplify(mask))
+    np.testing.assert_allclose(params, fitter.parameter_extractor.optimize(template, reference_polygon))
+
+
+def test_mask_cropped_from_the_image_gives_the_same_fit(template, mask):
+    fitter = make_fitter()
+    crop = mask[300:, 400:]
+
+    reference_polygon, params = fitter.submit(crop, template, offset=(400, 300)).result()
+    expected_polygon, expected_params = fitter.submit(mask, template).result()
+
+    assert reference_polygon.equals(expected_polygon)
+    np.testing.assert_array_equal(params, expected_params)
+
+
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_worker_pool_reproduces_in_process_fits(template, mask):
+    fitter = make_fitter(workers=1)
+    try:
+        reference_polygon, params = fitter.submit(mask, template).result()
+    finally:
+        fitter.close()
+
+    expected_polygon, expected_params = make_fitter().submit(mask, template).result()
+
+    assert reference_polygon.equals(expected_polygon)
+    np.testing.assert_array_equal(params, expected_params)
+
+
+@pytest.mark.parametrize("template_name", ["slab"])
+def test_failed_fit_is_reported_by_the_future(template, mask):
+    future = make_fitter().submit(np.zeros_like(mask), template)
+
+    assert future.exception() is not None
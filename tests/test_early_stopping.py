@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+
+from optimizers.cma_es_optimizer import CMAESOptimizer
+from optimizers.dual_annealing_optimizer import DualAnnealingOptimizer
+from optimizers.early_stopping import EarlyStopping, StopOptimization
+from tools.parameter_extractor import ParameterExtractor
+
+
+def evaluate(monitor: EarlyStopping, values: list):
+    """
+    Evaluates a sequence of losses with the scalar monitor until it stops.
+
+    Returns:
+        int: Number of evaluated losses.
+    """
+    loss = monitor.wrap(lambda params: params[0])
+    for evaluated, value in enumerate(values, start=1):
+        try:
+            loss(np.array([value]))
+        except StopOptimization:
+            return evaluated
+
+    return len(values)
+
+
+def run_iterations(monitor: EarlyStopping, iterations: list, batched: bool = False):
+    """
+    Evaluates the losses of each iteration, one at a time or as a batch, and reports the end of
+    the iteration to the monitor until it stops.
+
+    Returns:
+        int: Number of started iterations.
+    """
+    loss = monitor.wrap(lambda params: params[0])
+    loss_batch = monitor.wrap_batch(lambda params_matrix: params_matrix[:, 0])
+    callback = monitor.wrap_callback()
+    for iteration, losses in enumerate(iterations, start=1):
+        try:
+            if batched:
+                loss_batch(np.column_stack([losses, np.zeros(len(losses))]))
+            else:
+                for value in losses:
+                    loss(np.array([value]))
+            callback(monitor.best_x, monitor.best_fun)
+        except StopOptimization:
+            return iteration
+
+    return len(iterations)
+
+
+@pytest.mark.parametrize("batched", [False, True])
+@pytest.mark.parametrize("evaluations_per_iteration", [1, 15, 150])
+def test_patience_counts_iterations_regardless_of_their_evaluations(evaluations_per_iteration, batched):
+    monitor = EarlyStopping(patience=3)
+    iterations = [np.full(evaluations_per_iteration, 1.0), np.full(evaluations_per_iteration, 0.5)]
+    iterations += [np.full(evaluations_per_iteration, 0.5)] * 10
+
+    assert run_iterations(monitor, iterations, batched) == 5
+    assert monitor.stop_reason == "patience"
+    assert monitor.iterations == 5
+    assert monitor.evaluations == 5 * evaluations_per_iteration
+    assert monitor.best_fun == 0.5
+
+
+def test_evaluations_without_iterations_do_not_exhaust_the_patience():
+    monitor = EarlyStopping(patience=2)
+
+    run_iterations(monitor, [[1.0]])
+    # E.g. a local search or polishing step with many evaluations and no improvement
+    evaluate(monitor, [2.0] * 100)
+
+    assert monitor.stop_reason is None
+    assert run_iterations(monitor, [[2.0], [2.0]]) == 2
+    assert monitor.stop_reason == "patience"
+    assert monitor.iterations == 3
+
+
+def test_improvements_below_min_delta_do_not_reset_patience():
+    monitor = EarlyStopping(patience=2, min_delta=0.1)
+
+    assert run_iterations(monitor, [[1.0], [0.95], [0.9], [0.5]]) == 3
+    assert monitor.best_fun == 0.9
+
+
+def test_target_loss_takes_precedence():
+    monitor = EarlyStopping(target_loss=0.2, patience=1)
+    loss_batch = monitor.wrap_batch(lambda params_matrix: params_matrix[:, 0])
+
+    with pytest.raises(StopOptimization, match="target_loss"):
+        loss_batch(np.array([[0.5, 0.0], [0.1, 1.0]]))
+
+    assert monitor.evaluations == 2
+    np.testing.assert_array_equal(monitor.best_x, [0.1, 1.0])
+
+
+def test_max_time_stops_the_run():
+    monitor = EarlyStopping(max_time=0.0)
+
+    assert evaluate(monitor, [1.0, 0.5]) == 1
+    assert monitor.stop_reason == "max_time"
+
+
+def test_reset_starts_a_new_run():
+    monitor = EarlyStopping(patience=1)
+    run_iterations(monitor, [[1.0], [1.0]])
+    monitor.reset()
+
+    assert monitor.stop_reason is None
+    assert monitor.evaluations == 0
+    assert monitor.best_x is None
+
+
+def test_reset_can_keep_the_clock_of_the_previous_stage():
+    monitor = EarlyStopping(max_time=60.0)
+    start_time = monitor.start_time
+
+    monitor.reset(restart_clock=False)
+    assert monitor.start_time == start_time
+
+    monitor.reset()
+    assert monitor.start_time > start_time
+
+
+def test_stopped_fit_returns_the_best_parameters(template, reference_polygon):
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, optimizer=CMAESOptimizer(seed=0), target_loss=0.5)
+
+    result = extractor.optimize(template, reference_polygon, return_result=True)
+
+    assert result.stop_reason == "target_loss"
+    assert result.fun <= 0.5
+    assert result.nfev == extractor.early_stopping.evaluations
+    extractor.set_reference(reference_polygon, template)
+    assert extractor.ciou_loss(result.x, template) == pytest.approx(result.fun)
+
+
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_patience_stops_dual_annealing_after_iterations_without_improvement(template, reference_polygon):
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, optimizer=DualAnnealingOptimizer(seed=0), patience=20)
+
+    result = extractor.optimize(template, reference_polygon, return_result=True, maxiter=1000)
+
+    monitor = extractor.early_stopping
+    assert result.stop_reason == "patience"
+    assert monitor.iterations - monitor.last_improvement == 20
+    # Every annealing iteration evaluates 2 * P visits, and local searches evaluate more
+    assert monitor.evaluations > monitor.iterations * 2 * len(result.x)
+    assert monitor.iterations < 1000
@@ -0,0 +1,70 @@
+import os
+import numpy as np
+import pytest
+
+from tools.embedding_cache import EmbeddingCache
+
+
+# Size of an entry of 1000 float64 values including the .npy header, in gigabytes
+ENTRY_SIZE = (1000 * 8 + 128) / 1e9
+
+
+def test_entries_are_read_memory_mapped(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    embedding = np.arange(1000, dtype=np.float64).reshape(10, 100)
+
+    assert cache.get("missing") is None
+    cache.put("key", embedding)
+    cached = cache.get("key")
+
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, embedding)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_size=2.5 * ENTRY_SIZE)
+    for age, key in enumerate(["a", "b"]):
+        cache.put(key, np.zeros(1000))
+        # Distinct access times, older than any lookup of the test
+        os.utime(tmp_path / f"{key}.npy", (1000 + age, 1000 + age))
+
+    # Marks "a" as recently used, so that "b" is evicted
+    assert cache.get("a") is not None
+    cache.put("c", np.ones(1000))
+
+    assert sorted(path.stem for path in tmp_path.glob("*.npy")) == ["a", "c"]
+    assert cache.get("b") is None
+
+
+def test_failed_write_leaves_no_entry(tmp_path):
+    class Unsavable:
+        def __array__(self, *args, **kwargs):
+            raise RuntimeError("disk full")
+
+    cache = EmbeddingCache(tmp_path)
+    with pytest.raises(RuntimeError):
+        cache.put("key", Unsavable())
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_incomplete_entry_is_a_miss(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    (tmp_path / "key.npy").write_bytes(b"\x93NUMPY")
+
+    assert cache.get("key") is None
+    assert cache.misses == 1
+
+
+def test_key_depends_on_content_and_identifiers():
+    image = np.zeros((4, 5, 3), dtype=np.uint8)
+    changed = image.copy()
+    changed[0, 0, 0] = 1
+
+    key = EmbeddingCache.make_key(image, "RGB", "vit_b")
+
+    assert EmbeddingCache.make_key(image.copy(), "RGB", "vit_b") == key
+    assert EmbeddingCache.make_key(changed, "RGB", "vit_b") != key
+    assert EmbeddingCache.make_key(image, "BGR", "vit_b") != key
+    assert EmbeddingCache.make_key(image.reshape(5, 4, 3), "RGB", "vit_b") != key
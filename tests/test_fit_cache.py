@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import shapely
+from shapely import Polygon, affinity
+
+from optimizers.differential_evolution_optimizer import DifferentialEvolutionOptimizer
+from tools.fit_cache import FitCache, format_cache_stats
+from tools.parameter_extractor import ParameterExtractor
+
+
+@pytest.fixture
+def pixel_polygon(reference_polygon):
+    """
+    Reference polygon on integer pixel coordinates, like the contour points of `PolygonSimplifier`.
+    """
+    return Polygon(np.round(reference_polygon.exterior.coords))
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    cache = FitCache(tmp_path / "fits.sqlite")
+    yield ParameterExtractor(1.0, 1.0, 1.0, optimizer=DifferentialEvolutionOptimizer(), result_cache=cache)
+    cache.close()
+
+
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_hit_on_translated_polygon_returns_shifted_offsets(template, pixel_polygon, extractor):
+    shift = np.array([137.0, -58.0])
+    translated_polygon = shapely.transform(pixel_polygon, lambda coords: coords + shift)
+
+    fitted = extractor.optimize(template, pixel_polygon, return_result=True, maxiter=5)
+    cached = extractor.optimize(template, translated_polygon, return_result=True, maxiter=5)
+
+    assert fitted.stop_reason != "cached"
+    assert cached.stop_reason == "cached"
+    assert cached.nfev == 0
+    assert cached.fun == fitted.fun
+    np.testing.assert_allclose(cached.x[:2], np.asarray(fitted.x[:2]) + shift)
+    np.testing.assert_allclose(cached.x[2:], fitted.x[2:])
+    assert extractor.result_cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert format_cache_stats(extractor.result_cache.stats()) == "result cache: 1 entries, hit rate 50% (1 hits, 1 misses)"
+
+
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_hit_near_the_image_origin_reproduces_a_fresh_fit(template, shape_params, extractor):
+    # Offsets below the minimum of the dimensions, which must not limit the search bounds of the offsets
+    origin_polygon = template.make_polygon_from_params([2, 2] + shape_params)
+
+    extractor.optimize(template, template.make_polygon_from_params([500, 400] + shape_params), seed=0, maxiter=300)
+    cached = extractor.optimize(template, origin_polygon, return_result=True, seed=0, maxiter=300)
+    fresh = ParameterExtractor(1.0, 1.0, 1.0, optimizer=DifferentialEvolutionOptimizer()).optimize(
+        template, origin_polygon, return_result=True, seed=0, maxiter=300)
+
+    assert cached.stop_reason == "cached"
+    np.testing.assert_allclose(fresh.x, [2, 2] + shape_params, atol=1e-2)
+    np.testing.assert_allclose(cached.x, fresh.x, atol=1e-2)
+
+
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_miss_for_other_settings_and_shapes(template, pixel_polygon, extractor):
+    other_polygon = affinity.scale(pixel_polygon, xfact=1.2, yfact=0.9)
+
+    extractor.optimize(template, pixel_polygon, maxiter=5)
+    for polygon, kwargs in ((pixel_polygon, {"maxiter": 6}), (other_polygon, {"maxiter": 5})):
+        assert extractor.optimize(template, polygon, return_result=True, **kwargs).stop_reason != "cached"
+
+    assert extractor.result_cache.hits == 0
+    assert extractor.result_cache.misses == 3
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = FitCache(tmp_path / "fits.sqlite", max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, np.array([1.0, 2.0]), 0.5)
+
+    # Marks "a" as recently used, so that "b" is evicted
+    cache.get("a")
+    cache.put("c", np.array([3.0, 4.0]), 0.25)
+
+    assert cache.get("b") is None
+    params, loss = cache.get("c")
+    np.testing.assert_array_equal(params, [3.0, 4.0])
+    assert loss == 0.25
+    assert cache.stats()["entries"] == 2
+    cache.close()
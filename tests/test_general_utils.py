@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pycocotools")
+
+from utils.general_utils import binary_mask_crop_to_rle_compressed, binary_mask_to_rle_compressed
+
+
+IMAGE_SIZE = (12, 9)
+
+
+def random_crop(rng: np.random.Generator, height: int, width: int):
+    return (rng.random((height, width)) < 0.5).astype(np.uint8)
+
+
+@pytest.mark.parametrize("offset, crop", [
+    # Interior crop
+    ((2, 3), random_crop(np.random.default_rng(0), 5, 4)),
+    # Crop spanning the full height, whose runs continue across columns
+    ((1, 0), np.ones((12, 3), dtype=np.uint8)),
+    # Crop starting at the first pixel
+    ((0, 0), random_crop(np.random.default_rng(1), 4, 3)),
+    # Crop reaching the last pixel
+    ((6, 8), np.ones((4, 3), dtype=np.uint8)),
+    # Empty crop
+    ((4, 4), np.zeros((3, 3), dtype=np.uint8)),
+    # Full image
+    ((0, 0), random_crop(np.random.default_rng(2), *IMAGE_SIZE)),
+])
+def test_crop_encoding_matches_full_image_encoding(offset, crop):
+    x0, y0 = offset
+    height, width = crop.shape
+    image_mask = np.zeros(IMAGE_SIZE, dtype=np.uint8)
+    image_mask[y0:y0 + height, x0:x0 + width] = crop
+
+    rle = binary_mask_crop_to_rle_compressed(crop, offset, IMAGE_SIZE)
+    expected = binary_mask_to_rle_compressed(image_mask)
+
+    assert rle["counts"] == expected["counts"]
+    assert list(rle["size"]) == list(expected["size"])
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from shapely import MultiPoint, Polygon, box
+
+from utils.geometry_utils import convex_clip_area, convex_intersection_area, non_max_suppression, triangulate_polygon
+
+
+def reference_non_max_suppression(boxes, priorities, classes, iou_threshold, containment_threshold=1.0):
+    """
+    Greedy non-maximum suppression with shapely boxes, one pair at a time.
+    """
+    polygons = [box(*coords) for coords in boxes]
+    keep = []
+    for index in sorted(range(len(boxes)), key=lambda i: -priorities[i]):
+        suppressed = False
+        for kept in keep:
+            if classes[kept] != classes[index]:
+                continue
+            intersection = polygons[kept].intersection(polygons[index]).area
+            union = polygons[kept].union(polygons[index]).area
+            smaller = min(polygons[kept].area, polygons[index].area)
+            if intersection / union > iou_threshold or intersection / smaller > containment_threshold:
+                suppressed = True
+                break
+        if not suppressed:
+            keep.append(index)
+
+    return keep
+
+
+def test_overlapping_boxes_of_the_same_class_are_suppressed():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [1, 1, 11, 11], [20, 20, 30, 30]], dtype=float)
+    priorities = np.array([0.5, 0.9, 0.8, 0.1])
+    classes = np.array([0, 0, 1, 0])
+
+    keep = non_max_suppression(boxes, priorities, classes, iou_threshold=0.5)
+
+    np.testing.assert_array_equal(keep, [1, 2, 3])
+
+
+def test_suppressed_boxes_do_not_suppress_others():
+    # Box 1 is suppressed by box 0 and would have suppressed box 2, which box 0 overlaps too little
+    boxes = np.array([[0, 0, 10, 10], [3, 0, 13, 10], [6, 0, 16, 10]], dtype=float)
+    priorities = np.array([0.9, 0.8, 0.7])
+    classes = np.zeros(3, dtype=int)
+
+    keep = non_max_suppression(boxes, priorities, classes, iou_threshold=0.4)
+
+    np.testing.assert_array_equal(keep, [0, 2])
+
+
+def test_contained_fragments_are_suppressed():
+    # Fragment cut off at a tile seam, with an IoU of 0.2 but covered by the complete box
+    boxes = np.array([[0, 0, 10, 10], [8, 0, 10, 10]], dtype=float)
+    priorities = np.array([0.9, 0.95])
+    classes = np.zeros(2, dtype=int)
+
+    np.testing.assert_array_equal(non_max_suppression(boxes, priorities, classes, iou_threshold=0.5), [1, 0])
+    np.testing.assert_array_equal(non_max_suppression(boxes, priorities, classes, iou_threshold=0.5, containment_threshold=0.8), [1])
+
+
+def test_matches_pairwise_reference():
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 100, size=(60, 2))
+    boxes = np.column_stack([corners, corners + rng.uniform(5, 40, size=(60, 2))])
+    priorities = rng.random(60)
+    classes = rng.integers(0, 3, size=60)
+
+    for iou_threshold, containment_threshold in ((0.5, 1.0), (0.3, 0.7), (0.7, 0.9)):
+        keep = non_max_suppression(boxes, priorities, classes, iou_threshold, containment_threshold)
+        expected = reference_non_max_suppression(boxes, priorities, classes, iou_threshold, containment_threshold)
+
+        np.testing.assert_array_equal(keep, expected)
+
+
+def test_convex_clip_area_matches_geos_and_the_batched_kernel():
+    rng = np.random.default_rng(0)
+    subjects, clips = [], []
+    for _ in range(100):
+        # Convex hulls of random points, the subjects in either orientation
+        subject = np.array(MultiPoint(rng.uniform(0, 10, size=(5, 2))).convex_hull.exterior.coords)[:-1]
+        clip = np.array(MultiPoint(rng.uniform(3, 13, size=(6, 2))).convex_hull.exterior.coords)[:-1][::-1]
+        subjects.append(subject[::rng.choice([-1, 1])])
+        clips.append(clip if Polygon(clip).exterior.is_ccw else clip[::-1])
+
+    areas = [convex_clip_area(subject.tolist(), clip.tolist()) for subject, clip in zip(subjects, clips)]
+    expected = [Polygon(subject).intersection(Polygon(clip)).area for subject, clip in zip(subjects, clips)]
+
+    np.testing.assert_allclose(areas, expected, atol=1e-9)
+    for subject, clip, area in zip(subjects[:10], clips[:10], areas):
+        assert convex_intersection_area(subject, clip) == pytest.approx(area)
+
+
+def test_triangulation_covers_a_polygon_with_collinear_vertices():
+    # A comb whose teeth end on the same lines
+    vertices = np.array([[0, 0], [6, 0], [6, 3], [5, 3], [5, 1], [4, 1], [4, 3], [2, 3], [2, 1], [1, 1], [1, 3], [0, 3]], dtype=float)
+
+    triangles = triangulate_polygon(vertices)
+
+    assert sum(Polygon(vertices[triangle]).area for triangle in triangles) == pytest.approx(Polygon(vertices).area)
+
+
+def test_triangulation_rejects_polygons_without_ears():
+    clockwise = np.array([[0, 0], [0, 1], [1, 1], [1, 0]], dtype=float)
+
+    with pytest.raises(ValueError):
+        triangulate_polygon(clockwise)
@@ -0,0 +1,36 @@
+import numpy as np
+
+from tools.latency_histogram import LatencyHistogram
+
+
+def test_quantiles_are_upper_bounds_within_one_bucket():
+    histogram = LatencyHistogram(min_latency=1e-3, max_latency=1e3, buckets_per_decade=10)
+    latencies = np.random.default_rng(0).lognormal(mean=-3, sigma=1.5, size=5000)
+    for latency in latencies:
+        histogram.record(latency)
+
+    assert histogram.count == 5000
+    np.testing.assert_allclose(histogram.mean(), latencies.mean())
+    for q in (0.5, 0.9, 0.99):
+        exact = np.quantile(latencies, q)
+        # One bucket spans a factor of 10 ** 0.1
+        assert exact <= histogram.quantile(q) <= exact * 10 ** 0.1 * (1 + 1e-9)
+
+
+def test_latencies_outside_the_range_fall_into_the_outer_buckets():
+    histogram = LatencyHistogram(min_latency=1e-3, max_latency=1.0, buckets_per_decade=1)
+    histogram.record(1e-5)
+    histogram.record(50.0)
+
+    summary = histogram.to_dict()
+
+    assert summary["buckets"] == [[1e-3, 1], [None, 1]]
+    assert histogram.quantile(0.25) == 1e-3
+    # The unbounded bucket is reported at the upper end of the range
+    assert histogram.quantile(1.0) == 1.0
+
+
+def test_empty_histogram():
+    summary = LatencyHistogram().to_dict()
+
+    assert summary == {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "buckets": []}
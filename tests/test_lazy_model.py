@@ -0,0 +1,53 @@
+import threading
+import time
+
+from tools.lazy_model import LazyModel
+from tools.startup_profiler import StartupProfiler
+
+
+def test_model_is_created_on_first_use():
+    created = []
+    model = LazyModel(lambda: created.append(1) or "model")
+
+    assert not model.is_loaded
+    assert created == []
+    assert model.get() == "model"
+    assert model.get() == "model"
+    assert model.is_loaded
+    assert created == [1]
+
+
+def test_concurrent_first_uses_create_the_model_once():
+    created = []
+
+    def factory():
+        created.append(1)
+        time.sleep(0.05)
+        return object()
+
+    model = LazyModel(factory)
+    start = threading.Barrier(8)
+    results = []
+
+    def use():
+        start.wait()
+        results.append(model.get())
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_load_is_recorded_by_the_profiler():
+    profiler = StartupProfiler()
+    model = LazyModel(lambda: "model", name="detector", profiler=profiler)
+
+    model.get()
+    model.get()
+
+    assert [record[3] for record in profiler.records] == ["load detector"]
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from shapely import Polygon, box
+from shapely.geometry.base import BaseGeometry
+
+from optimizers.cma_es_optimizer import CMAESOptimizer
+from optimizers.differential_evolution_optimizer import DifferentialEvolutionOptimizer
+from optimizers.dual_annealing_optimizer import DualAnnealingOptimizer
+from tests.conftest import overlay_ciou_loss
+from tools.contour_overlap import ContourOverlap
+from tools.convex_clip_overlap import ConvexClipOverlap
+from tools.mask_contours import MaskContours
+from tools.parameter_extractor import ParameterExtractor
+from tools.raster_overlap import RasterOverlap
+
+
+# Maximum absolute deviation of the loss from the overlay baseline per backend
+TOLERANCES = {
+    "shapely": 1e-12,
+    "raster": 1e-2,
+    "convex": 1e-12,
+    "contour": 2e-3,
+}
+
+
+def make_extractor(reference_polygon, template, backend: str = "shapely"):
+    # The losses do not depend on the optimizer, which only has to accept every backend
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, loss_backend=backend, optimizer=DifferentialEvolutionOptimizer())
+    extractor.set_reference(reference_polygon, template)
+
+    return extractor
+
+
+@pytest.mark.parametrize("backend", TOLERANCES)
+def test_loss_matches_overlay_baseline(backend, template, reference_polygon, candidates):
+    extractor = make_extractor(reference_polygon, template, backend)
+
+    baseline_losses = [overlay_ciou_loss(extractor, params, template) for params in candidates]
+    losses = [extractor.ciou_loss(params, template) for params in candidates]
+
+    np.testing.assert_allclose(losses, baseline_losses, rtol=0, atol=TOLERANCES[backend])
+
+
+def test_loss_vanishes_for_exact_fit(template, shape_params):
+    params = [500, 400] + shape_params
+    extractor = make_extractor(template.make_polygon_from_params(params), template)
+
+    assert extractor.ciou_loss(params, template) == pytest.approx(0, abs=1e-12)
+    assert extractor.ciou_loss(np.add(params, [20, 0] + [0] * len(shape_params)), template) > 0
+
+
+def test_raster_backend_requires_a_batched_optimizer():
+    with pytest.raises(ValueError, match="batched optimizer"):
+        ParameterExtractor(1.0, 1.0, 1.0, loss_backend="raster")
+    with pytest.raises(ValueError, match="batched optimizer"):
+        ParameterExtractor(1.0, 1.0, 1.0, loss_backend="raster", optimizer=DualAnnealingOptimizer())
+
+    for optimizer in (DifferentialEvolutionOptimizer(), CMAESOptimizer()):
+        assert ParameterExtractor(1.0, 1.0, 1.0, loss_backend="raster", optimizer=optimizer).optimizer is optimizer
+    assert ParameterExtractor(1.0, 1.0, 1.0, loss_backend="shapely", optimizer=DualAnnealingOptimizer())
+
+
+def test_raster_overlap_clips_edges_to_the_grid():
+    reference_polygon = Polygon([(0, 0), (100, 0), (100, 50), (0, 50)])
+    overlap = RasterOverlap(reference_polygon, resolution=64)
+
+    # Edges beyond the grid, in both orientations, and a candidate beside the reference
+    enclosing = np.array([[-10, -10], [110, -10], [110, 60], [-10, 60]], dtype=float)
+    half = np.array([[50, -10], [150, -10], [150, 60], [50, 60]], dtype=float)
+    disjoint = enclosing + [300, 0]
+
+    assert overlap.intersection_area(enclosing) == pytest.approx(overlap.area)
+    assert overlap.intersection_area(enclosing[::-1]) == pytest.approx(overlap.area)
+    assert overlap.intersection_area(half) == pytest.approx(2500)
+    assert overlap.intersection_area(disjoint) == 0
+
+    batch = overlap.intersection_area(np.stack([enclosing, half, disjoint]))
+    np.testing.assert_allclose(batch, [overlap.area, 2500, 0])
+
+
+def test_convex_overlap_matches_geos_for_reference_with_hole(template, reference_polygon, candidates, monkeypatch):
+    reference_polygon = Polygon(reference_polygon.exterior, [reference_polygon.centroid.buffer(15, 3).exterior.coords])
+    overlap = ConvexClipOverlap(reference_polygon, template)
+
+    vertices = template.make_vertices_batch(candidates[:20])
+    expected = [reference_polygon.intersection(Polygon(candidate)).area for candidate in vertices]
+
+    # Scalar candidates are clipped in plain Python, batches by the NumPy kernel, neither by GEOS
+    monkeypatch.setattr(BaseGeometry, "intersection", lambda *args: pytest.fail("GEOS intersection"))
+    np.testing.assert_allclose([overlap.intersection_area(candidate) for candidate in vertices], expected, atol=1e-6)
+    np.testing.assert_allclose(overlap.intersection_area(vertices), expected, atol=1e-6)
+
+
+def test_contour_overlap_is_exact_for_the_mask_contours():
+    mask = np.zeros((60, 80), dtype=np.uint8)
+    mask[20:50, 10:60] = 1
+    mask[30:40, 30:40] = 0
+    offset = (100, 200)
+
+    # The contours run through the centers of the boundary pixels, around the hole as well
+    mask_contours = MaskContours(mask, offset)
+    hole, exterior = sorted(mask_contours.contours, key=lambda contour: Polygon(contour).area)
+    contour_polygon = Polygon(exterior, [hole])
+    assert Polygon(exterior).equals(box(110, 220, 159, 249))
+
+    overlap = ContourOverlap(contour_polygon, mask_contours, contour_tolerance=0)
+    assert overlap.area == pytest.approx(contour_polygon.area)
+
+    rng = np.random.default_rng(0)
+    corners = np.array([[0, 0], [30, 0], [30, 20], [0, 20]], dtype=float)
+    vertices = corners + rng.uniform([90, 200], [160, 250], size=(50, 1, 2)) + rng.normal(scale=3, size=(50, 4, 2))
+    vertices[::2] = vertices[::2, ::-1]
+    expected = [contour_polygon.intersection(Polygon(candidate)).area for candidate in vertices]
+
+    np.testing.assert_allclose([overlap.intersection_area(candidate) for candidate in vertices], expected, atol=1e-6)
+    np.testing.assert_allclose(overlap.intersection_area(vertices), expected, atol=1e-6)
+
+
+def test_vertex_batch_matches_single_vertices(template, candidates):
+    expected = np.stack([template.make_vertices_from_params(params) for params in candidates])
+
+    np.testing.assert_allclose(template.make_vertices_batch(candidates), expected, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("backend", ParameterExtractor.LOSS_BACKENDS)
+def test_batch_loss_matches_scalar_loss(backend, template, reference_polygon, candidates):
+    extractor = make_extractor(reference_polygon, template, backend)
+    losses = [extractor.ciou_loss(params, template) for params in candidates]
+
+    np.testing.assert_allclose(extractor.ciou_loss_batch(candidates, template), losses, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(extractor.ciou_loss_batch(candidates, template, chunk_size=7), losses, rtol=0, atol=1e-9)
+    assert extractor.ciou_loss_batch(candidates[0], template).shape == (1,)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from shapely import Polygon, box
+
+from tools.mask_contours import MaskContours
+from tools.parameter_extractor import ParameterExtractor
+
+
+@pytest.fixture
+def square_mask():
+    """
+    Mask of the pixels with centers in [5, 14] x [5, 14].
+    """
+    mask = np.zeros((30, 30), dtype=np.uint8)
+    mask[5:15, 5:15] = 1
+
+    return mask
+
+
+def test_contours_run_through_the_boundary_pixel_centers_in_image_coordinates(square_mask):
+    (contour,) = MaskContours(square_mask, offset=(100, 50)).contours
+
+    assert Polygon(contour).equals(box(105, 55, 114, 64))
+
+
+def test_contours_include_holes_and_masks_touching_the_border(square_mask):
+    square_mask[8:11, 8:11] = 0
+    square_mask[20:, 25:] = 1
+
+    contours = MaskContours(square_mask).contours
+
+    # The hole is bounded by the centers of its neighbouring pixels, with the diagonal corners cut
+    assert sorted(Polygon(contour).area for contour in contours) == [14, 36, 81]
+
+
+def test_cache_key_identifies_the_mask_relative_to_the_origin(square_mask):
+    key = MaskContours(square_mask, offset=(3, 4)).cache_key((1, 1))
+
+    assert MaskContours(square_mask.copy(), offset=(103, 54)).cache_key((101, 51)) == key
+    assert MaskContours(square_mask, offset=(3, 4)).cache_key((0, 1)) != key
+
+    square_mask[5, 5] = 0
+    assert MaskContours(square_mask, offset=(3, 4)).cache_key((1, 1)) != key
+
+
+def test_polygon_contours_follow_the_polygon_boundary():
+    polygon = box(10.3, 20.6, 60.2, 45.1)
+
+    (contour,) = MaskContours.from_polygon(polygon).contours
+
+    assert Polygon(contour).hausdorff_distance(polygon) < 1
+
+
+def test_loss_is_close_to_the_exact_loss_near_the_reference(template, shape_params, rng):
+    reference_polygon = template.make_polygon_from_params([500, 400] + shape_params)
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, loss_backend="contour")
+    extractor.set_reference(reference_polygon, template)
+    exact = ParameterExtractor(1.0, 1.0, 1.0)
+    exact.set_reference(reference_polygon, template)
+
+    for _ in range(20):
+        params = np.array([500, 400] + shape_params) * (1 + rng.normal(scale=0.02, size=len(shape_params) + 2))
+
+        assert extractor.ciou_loss(params, template) == pytest.approx(exact.ciou_loss(params, template), abs=2e-3)
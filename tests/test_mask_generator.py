@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("segment_anything")
+
+from tools.mask_generator import MaskGenerator
+
+
+IMAGE = np.random.default_rng(0).integers(0, 255, size=(120, 200, 3), dtype=np.uint8)
+
+
+@pytest.fixture(scope="module")
+def mask_generator(sam_checkpoint):
+    generator = MaskGenerator(sam_checkpoint, "vit_b", "cpu")
+    generator.set_image(IMAGE)
+
+    return generator
+
+
+BOXES = np.array([[10, 10, 80, 60], [50, 20, 190, 110], [0, 0, 200, 120]], dtype=float)
+
+
+def test_predict_boxes_matches_predict_per_box(mask_generator):
+    masks, scores, logits = mask_generator.predict_boxes(BOXES)
+
+    assert masks.shape == (3, 1, 120, 200)
+    for index, box in enumerate(BOXES):
+        box_masks, box_scores, box_logits = mask_generator.predict(box=box, multimask_output=False)
+
+        np.testing.assert_array_equal(masks[index], box_masks)
+        np.testing.assert_allclose(scores[index], box_scores, atol=1e-5)
+        np.testing.assert_allclose(logits[index], box_logits, atol=1e-4)
+
+
+@pytest.mark.parametrize("multimask_output, num_masks", [(False, 1), (True, 3)])
+def test_predict_boxes_without_boxes_returns_empty_arrays(mask_generator, multimask_output, num_masks):
+    masks, scores, logits = mask_generator.predict_boxes(np.zeros((0, 4)), multimask_output)
+
+    assert masks.shape == (0, num_masks, 120, 200)
+    assert scores.shape == (0, num_masks)
+    assert logits.shape == (0, num_masks, 256, 256)
+
+
+def test_cached_embedding_restores_the_predictor_state(sam_checkpoint, mask_generator, tmp_path):
+    computing = MaskGenerator(sam_checkpoint, "vit_b", "cpu", cache_dir=tmp_path)
+    computing.set_image(IMAGE)
+    loading = MaskGenerator(sam_checkpoint, "vit_b", "cpu", cache_dir=tmp_path)
+    loading.set_image(IMAGE)
+
+    assert (computing.embedding_cache.misses, loading.embedding_cache.hits) == (1, 1)
+    assert loading.original_size == mask_generator.original_size
+    assert loading.input_size == mask_generator.input_size
+
+    masks, scores, _ = loading.predict_boxes(BOXES)
+    expected_masks, expected_scores, _ = mask_generator.predict_boxes(BOXES)
+    np.testing.assert_array_equal(masks, expected_masks)
+    np.testing.assert_allclose(scores, expected_scores, atol=1e-5)
+
+
+def test_predict_crops_returns_masks_in_crop_coordinates(sam_checkpoint):
+    boxes = np.array([[20, 30, 60, 50], [150, 80, 200, 120]], dtype=float)
+
+    # Embeds each crop, so the shared generator keeps the embedding of the whole image
+    masks, scores, offsets = MaskGenerator(sam_checkpoint, "vit_b", "cpu").predict_crops(IMAGE, boxes, padding=0.5)
+
+    # Margins of half the longer box side, clipped to the image
+    assert offsets == [(0, 10), (125, 55)]
+    assert [mask.shape for mask in masks] == [(1, 60, 80), (1, 65, 75)]
+    assert scores.shape == (2, 1)
+
+
+def test_predict_boxes_batch_matches_images_set_one_at_a_time(sam_checkpoint, mask_generator):
+    images = [IMAGE, IMAGE[:90, 30:].copy()]
+    boxes = [BOXES, BOXES[:2] / 2]
+
+    results = list(mask_generator.predict_boxes_batch(images, boxes))
+
+    generator = MaskGenerator(sam_checkpoint, "vit_b", "cpu")
+    for image, image_boxes, (masks, scores, _) in zip(images, boxes, results):
+        generator.set_image(image)
+        expected_masks, expected_scores, _ = generator.predict_boxes(image_boxes)
+
+        assert masks.shape == expected_masks.shape
+        # Batched convolutions may differ in the last digits
+        assert (masks == expected_masks).mean() > 0.999
+        np.testing.assert_allclose(scores, expected_scores, atol=1e-4)
+
+
+def test_embed_images_encodes_only_uncached_images(sam_checkpoint, tmp_path):
+    generator = MaskGenerator(sam_checkpoint, "vit_b", "cpu", cache_dir=tmp_path)
+    generator.set_image(IMAGE)
+    other_image = IMAGE[::-1].copy()
+
+    embeddings = generator.embed_images([IMAGE, other_image])
+
+    assert (generator.embedding_cache.hits, generator.embedding_cache.misses) == (1, 2)
+    assert [tuple(embedding.shape) for embedding in embeddings] == [(1, 256, 64, 64)] * 2
+    np.testing.assert_allclose(np.asarray(embeddings[0]), generator.features.cpu().numpy())
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("segment_anything")
+pytest.importorskip("onnxruntime")
+
+from export import export_sam
+from tools.mask_generator import MaskGenerator
+from tools.onnx_mask_generator import OnnxMaskGenerator
+
+
+IMAGE = np.random.default_rng(0).integers(0, 255, size=(120, 200, 3), dtype=np.uint8)
+BOXES = np.array([[10, 10, 80, 60], [50, 20, 190, 110]], dtype=float)
+
+
+@pytest.fixture(scope="module")
+def exported_models(sam_checkpoint, tmp_path_factory):
+    encoder_path, decoder_path = export_sam(sam_checkpoint, "vit_b", tmp_path_factory.mktemp("onnx"))
+    return str(encoder_path), str(decoder_path)
+
+
+@pytest.fixture(scope="module")
+def mask_generators(sam_checkpoint, exported_models):
+    torch_generator = MaskGenerator(sam_checkpoint, "vit_b", "cpu")
+    torch_generator.set_image(IMAGE)
+    onnx_generator = OnnxMaskGenerator(*exported_models)
+    onnx_generator.set_image(IMAGE)
+
+    return torch_generator, onnx_generator
+
+
+def test_embedding_matches_pytorch_model(mask_generators):
+    torch_generator, onnx_generator = mask_generators
+
+    assert onnx_generator.original_size == torch_generator.original_size
+    assert onnx_generator.input_size == torch_generator.input_size
+    np.testing.assert_allclose(onnx_generator.features.numpy(), torch_generator.features.cpu().numpy(), atol=1e-3)
+
+
+@pytest.mark.parametrize("multimask_output", [False, True])
+def test_box_prompts_match_pytorch_model(mask_generators, multimask_output):
+    torch_generator, onnx_generator = mask_generators
+
+    masks, scores, logits = onnx_generator.predict_boxes(BOXES, multimask_output)
+    expected_masks, expected_scores, expected_logits = torch_generator.predict_boxes(BOXES, multimask_output)
+
+    assert masks.shape == expected_masks.shape
+    np.testing.assert_allclose(scores, expected_scores, atol=1e-3)
+    np.testing.assert_allclose(logits, expected_logits, atol=1e-2)
+    # Pixels with logits close to the threshold may flip
+    assert (masks == expected_masks).mean() > 0.99
+
+
+def test_point_prompts_match_pytorch_model(mask_generators):
+    torch_generator, onnx_generator = mask_generators
+    points = np.array([[40, 30], [120, 60]], dtype=float)
+    labels = np.array([1, 0])
+
+    _, scores, logits = onnx_generator.predict(point_coords=points, point_labels=labels)
+    _, expected_scores, expected_logits = torch_generator.predict(point_coords=points, point_labels=labels)
+
+    np.testing.assert_allclose(scores, expected_scores, atol=1e-3)
+    np.testing.assert_allclose(logits, expected_logits, atol=1e-2)
+
+
+def test_cached_embedding_is_used_by_the_onnx_runtime(exported_models, mask_generators, tmp_path):
+    _, onnx_generator = mask_generators
+    OnnxMaskGenerator(*exported_models, cache_dir=tmp_path).set_image(IMAGE)
+    loading = OnnxMaskGenerator(*exported_models, cache_dir=tmp_path)
+    loading.set_image(IMAGE)
+
+    assert loading.embedding_cache.hits == 1
+    np.testing.assert_array_equal(loading.predict_boxes(BOXES)[0], onnx_generator.predict_boxes(BOXES)[0])
+
+
+def test_predict_boxes_batch_matches_images_set_one_at_a_time(exported_models):
+    images = [IMAGE, IMAGE[:90, 30:].copy()]
+    boxes = [BOXES, BOXES / 2]
+
+    results = list(OnnxMaskGenerator(*exported_models).predict_boxes_batch(images, boxes))
+
+    generator = OnnxMaskGenerator(*exported_models)
+    for image, image_boxes, (masks, scores, _) in zip(images, boxes, results):
+        generator.set_image(image)
+        expected_masks, expected_scores, _ = generator.predict_boxes(image_boxes)
+
+        np.testing.assert_array_equal(masks, expected_masks)
+        np.testing.assert_allclose(scores, expected_scores, atol=1e-6)
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from optimizers.cma_es_optimizer import CMAESOptimizer
+from optimizers.differential_evolution_optimizer import DifferentialEvolutionOptimizer
+from optimizers.dual_annealing_optimizer import DualAnnealingOptimizer
+
+
+BOUNDS = [[-5.0, 5.0], [-5.0, 5.0], [0.0, 10.0], [0.0, 10.0]]
+TARGET = np.array([1.5, -2.0, 3.0, 7.5])
+
+
+def make_quadratic(target: np.ndarray, condition: float = 1.0, seed: int = 0):
+    """
+    Creates a scalar and a batched convex quadratic with its minimum at `target`, rotated
+    randomly and with the given condition number of its Hessian.
+    """
+    n = len(target)
+    rotation, _ = np.linalg.qr(np.random.default_rng(seed).standard_normal((n, n)))
+    hessian = rotation @ np.diag(np.logspace(0, np.log10(condition), n)) @ rotation.T
+
+    def loss_batch(params_matrix):
+        steps = np.atleast_2d(params_matrix) - target
+        return np.einsum("ij,jk,ik->i", steps, hessian, steps)
+
+    return (lambda params: float(loss_batch(params)[0])), loss_batch
+
+
+@pytest.mark.parametrize("optimizer", [
+    DualAnnealingOptimizer(maxiter=200, seed=0),
+    DifferentialEvolutionOptimizer(seed=0),
+    CMAESOptimizer(seed=0),
+], ids=lambda optimizer: type(optimizer).__name__)
+def test_strategies_find_the_minimum_of_a_quadratic(optimizer):
+    loss, loss_batch = make_quadratic(TARGET)
+
+    result = optimizer.minimize(loss, loss_batch, BOUNDS, x0=np.mean(BOUNDS, axis=1))
+
+    np.testing.assert_allclose(result.x, TARGET, atol=1e-3)
+    assert result.fun < 1e-6
+
+
+@pytest.mark.parametrize("condition", [1.0, 1e3])
+def test_cma_es_converges_on_rotated_quadratic(condition):
+    loss, loss_batch = make_quadratic(TARGET, condition)
+
+    result = CMAESOptimizer(maxiter=1000, seed=1).minimize(loss, loss_batch, BOUNDS, x0=[0, 0, 5, 5])
+
+    np.testing.assert_allclose(result.x, TARGET, atol=1e-3)
+    assert result.fun < 1e-6
+    assert result.message != "Maximum number of generations reached."
+
+
+def test_cma_es_stays_within_bounds():
+    # The unconstrained minimum lies beyond the upper bounds of the last two parameters
+    target = np.array([1.5, -2.0, 12.0, 15.0])
+    loss, loss_batch = make_quadratic(target)
+
+    evaluated = []
+    def recording_loss_batch(params_matrix):
+        evaluated.append(np.array(params_matrix))
+        return loss_batch(params_matrix)
+
+    result = CMAESOptimizer(seed=0).minimize(loss, recording_loss_batch, BOUNDS, x0=[0, 0, 5, 5])
+
+    evaluated = np.concatenate(evaluated)
+    lower, upper = np.transpose(BOUNDS)
+    assert np.all((evaluated >= lower) & (evaluated <= upper))
+    np.testing.assert_allclose(result.x, [1.5, -2.0, 10.0, 10.0], atol=1e-3)
+
+
+def test_cma_es_clips_initial_estimate_and_is_reproducible():
+    loss, loss_batch = make_quadratic(TARGET)
+
+    evaluated = []
+    def recording_loss_batch(params_matrix):
+        evaluated.append(np.array(params_matrix))
+        return loss_batch(params_matrix)
+
+    first = CMAESOptimizer(maxiter=20, seed=3).minimize(loss, recording_loss_batch, BOUNDS, x0=[-50, 50, 5, 5])
+    second = CMAESOptimizer(maxiter=20, seed=3).minimize(loss, loss_batch, BOUNDS, x0=[-50, 50, 5, 5])
+
+    # The search starts at the initial estimate, clipped to the bounds
+    np.testing.assert_array_equal(evaluated[0], [[-5, 5, 5, 5]])
+    np.testing.assert_array_equal(first.x, second.x)
+    assert first.nfev == second.nfev
+
+
+def test_cma_es_stops_on_callback():
+    loss, loss_batch = make_quadratic(TARGET)
+    generations = []
+
+    def callback(x, f):
+        generations.append(f)
+        return len(generations) == 3
+
+    result = CMAESOptimizer(seed=0).minimize(loss, loss_batch, BOUNDS, x0=[0, 0, 5, 5], callback=callback)
+
+    assert result.nit == 3
+    assert result.message == "Stopped by callback."
+    # The reported best loss never increases
+    assert generations == sorted(generations, reverse=True)
+
+
+def test_dual_annealing_reports_every_iteration_without_changing_the_search():
+    loss, loss_batch = make_quadratic(TARGET)
+    iterations = []
+
+    def callback(x, f):
+        iterations.append(f)
+
+    result = DualAnnealingOptimizer(maxiter=50, seed=0).minimize(loss, loss_batch, BOUNDS, x0=None, callback=callback)
+    expected = DualAnnealingOptimizer(maxiter=50, seed=0).minimize(loss, loss_batch, BOUNDS, x0=None)
+
+    assert len(iterations) == result.nit == 50
+    assert iterations == sorted(iterations, reverse=True)
+    # The reported loss includes the evaluations of the local searches
+    assert iterations[-1] <= result.fun
+    np.testing.assert_array_equal(result.x, expected.x)
+    assert result.nfev == expected.nfev
+
+
+def test_dual_annealing_stops_on_callback():
+    loss, loss_batch = make_quadratic(TARGET)
+    iterations = []
+
+    def callback(x, f):
+        iterations.append(f)
+        return len(iterations) == 3
+
+    result = DualAnnealingOptimizer(maxiter=50, seed=0).minimize(loss, loss_batch, BOUNDS, x0=None, callback=callback)
+
+    assert result.nit == 3
+    assert result.message == "Stopped by callback."
+    assert result.fun == iterations[-1]
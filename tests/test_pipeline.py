@@ -0,0 +1,240 @@
+import random
+import threading
+import time
+import pytest
+
+from tools.pipeline import Pipeline, PipelineStage
+
+
+def run(pipeline: Pipeline, items, timeout: float = 10.0, **kwargs):
+    """
+    Collects the outputs of a run in a separate thread, so that a stalled pipeline fails the test instead of hanging it.
+
+    Returns:
+        tuple: Outputs of the run and the exception that ended it, if any.
+    """
+    outputs = []
+    errors = []
+
+    def consume():
+        try:
+            for output in pipeline.run(items, **kwargs):
+                outputs.append(output)
+        except Exception as error:
+            errors.append(error)
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    consumer.join(timeout)
+    assert not consumer.is_alive(), "Pipeline did not finish"
+
+    return outputs, errors[0] if errors else None
+
+
+def sleepy(function, max_delay: float = 0.005):
+    """
+    Makes a worker factory whose workers take random time per item, so that items overtake each other.
+    """
+    def make_worker():
+        rng = random.Random(threading.get_ident())
+
+        def worker(item):
+            time.sleep(rng.uniform(0, max_delay))
+            return function(item)
+
+        return worker
+
+    return make_worker
+
+
+def test_outputs_keep_input_order_with_several_workers():
+    stages = [
+        PipelineStage("add", sleepy(lambda item: item + 1), workers=4),
+        PipelineStage("double", sleepy(lambda item: item * 2), workers=2),
+        PipelineStage("negate", sleepy(lambda item: -item), workers=3, queue_size=2),
+    ]
+    pipeline = Pipeline(stages, max_in_flight=8)
+
+    outputs, error = run(pipeline, range(200))
+
+    assert error is None
+    assert outputs == [-(item + 1) * 2 for item in range(200)]
+    assert [stage["processed"] for stage in pipeline.stats()] == [200, 200, 200]
+
+
+def test_end_of_input_stops_all_workers():
+    stages = [PipelineStage("first", sleepy(str), workers=5), PipelineStage("second", sleepy(len), workers=3)]
+    threads_before = threading.active_count()
+
+    for items in ([], [7], range(11)):
+        outputs, error = run(Pipeline(stages), items)
+
+        assert error is None
+        assert outputs == [len(str(item)) for item in items]
+        assert threading.active_count() == threads_before
+
+
+def test_failure_is_raised_when_the_failed_item_is_due():
+    def check(item):
+        if item == 6:
+            raise ValueError(item)
+        return item
+
+    seen = []
+    threads_before = threading.active_count()
+    stages = [
+        PipelineStage("check", sleepy(check), workers=3),
+        PipelineStage("record", sleepy(lambda item: seen.append(item) or item), workers=2),
+    ]
+
+    outputs, error = run(Pipeline(stages), range(100))
+
+    assert outputs == list(range(6))
+    assert isinstance(error, ValueError)
+    # Failed items skip the remaining stages
+    assert 6 not in seen
+    assert threading.active_count() == threads_before
+
+
+def test_failed_items_are_returned_in_order_when_requested():
+    def check(item):
+        if item % 5 == 3:
+            raise ValueError(item)
+        return item
+
+    seen = []
+    stages = [
+        PipelineStage("check", sleepy(check), workers=3),
+        PipelineStage("record", sleepy(lambda item: seen.append(item) or item), workers=2),
+    ]
+
+    outputs, error = run(Pipeline(stages), range(20), return_exceptions=True)
+
+    assert error is None
+    assert [isinstance(output, ValueError) for output in outputs] == [item % 5 == 3 for item in range(20)]
+    assert [output.args[0] for output in outputs if isinstance(output, ValueError)] == [3, 8, 13, 18]
+    assert sorted(seen) == [item for item in range(20) if item % 5 != 3]
+
+
+def test_failing_worker_setup_fails_its_items():
+    def make_worker():
+        raise RuntimeError("model not found")
+
+    outputs, error = run(Pipeline([PipelineStage("load", make_worker, workers=2)]), range(4))
+
+    assert outputs == []
+    assert str(error) == "model not found"
+
+    outputs, error = run(Pipeline([PipelineStage("load", make_worker, workers=2)]), range(4), return_exceptions=True)
+
+    assert error is None
+    assert [str(output) for output in outputs] == ["model not found"] * 4
+
+
+def test_batch_stage_takes_queued_items_up_to_the_batch_size():
+    batch_sizes = []
+
+    def make_batch_worker():
+        def worker(items):
+            batch_sizes.append(len(items))
+            time.sleep(0.01)
+            for item in items:
+                yield item * 2
+
+        return worker
+
+    stages = [PipelineStage("double", make_batch_worker, batch_size=4, queue_size=8)]
+    outputs, error = run(Pipeline(stages, max_in_flight=8), range(40))
+
+    assert error is None
+    assert outputs == [item * 2 for item in range(40)]
+    assert sum(batch_sizes) == 40
+    assert max(batch_sizes) == 4
+
+
+def test_batch_waits_for_items_arriving_one_at_a_time():
+    batch_sizes = []
+
+    def make_batch_worker():
+        def worker(items):
+            batch_sizes.append(len(items))
+            yield from items
+
+        return worker
+
+    def trickle():
+        for item in range(10):
+            time.sleep(0.01)
+            yield item
+
+    for max_wait, expected_batch_sizes in ((0.0, [1] * 10), (1.0, [4, 4, 2])):
+        batch_sizes.clear()
+        pipeline = Pipeline([PipelineStage("collect", make_batch_worker, batch_size=4, max_wait=max_wait)])
+
+        outputs, error = run(pipeline, trickle())
+
+        assert outputs == list(range(10))
+        assert batch_sizes == expected_batch_sizes
+        stats = pipeline.stats()[0]
+        assert stats["batch_size"] == 10 / len(expected_batch_sizes)
+        assert stats["wait_latency"]["count"] == stats["process_latency"]["count"] == 10
+
+
+def test_batch_outputs_are_passed_on_as_they_are_yielded():
+    first_output_received = threading.Event()
+
+    def make_batch_worker():
+        def worker(items):
+            yield items[0]
+            # Blocks the rest of the batch until the first output has left the pipeline
+            assert first_output_received.wait(5)
+            yield from items[1:]
+
+        return worker
+
+    def consume():
+        for output in pipeline.run(range(2)):
+            outputs.append(output)
+            first_output_received.set()
+
+    outputs = []
+    pipeline = Pipeline([PipelineStage("stream", make_batch_worker, batch_size=2)])
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    consumer.join(10)
+
+    assert outputs == [0, 1]
+
+
+def test_batch_with_missing_outputs_fails():
+    def make_worker():
+        def worker(items):
+            yield from items[:-1]
+
+        return worker
+
+    outputs, error = run(Pipeline([PipelineStage("short", make_worker, batch_size=8)]), [1])
+
+    assert outputs == []
+    assert isinstance(error, RuntimeError)
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 3])
+def test_stalled_consumer_stops_the_source(max_in_flight):
+    pulled = []
+
+    def source():
+        for item in range(30):
+            pulled.append(item)
+            yield item
+
+    pipeline = Pipeline([PipelineStage("copy", sleepy(lambda item: item), workers=4)], max_in_flight=max_in_flight)
+    outputs = pipeline.run(source())
+
+    assert next(outputs) == 0
+    time.sleep(0.3)
+    # The first output left the pipeline, the others wait for the consumer
+    assert len(pulled) == max_in_flight + 1
+
+    outputs.close()
+    assert len(pulled) == max_in_flight + 1
@@ -0,0 +1,186 @@
+import threading
+from pathlib import Path
+import cv2
+import numpy as np
+import pytest
+import yaml
+
+from tools.cross_section_reconstructor import CrossSectionReconstructor, CSV_HEADER
+from tools.fit_cache import FitCache
+from tools.pipeline import Pipeline, PipelineStage
+from tools.reconstruction_service import ReconstructionClient, ReconstructionService, make_server, parse_address
+
+
+def encode_image(height: int, width: int):
+    return cv2.imencode(".png", np.zeros((height, width, 3), dtype=np.uint8))[1].tobytes()
+
+
+def make_reconstructor(stages=None, max_in_flight: int = 16):
+    """
+    Creates a reconstructor whose pipeline decodes the drawings but detects no cross-sections,
+    or runs the given stages instead, so that no models are loaded.
+    """
+    with open(Path(__file__).parents[1] / "default.yaml") as config_file:
+        reconstructor = CrossSectionReconstructor(yaml.safe_load(config_file))
+
+    if stages is None:
+        stages = [
+            PipelineStage("decode", lambda: reconstructor.read_image, workers=2),
+            PipelineStage("detect", lambda: lambda item: (*item, []), workers=2),
+        ]
+    reconstructor.pipeline = Pipeline(stages, max_in_flight)
+
+    return reconstructor
+
+
+@pytest.fixture
+def service():
+    service = ReconstructionService(make_reconstructor())
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def server_address(service, tmp_path):
+    address = f"unix:{tmp_path / 'service.sock'}"
+    server = make_server(service, address)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield address
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_failed_drawing_fails_only_its_future(service):
+    futures = [
+        service.submit(("first.png", encode_image(8, 10))),
+        service.submit(("broken.png", b"not an image")),
+        service.submit(("last.png", encode_image(4, 6))),
+    ]
+
+    img_path, img, boxes = futures[0].result(timeout=10)
+    assert (img_path.name, img.shape, boxes) == ("first.png", (8, 10, 3), [])
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=10)
+    assert futures[2].result(timeout=10)[1].shape == (4, 6, 3)
+
+
+def test_concurrent_requests_share_the_pipeline(service):
+    results = {}
+
+    def request(name):
+        future = service.submit((f"{name}.png", encode_image(5, 5)))
+        results[name] = future.result(timeout=10)[0].name
+
+    threads = [threading.Thread(target=request, args=(f"drawing{index}",)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {f"drawing{index}": f"drawing{index}.png" for index in range(8)}
+    assert service.reconstructor.pipeline.stats()[0]["processed"] == 8
+
+
+@pytest.mark.parametrize("fairness, weight, expected_order", [
+    ("fifo", 1.0, ["a0", "b0", "b1", "b2", "b3", "c0", "c1", "c2"]),
+    ("fair", 1.0, ["a0", "b0", "c0", "b1", "c1", "b2", "c2", "b3"]),
+    ("fair", 2.0, ["a0", "b0", "c0", "c1", "b1", "c2", "b2", "b3"]),
+])
+def test_jobs_are_scheduled_by_the_fairness_policy(fairness, weight, expected_order):
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def record(source):
+        order.append(source)
+        if source == "a0":
+            # Holds the only slot of the pipeline until the other jobs are queued
+            started.set()
+            assert release.wait(10)
+        return source
+
+    service = ReconstructionService(make_reconstructor([PipelineStage("record", lambda: record)], max_in_flight=1), fairness)
+    try:
+        futures = service.submit_batch(["a0"])
+        assert started.wait(10)
+        futures += service.submit_batch(["b0", "b1", "b2", "b3"])
+        futures += service.submit_batch(["c0", "c1", "c2"], weight)
+        release.set()
+
+        assert [future.result(timeout=10) for future in futures] == ["a0", "b0", "b1", "b2", "b3", "c0", "c1", "c2"]
+    finally:
+        service.close()
+
+    assert order == expected_order
+
+
+def test_invalid_jobs_are_rejected(service):
+    with pytest.raises(ValueError):
+        ReconstructionService(make_reconstructor(), fairness="random")
+    with pytest.raises(ValueError):
+        service.submit("drawing.png", weight=0.0)
+    assert service.submit_batch([]) == []
+
+
+def test_client_receives_results_in_request_order(server_address, tmp_path):
+    paths = []
+    for index, width in enumerate([7, 9]):
+        paths.append(tmp_path / f"drawing{index}.png")
+        paths[-1].write_bytes(encode_image(5, width))
+
+    client = ReconstructionClient(server_address, timeout=10)
+
+    for send_data in (False, True):
+        image_results = list(client.reconstruct(paths, send_data=send_data))
+
+        assert [image_result["file_name"] for image_result in image_results] == ["drawing0.png", "drawing1.png"]
+        assert [image_result["width"] for image_result in image_results] == [7, 9]
+        assert image_results[0]["csv"] == [CSV_HEADER]
+
+
+def test_client_raises_failures_of_the_service(server_address, tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+
+    with pytest.raises(RuntimeError, match="broken.png"):
+        list(ReconstructionClient(server_address, timeout=10).reconstruct([path], send_data=True))
+
+
+def test_health_reports_unloaded_models(server_address):
+    health = ReconstructionClient(server_address, timeout=10).health()
+
+    assert health["status"] == "ok"
+    assert not any(health["models"].values())
+
+
+def test_stats_report_the_stages_and_the_result_cache_of_the_service(service, server_address, tmp_path):
+    path = tmp_path / "drawing.png"
+    path.write_bytes(encode_image(5, 5))
+    client = ReconstructionClient(server_address, timeout=10)
+    list(client.reconstruct([path, path]))
+
+    stats = client.stats()
+
+    stages = stats["stages"]
+    assert [stage["name"] for stage in stages] == ["decode", "detect"]
+    assert [stage["processed"] for stage in stages] == [2, 2]
+    assert stages[0]["wait_latency"]["count"] == 2
+    assert stats["result_cache"] is None
+
+    service.reconstructor.result_cache = FitCache(tmp_path / "fits.sqlite")
+    try:
+        assert client.stats()["result_cache"] == {"entries": 0, "hits": 0, "misses": 0, "hit_rate": 0.0}
+    finally:
+        service.reconstructor.result_cache.close()
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/service.sock") == ("unix", "/tmp/service.sock")
+    assert parse_address("http://localhost:9000") == ("http", ("localhost", 9000))
+    assert parse_address("http://127.0.0.1") == ("http", ("127.0.0.1", 80))
+    with pytest.raises(ValueError):
+        parse_address("localhost:9000")
@@ -0,0 +1,91 @@
+import copy
+import pickle
+import sys
+from importlib.metadata import EntryPoint
+import numpy as np
+import pytest
+
+from templates import registry
+from templates.base_template import BaseTemplate
+from templates.registry import get_template, template_classes
+from tools.parameter_extractor import ParameterExtractor
+
+
+@pytest.mark.parametrize("class_id", sorted(template_classes()))
+def test_pickled_template_resolves_to_the_shared_instance(class_id):
+    template = get_template(class_id)
+
+    assert isinstance(template, template_classes()[class_id])
+    assert pickle.loads(pickle.dumps(template)) is template
+
+
+def test_fits_leave_the_shared_template_unchanged(template, shape_params):
+    template = get_template(type(template).CLASS_ID)
+    state = copy.deepcopy(vars(template))
+    reference_polygon = template.make_polygon_from_params([500, 400] + shape_params)
+
+    ParameterExtractor(1.0, 1.0, 1.0).optimize(template, reference_polygon, maxiter=5)
+
+    assert vars(template).keys() == state.keys()
+    for name, value in state.items():
+        np.testing.assert_equal(vars(template)[name], value)
+
+
+def test_unknown_class_id_is_rejected():
+    with pytest.raises(ValueError, match="Unknown template class id"):
+        get_template(max(template_classes()) + 1)
+
+
+def test_duplicate_class_id_is_rejected():
+    class_id = min(template_classes())
+
+    with pytest.raises(ValueError, match="already registered"):
+        class DuplicateTemplate(BaseTemplate):
+            CLASS_ID = class_id
+
+    assert type(get_template(class_id)).__name__ != "DuplicateTemplate"
+
+
+# Indices of the parameters for P1 to P8 per class id, None for 0, as mapped before the registry
+ALLPLAN_PARAMETER_INDICES = {
+    0: [0, 1, 2, 3, None, 4, 5, None],
+    1: [0, 1, 2, 3, 4, 5, 6, None],
+    2: [0, 1, 2, 3, 4, 5, 6, 7],
+}
+
+
+def test_allplan_parameters_keep_the_mapping_of_each_class(template, shape_params):
+    params = [500, 400] + shape_params
+
+    expected = [params[index] if index is not None else 0 for index in ALLPLAN_PARAMETER_INDICES[template.CLASS_ID]]
+
+    assert template.allplan_parameters(params) == expected
+
+
+def test_plugin_templates_are_loaded_from_entry_points(tmp_path, monkeypatch):
+    (tmp_path / "box_girder_plugin.py").write_text(
+        "from templates.base_template import BaseTemplate\n"
+        "\n"
+        "class BoxGirderTemplate(BaseTemplate):\n"
+        "    CLASS_ID = 99\n"
+        "    PARAMETER_NAMES = ('offset_x', 'offset_y', 'height', 'width')\n"
+        "\n"
+        "    @staticmethod\n"
+        "    def vertex_layout(height, width):\n"
+        "        return [(0, 0), (width, 0), (width, height), (0, height)]\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "box_girder_plugin", raising=False)
+    # Registers into a copy, so that the plugin does not outlive the test
+    monkeypatch.setattr(registry, "_template_classes", dict(registry._template_classes))
+    monkeypatch.setattr(registry, "_template_instances", {})
+    monkeypatch.setattr(registry, "_templates_loaded", False)
+    monkeypatch.setattr(registry, "entry_points", lambda group: [
+        EntryPoint("box_girder", "box_girder_plugin:BoxGirderTemplate", group)
+    ])
+
+    template = get_template(99)
+
+    assert type(template).__name__ == "BoxGirderTemplate"
+    assert pickle.loads(pickle.dumps(template)) is template
+    np.testing.assert_allclose(template.make_vertices_from_params([5, 6, 10, 20])[2], [25, 16])
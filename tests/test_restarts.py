@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from optimizers.cma_es_optimizer import CMAESOptimizer
+from tools.parameter_extractor import ParameterExtractor
+
+
+class RecordingOptimizer(CMAESOptimizer):
+    """
+    CMA-ES that records the seed of every run.
+    """
+    seeds = []
+
+    def minimize(self, *args, **kwargs):
+        self.seeds.append(self.seed)
+        return super().minimize(*args, **kwargs)
+
+
+def test_restarts_use_spawned_seeds_and_keep_the_best_run(template, reference_polygon):
+    RecordingOptimizer.seeds = []
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, optimizer=RecordingOptimizer(maxiter=5, seed=7), restarts=3, workers=1)
+
+    result = extractor.optimize(template, reference_polygon, return_result=True)
+
+    expected_seeds = [int(sequence.generate_state(1)[0]) for sequence in np.random.SeedSequence(7).spawn(3)]
+    assert RecordingOptimizer.seeds == expected_seeds
+    # The seed of the extractor's optimizer is left untouched
+    assert extractor.optimizer.seed == 7
+
+    assert len(result.restart_losses) == 3
+    assert result.fun == result.restart_losses.min()
+    assert result.loss_spread == result.restart_losses.std()
+    assert result.parameter_spread.shape == result.x.shape
+
+
+# Starting the worker processes dominates, so a single template suffices
+@pytest.mark.parametrize("template_name", ["t_girder"])
+def test_process_pool_reproduces_in_process_restarts(template, reference_polygon):
+    in_process = ParameterExtractor(1.0, 1.0, 1.0, optimizer=CMAESOptimizer(maxiter=5, seed=3), restarts=2, workers=1)
+    pooled = ParameterExtractor(1.0, 1.0, 1.0, optimizer=CMAESOptimizer(maxiter=5, seed=3), restarts=2, workers=2)
+
+    try:
+        expected = in_process.optimize(template, reference_polygon, return_result=True)
+        result = pooled.optimize(template, reference_polygon, return_result=True)
+    finally:
+        pooled.close()
+
+    np.testing.assert_array_equal(result.x, expected.x)
+    np.testing.assert_array_equal(result.restart_losses, expected.restart_losses)
+    assert result.nfev == expected.nfev
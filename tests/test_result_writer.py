@@ -0,0 +1,90 @@
+import json
+
+from tools.result_writer import ResultWriter
+from tools.run_manifest import RunManifest
+from utils.general_utils import ALLPLAN_PARAMETER_FILE
+
+
+INPUT_FILES = ["img0.png", "img1.png", "img2.png"]
+
+
+def make_image_result(file_name: str, cross_sections: int = 1, tcl: str = "P1 = 80"):
+    """
+    Creates the image result of a drawing with the given number of cross-sections.
+    """
+    return {
+        "file_name": file_name,
+        "width": 100,
+        "height": 50,
+        "csv": [["class", "params"]] + [["1", "80;60"]] * cross_sections,
+        "annotations": [{"category_id": 0, "bbox": [index, 0, 1, 1]} for index in range(cross_sections)],
+        "tcl": tcl if cross_sections else None,
+        "drawings": {},
+    }
+
+
+def run(output_dir, results: list):
+    """
+    Writes the results of a (resumed) run with a manifest and COCO output.
+
+    Returns:
+        tuple: COCO dataset and the parameter file, or None if there is none.
+    """
+    manifest = RunManifest(output_dir)
+    manifest.start([(result["file_name"], "content") for result in results], "config")
+    writer = ResultWriter(output_dir, save_coco=True, manifest=manifest, input_files=INPUT_FILES)
+    for result in results:
+        writer.write(result)
+    writer.close()
+    manifest.close()
+
+    allplan_filepath = output_dir / ALLPLAN_PARAMETER_FILE
+    allplan_parameters = allplan_filepath.read_text() if allplan_filepath.exists() else None
+
+    return json.loads((output_dir / "coco.json").read_text()), allplan_parameters
+
+
+def test_coco_file_includes_drawings_of_earlier_runs(tmp_path):
+    run(tmp_path, [make_image_result("img1.png", 2), make_image_result("img0.png", 1)])
+    coco, _ = run(tmp_path, [make_image_result("img2.png", 1)])
+
+    assert [image["file_name"] for image in coco["images"]] == ["img0.png", "img1.png", "img2.png"]
+    assert [image["id"] for image in coco["images"]] == [0, 1, 2]
+    assert [(annotation["id"], annotation["image_id"]) for annotation in coco["annotation"]] == [(0, 0), (1, 1), (2, 1), (3, 2)]
+
+
+def test_drawing_without_cross_sections_replaces_its_earlier_outputs(tmp_path):
+    run(tmp_path, [make_image_result("img0.png", 1), make_image_result("img1.png", 1)])
+    assert (tmp_path / "img0.csv").exists()
+
+    coco, _ = run(tmp_path, [make_image_result("img0.png", 0)])
+
+    assert not (tmp_path / "img0.csv").exists()
+    assert [image["file_name"] for image in coco["images"]] == ["img1.png"]
+
+    manifest = RunManifest(tmp_path)
+    assert manifest.is_complete("img0.png", "content", "config", save_coco=True)
+    manifest.close()
+
+
+def test_parameter_file_belongs_to_the_first_drawing_regardless_of_completion_order(tmp_path):
+    results = [make_image_result("img2.png", tcl="C"), make_image_result("img0.png", tcl="A"), make_image_result("img1.png", tcl="B")]
+
+    assert run(tmp_path, results)[1] == "A"
+
+
+def test_resume_keeps_the_parameter_file_of_an_earlier_drawing(tmp_path):
+    run(tmp_path, [make_image_result(file_name, tcl=tcl) for file_name, tcl in zip(INPUT_FILES, "ABC")])
+
+    assert run(tmp_path, [make_image_result("img2.png", tcl="C2")])[1] == "A"
+    assert run(tmp_path, [make_image_result("img0.png", tcl="A2")])[1] == "A2"
+
+
+def test_resume_replaces_the_parameter_file_of_a_drawing_without_cross_sections(tmp_path):
+    run(tmp_path, [make_image_result("img0.png", 0), make_image_result("img1.png", tcl="B"), make_image_result("img2.png", tcl="C")])
+
+    # An earlier drawing that now yields a cross-section takes over the parameter file
+    assert run(tmp_path, [make_image_result("img0.png", tcl="A")])[1] == "A"
+    # The parameter file is removed once its drawing no longer yields one
+    assert run(tmp_path, [make_image_result("img0.png", 0)])[1] is None
+    assert run(tmp_path, [make_image_result("img2.png", tcl="C2")])[1] == "C2"
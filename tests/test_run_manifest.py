@@ -0,0 +1,75 @@
+import pytest
+
+from tools.run_manifest import RunManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = RunManifest(tmp_path)
+    yield manifest
+    manifest.close()
+
+
+def test_drawing_is_complete_with_unchanged_inputs_and_requested_outputs(manifest):
+    manifest.start([("img0.png", "content")], "config")
+
+    assert not manifest.is_complete("img0.png", "content", "config")
+
+    manifest.complete("img0.png", has_coco=True)
+
+    assert manifest.is_complete("img0.png", "content", "config", save_coco=True)
+    assert not manifest.is_complete("img0.png", "changed", "config")
+    assert not manifest.is_complete("img0.png", "content", "changed")
+    assert not manifest.is_complete("img0.png", "content", "config", draw_results=True)
+    assert not manifest.is_complete("img1.png", "content", "config")
+
+
+def test_restarted_drawing_is_pending_again(manifest):
+    manifest.start([("img0.png", "content")], "config")
+    manifest.complete("img0.png")
+    manifest.start([("img0.png", "content")], "config")
+
+    assert not manifest.is_complete("img0.png", "content", "config")
+
+
+def test_manifest_persists_across_runs(tmp_path, manifest):
+    manifest.start([("img0.png", "content")], "config")
+    manifest.complete("img0.png")
+    manifest.close()
+
+    reopened = RunManifest(tmp_path)
+    try:
+        assert reopened.is_complete("img0.png", "content", "config")
+    finally:
+        reopened.close()
+
+
+def test_coco_entries_of_complete_drawings_are_ordered_by_file_name(manifest):
+    manifest.start([("img1.png", "a"), ("img0.png", "b"), ("img2.png", "c"), ("img3.png", "d")], "config")
+    manifest.complete("img1.png", {"image": {"file_name": "img1.png"}, "annotations": []}, has_coco=True)
+    manifest.complete("img0.png", {"image": {"file_name": "img0.png"}, "annotations": []}, has_coco=True)
+    # Without cross-sections
+    manifest.complete("img2.png", None, has_coco=True)
+
+    assert [entry["image"]["file_name"] for entry in manifest.coco_entries()] == ["img0.png", "img1.png"]
+
+
+def test_config_hash_ignores_keys_that_do_not_affect_the_results():
+    config = {
+        "CrossSectionDetector": {"conf": 0.5, "device": "cpu", "batch_size": 8},
+        "Pipeline": {"decode_workers": 2},
+    }
+    hash_value = RunManifest.hash_config(config)
+
+    assert RunManifest.hash_config({**config, "Pipeline": {"decode_workers": 8}}) == hash_value
+    assert RunManifest.hash_config({**config, "CrossSectionDetector": {"conf": 0.5, "device": "cuda", "batch_size": 1}}) == hash_value
+    assert RunManifest.hash_config({**config, "CrossSectionDetector": {"conf": 0.6, "device": "cpu", "batch_size": 8}}) != hash_value
+
+
+def test_file_hash_depends_on_the_content(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"drawing")
+    (tmp_path / "b.png").write_bytes(b"drawing")
+    (tmp_path / "c.png").write_bytes(b"drawing 2")
+
+    assert RunManifest.hash_file(tmp_path / "a.png") == RunManifest.hash_file(tmp_path / "b.png")
+    assert RunManifest.hash_file(tmp_path / "a.png") != RunManifest.hash_file(tmp_path / "c.png")
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from optimizers.cma_es_optimizer import CMAESOptimizer
+from tools.parameter_extractor import ParameterExtractor
+
+
+@pytest.fixture
+def extractor(template, reference_polygon):
+    """
+    Extractor with the refinement, prepared for the reference polygon.
+    """
+    extractor = ParameterExtractor(1.0, 1.0, 1.0, refine=True)
+    extractor.set_reference(reference_polygon, template)
+
+    return extractor
+
+
+@pytest.fixture
+def params(shape_params, rng):
+    """
+    Parameter vector close to the reference polygon.
+    """
+    params = np.array([500, 400] + shape_params, dtype=float)
+
+    return params * (1 + rng.normal(scale=0.03, size=len(params)))
+
+
+def test_smooth_loss_gradient_matches_finite_differences(template, extractor, params):
+    _, gradient = extractor.smooth_loss(params, template)
+
+    step = 1e-3
+    finite_differences = np.array([
+        (extractor.smooth_loss(params + offset, template)[0] - extractor.smooth_loss(params - offset, template)[0]) / (2 * step)
+        for offset in np.eye(len(params)) * step
+    ])
+
+    np.testing.assert_allclose(gradient, finite_differences, rtol=0, atol=1e-3 * np.abs(finite_differences).max())
+
+
+def test_refinement_lowers_the_surrogate_loss_within_bounds(template, extractor, params):
+    bounds = template.create_bounds(params)
+
+    refinement = extractor.refine_parameters(template, params, bounds)
+
+    lower, upper = np.transpose(bounds)
+    assert np.all((refinement.x >= lower) & (refinement.x <= upper))
+    assert extractor.smooth_loss(refinement.x, template)[0] < extractor.smooth_loss(params, template)[0]
+    assert extractor.ciou_loss(refinement.x, template) < extractor.ciou_loss(params, template)
+
+
+def test_refined_fit_is_not_worse_than_the_global_search(template, reference_polygon):
+    def fit(refine):
+        extractor = ParameterExtractor(1.0, 1.0, 1.0, optimizer=CMAESOptimizer(maxiter=5, seed=0), refine=refine)
+        return extractor.optimize(template, reference_polygon, return_result=True)
+
+    global_search, refined = fit(False), fit(True)
+
+    assert refined.fun <= global_search.fun
+
+    extractor = ParameterExtractor(1.0, 1.0, 1.0)
+    extractor.set_reference(reference_polygon, template)
+    assert refined.fun == pytest.approx(extractor.ciou_loss(refined.x, template))
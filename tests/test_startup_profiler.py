@@ -0,0 +1,57 @@
+import threading
+
+from tools.startup_profiler import StartupProfiler
+
+
+def test_nested_steps_are_recorded_with_their_depth():
+    profiler = StartupProfiler()
+
+    with profiler.measure("load sam"):
+        with profiler.measure("import torch"):
+            pass
+    profiler.mark("first result")
+
+    records = {name: (start, duration, depth) for start, duration, depth, name in profiler.records}
+    assert records["load sam"][2] == 0
+    assert records["import torch"][2] == 1
+    assert records["first result"][1:] == (None, 0)
+    assert records["load sam"][1] >= records["import torch"][1]
+
+
+def test_steps_of_other_threads_are_not_nested():
+    profiler = StartupProfiler()
+
+    with profiler.measure("outer"):
+        thread = threading.Thread(target=profiler.mark, args=("other thread",))
+        thread.start()
+        thread.join()
+
+    assert {name: depth for _, _, depth, name in profiler.records} == {"outer": 0, "other thread": 0}
+
+
+def test_failed_step_is_recorded():
+    profiler = StartupProfiler()
+
+    try:
+        with profiler.measure("load"):
+            raise ImportError
+    except ImportError:
+        pass
+
+    with profiler.measure("next"):
+        pass
+
+    assert {name: depth for _, _, depth, name in profiler.records} == {"load": 0, "next": 0}
+
+
+def test_report_lists_steps_by_start_with_nested_steps_indented():
+    profiler = StartupProfiler(start_time=0.0)
+    profiler.records = [(2.0, None, 0, "first result"), (0.5, 1.0, 0, "load sam"), (0.5, 0.25, 1, "import torch")]
+
+    lines = profiler.format_report().splitlines()
+
+    assert lines[1:] == [
+        "     0.500         1.000  load sam",
+        "     0.500         0.250    import torch",
+        "     2.000                first result",
+    ]
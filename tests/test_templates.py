@@ -0,0 +1,52 @@
+import numpy as np
+from shapely import Polygon
+
+
+def test_vertex_map_matches_the_parameters(template):
+    num_params = len(template.PARAMETER_NAMES)
+
+    assert template.VERTEX_MAP.shape[1:] == (2, num_params)
+    assert template.PARAMETER_NAMES[:2] == ("offset_x", "offset_y")
+
+
+def test_offsets_translate_all_vertices(template, shape_params):
+    vertices = template.make_vertices_from_params([0, 0] + shape_params)
+    shifted = template.make_vertices_from_params([30, -20] + shape_params)
+
+    np.testing.assert_allclose(shifted, vertices + [30, -20])
+
+
+def test_batch_vertices_match_single_vertices(template, candidates):
+    batch = template.make_vertices_batch(candidates)
+
+    for params, vertices in zip(candidates, batch):
+        np.testing.assert_allclose(vertices, template.make_vertices_from_params(params))
+
+
+def test_positive_heights_and_widths_give_simple_polygons(template, rng):
+    params = rng.uniform(1, 1000, size=(200, len(template.PARAMETER_NAMES)))
+    params[:, :2] = rng.uniform(-1000, 1000, size=(200, 2))
+
+    assert template.is_valid_params(params).all()
+    for vertices in template.make_vertices_batch(params):
+        assert Polygon(vertices).is_valid
+
+
+def test_non_positive_dimensions_are_invalid(template, shape_params):
+    params = np.array([[0, 0] + shape_params] * len(shape_params))
+    params[np.arange(len(shape_params)), 2 + np.arange(len(shape_params))] = 0
+
+    assert not template.is_valid_params(params).any()
+    assert template.is_valid_params([-50, -50] + shape_params)
+
+
+def test_bounds_use_the_given_range_above_the_minimum(template, shape_params):
+    params = [15, 400, 15] + shape_params[1:]
+
+    bounds = np.array(template.create_bounds(params, range_limit=20))
+
+    np.testing.assert_allclose(bounds[:, 1], np.add(params, 20))
+    # Only the dimensions are limited by the minimum, not the offsets
+    np.testing.assert_allclose(bounds[:2, 0], [-5, 380])
+    np.testing.assert_allclose(bounds[2:, 0], np.maximum(np.subtract(params[2:], 20), template.min_bound))
+    assert bounds[2, 0] == template.min_bound
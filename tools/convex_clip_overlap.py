@@ -0,0 +1,106 @@
+import numpy as np
+from shapely import Polygon
+from shapely.geometry.polygon import orient
+
+from utils import geometry_utils
+
+
+class ConvexClipOverlap:
+    """
+    Computes the exact overlap area between a fixed reference polygon and template candidates
+    by clipping convex pieces against each other in NumPy, without GEOS overlays.
+
+    The reference polygon is decomposed once into convex pieces (see `geometry_utils.convex_decomposition`).
+    Holes are decomposed as well and contribute with a negative sign. Candidates are split into the
+    convex pieces declared by the template (`CONVEX_PIECES`), and every candidate piece is clipped
+    against every reference piece with a batched Sutherland-Hodgman kernel. Since the intersection
+    area is additive over disjoint pieces, summing the signed piece areas yields the exact result.
+    A stack of candidates is evaluated in a single call. For a single candidate, the cost of the
+    NumPy kernel is dominated by its per-call overhead, so its pieces are clipped in plain Python
+    instead (see `geometry_utils.convex_clip_area`), skipping reference pieces with disjoint bounds.
+
+    Args:
+        reference_polygon (Polygon): Target polygon that all candidates are compared against.
+        template: Template object with a `CONVEX_PIECES` attribute, listing the vertex indices
+            of the convex pieces of its polygons.
+
+    Attributes:
+        reference_pieces (np.ndarray): Convex, counter-clockwise reference pieces of shape (P, K, 2).
+        reference_signs (np.ndarray): +1 for pieces of exteriors, -1 for pieces of holes, shape (P,).
+        area (float): Area of the reference polygon.
+        centroid (np.ndarray): Centroid of the reference polygon as [x, y].
+        bounds (np.ndarray): Bounds of the reference polygon as [min_x, min_y, max_x, max_y].
+    """
+
+    def __init__(self, reference_polygon: Polygon, template):
+        self.candidate_pieces = np.array(template.CONVEX_PIECES)
+
+        pieces = []
+        signs = []
+        for polygon in getattr(reference_polygon, "geoms", [reference_polygon]):
+            polygon = orient(polygon, sign=1.0)
+            rings = [(polygon.exterior, 1.0)] + [(interior, -1.0) for interior in polygon.interiors]
+
+            for ring, sign in rings:
+                vertices = np.array(ring.coords)[:-1]
+                if sign < 0:
+                    # Holes are oriented clockwise, reverse them to decompose the enclosed area
+                    vertices = vertices[::-1]
+
+                for piece in geometry_utils.convex_decomposition(vertices):
+                    pieces.append(vertices[piece])
+                    signs.append(sign)
+
+        self.reference_pieces = geometry_utils.pad_polygons(pieces)
+        self.reference_signs = np.array(signs)
+
+        # Pieces without padding as lists for single candidates, with their bounds
+        self._candidate_piece_indices = [list(dict.fromkeys(piece)) for piece in template.CONVEX_PIECES]
+        self._reference_piece_lists = [
+            (piece.tolist(), sign, *piece.min(axis=0).tolist(), *piece.max(axis=0).tolist())
+            for piece, sign in zip(pieces, signs)
+        ]
+
+        self.area = reference_polygon.area
+        self.centroid = np.array(reference_polygon.centroid.coords[0])
+        self.bounds = np.array(reference_polygon.bounds)
+
+
+    def intersection_area(self, vertices: np.ndarray):
+        """
+        Computes the exact intersection area between the reference and candidate polygons.
+
+        Args:
+            vertices (np.ndarray): Candidate vertices of shape (V, 2) or (N, V, 2), in the vertex
+                order of the template.
+
+        Returns:
+            float or np.ndarray: Intersection area, or intersection areas of shape (N,).
+        """
+        if vertices.ndim == 2:
+            return self._single_intersection_area(vertices.tolist())
+
+        # Candidate pieces against all reference pieces: (..., pieces, 1, S, 2) x (P, K, 2)
+        candidate_pieces = vertices[..., self.candidate_pieces, :][..., None, :, :]
+        areas = geometry_utils.convex_intersection_area(candidate_pieces, self.reference_pieces)
+
+        return (areas * self.reference_signs).sum(axis=(-2, -1))
+
+
+    def _single_intersection_area(self, points: list):
+        """
+        Computes the intersection area of a single candidate, given as a list of vertices (x, y).
+        """
+        intersection = 0.0
+        for indices in self._candidate_piece_indices:
+            subject = [points[index] for index in indices]
+            xs = [x for x, _ in subject]
+            ys = [y for _, y in subject]
+            min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+
+            for clip, sign, clip_min_x, clip_min_y, clip_max_x, clip_max_y in self._reference_piece_lists:
+                if clip_min_x >= max_x or clip_max_x <= min_x or clip_min_y >= max_y or clip_max_y <= min_y:
+                    continue
+                intersection += sign * geometry_utils.convex_clip_area(subject, clip)
+
+        return intersection
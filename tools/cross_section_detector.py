@@ -1,19 +1,173 @@
+from itertools import islice
+from typing import Iterable
+import numpy as np
 from ultralytics import YOLO
 
+from utils import geometry_utils
+
 
 class CrossSectionDetector(YOLO):
     """
     A wrapper class around the YOLO model specifically designed for detecting bridge cross-sections.
 
-    Initializes a YOLO detection model using provided weights. While it does not add new behavior at the 
-    moment, it provides a clear interface for integrating cross-section detection 
-    into the processing pipeline.
+    Initializes a YOLO detection model using provided weights. Besides the single-image `predict`
+    of YOLO, it offers batched detection across multiple drawings with `predict_batch` and 
+    tiled detection at native resolution for oversized sheets with `predict_tiled`.
+
+    Besides PyTorch weights, the weight path may point to an ONNX (`.onnx`, run with onnxruntime)
+    or TorchScript (`.torchscript`) export, e.g. written by `export.py`, with the same interface.
 
     Args:
-        weight_path (str): File path to the pre-trained YOLO model weights.
+        weight_path (str): File path to the pre-trained YOLO model weights or their export.
     """
     def __init__(self, weight_path: str, *args, **kwargs):
+        # Exports do not always carry the task in their metadata, e.g. after quantization
+        kwargs.setdefault("task", "detect")
         super().__init__(model=weight_path, *args, **kwargs)
 
 
-    
\ No newline at end of file
+    def predict_batch(self, sources: Iterable[np.ndarray], batch_size: int = 8, **kwargs):
+        """
+        Detects cross-sections in multiple images, running the model on batches of images.
+
+        Batching amortizes the per-call overhead of the model, in particular on CPU. The results
+        are streamed back per image, so downstream stages can start before a batch is finished, 
+        and the sources are consumed lazily batch by batch.
+
+        Args:
+            sources (Iterable[np.ndarray]): Images in BGR format, as read by OpenCV.
+            batch_size (int): Maximum number of images per model call.
+            **kwargs: Prediction arguments of YOLO (e.g. `conf`, `iou`, `imgsz`, `device`).
+
+        Yields:
+            ultralytics.engine.results.Results: Detection results of one image, in the order of the sources.
+        """
+        sources = iter(sources)
+
+        while batch := list(islice(sources, batch_size)):
+            yield from self.predict(source=batch, stream=True, **kwargs)
+
+
+    def predict_tiled(
+        self, 
+        image: np.ndarray, 
+        tile_size: int = 1024, 
+        stride: int = 768, 
+        batch_size: int = 8, 
+        iou: float = 0.7, 
+        containment: float = 0.8, 
+        edge_margin: float = 2.0,
+        **kwargs
+    ):
+        """
+        Detects cross-sections with a sliding window of overlapping tiles at native resolution.
+
+        Small cross-sections on large sheets are lost when the whole sheet is downscaled to the
+        model's input size. The tiles are views of the image and are run through the model in
+        batches with `imgsz` set to the tile size. Boxes touching a tile edge inside the image are
+        treated as cut off at the seam: overlapping cut-off boxes of the same class are merged into
+        their union, which restores objects larger than a tile. The detections of all tiles are 
+        then reduced by a global class-aware non-maximum suppression, in which complete boxes take 
+        precedence over cut-off ones.
+
+        Args:
+            image (np.ndarray): Image in BGR format, as read by OpenCV.
+            tile_size (int): Side length of the square tiles in pixels; a multiple of 32.
+            stride (int): Offset between neighboring tiles in pixels; smaller than `tile_size`
+                so that objects on a seam are contained completely in a neighboring tile.
+            batch_size (int): Maximum number of tiles per model call.
+            iou (float): IoU threshold of the non-maximum suppression, within and across tiles.
+            containment (float): Fraction of the smaller box covered by a larger one, above which
+                the smaller box is suppressed across tiles.
+            edge_margin (float): Distance in pixels to a tile edge within which a box counts as cut off.
+            **kwargs: Further prediction arguments of YOLO (e.g. `conf`, `device`).
+
+        Returns:
+            tuple:
+                - boxes (np.ndarray): Boxes of shape (N, 4) as [x0, y0, x1, y1] in image coordinates.
+                - scores (np.ndarray): Confidence scores of shape (N,).
+                - classes (np.ndarray): Class ids of shape (N,).
+        """
+        height, width = image.shape[:2]
+        origins = [(x, y) for y in self._tile_starts(height, tile_size, stride) for x in self._tile_starts(width, tile_size, stride)]
+        tiles = (image[y:y + tile_size, x:x + tile_size] for x, y in origins)
+
+        boxes, scores, classes, cut_off = [], [], [], []
+        for (x, y), result in zip(origins, self.predict_batch(tiles, batch_size, imgsz=tile_size, iou=iou, **kwargs)):
+            tile_boxes = result.boxes.xyxy.cpu().numpy() + [x, y, x, y]
+
+            # Edges of the tile that lie inside the image
+            tile_edges = np.array([x, y, min(x + tile_size, width), min(y + tile_size, height)])
+            inner_edges = np.array([x > 0, y > 0, x + tile_size < width, y + tile_size < height])
+
+            boxes.append(tile_boxes)
+            scores.append(result.boxes.conf.cpu().numpy())
+            classes.append(result.boxes.cls.cpu().numpy().astype(int))
+            cut_off.append(((np.abs(tile_boxes - tile_edges) <= edge_margin) & inner_edges).any(axis=1))
+
+        boxes = np.concatenate(boxes).reshape(-1, 4)
+        scores = np.concatenate(scores)
+        classes = np.concatenate(classes)
+        cut_off = np.concatenate(cut_off)
+
+        boxes, scores, classes, cut_off = self._merge_cut_off_boxes(boxes, scores, classes, cut_off, edge_margin)
+
+        keep = geometry_utils.non_max_suppression(boxes, scores - cut_off, classes, iou, containment)
+
+        return boxes[keep], scores[keep], classes[keep]
+
+
+    @staticmethod
+    def _tile_starts(length: int, tile_size: int, stride: int):
+        """
+        Computes the start positions of the tiles along one image axis, with the last tile aligned to the image border.
+        """
+        if length <= tile_size:
+            return [0]
+
+        starts = list(range(0, length - tile_size + 1, stride))
+        if starts[-1] + tile_size < length:
+            starts.append(length - tile_size)
+
+        return starts
+
+
+    @staticmethod
+    def _merge_cut_off_boxes(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, cut_off: np.ndarray, margin: float):
+        """
+        Replaces groups of overlapping cut-off boxes of the same class by their union.
+        Boxes closer than `margin` count as overlapping, which joins the parts of objects on seams between tiles without overlap.
+        The merged box keeps the highest score of the group and still counts as cut off.
+        """
+        candidates = np.flatnonzero(cut_off)
+        if len(candidates) < 2:
+            return boxes, scores, classes, cut_off
+
+        expanded = boxes[candidates] + [-margin, -margin, margin, margin]
+        overlapping = (
+            (geometry_utils.box_intersection_areas(expanded, expanded) > 0) 
+            & (classes[candidates][:, None] == classes[candidates])
+        ) | np.eye(len(candidates), dtype=bool)
+
+        # Connected components of the overlap graph
+        group = np.arange(len(candidates))
+        changed = True
+        while changed:
+            propagated = np.where(overlapping, group[None, :], len(candidates)).min(axis=1)
+            changed = not np.array_equal(propagated, group)
+            group = propagated
+
+        merged_boxes, merged_scores, merged_classes = [], [], []
+        for label in np.unique(group):
+            members = candidates[group == label]
+            merged_boxes.append(np.concatenate([boxes[members, :2].min(axis=0), boxes[members, 2:].max(axis=0)]))
+            merged_scores.append(scores[members].max())
+            merged_classes.append(classes[members[0]])
+
+        complete = np.flatnonzero(~cut_off)
+        return (
+            np.concatenate([boxes[complete], merged_boxes]),
+            np.concatenate([scores[complete], merged_scores]),
+            np.concatenate([classes[complete], merged_classes]).astype(int),
+            np.concatenate([np.zeros(len(complete), dtype=bool), np.ones(len(merged_boxes), dtype=bool)]),
+        )
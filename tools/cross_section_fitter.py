@@ -0,0 +1,145 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+import cv2
+import numpy as np
+
+from tools.polygon_simplifier import PolygonSimplifier
+from tools.parameter_extractor import ParameterExtractor
+from tools.mask_contours import MaskContours
+
+
+class CrossSectionFitter:
+    """
+    Fits parametric templates to segmentation masks, i.e. the geometric part of the pipeline
+    (polygon simplification followed by parameter optimization).
+
+    Fits are submitted one cross-section at a time and return futures. With worker processes,
+    the CPU-bound fitting runs in a process pool while the caller continues with model inference
+    on the next boxes and images. Without workers, every fit runs in the calling process
+    on submission, which reproduces the sequential pipeline. In-process fits are serialized,
+    so the fitter can be shared by several threads.
+
+    Masks are cropped to their foreground before they are sent to a worker. The simplified
+    polygons are returned in image coordinates. With the "contour" loss backend, the contours
+    of the cropped mask are extracted once per cross-section and shared by all loss evaluations.
+
+    Args:
+        polygon_simplifier (PolygonSimplifier): Simplifier converting masks to reference polygons.
+        parameter_extractor (ParameterExtractor): Extractor fitting the templates to the polygons.
+        workers (int): Number of worker processes; 0 fits in the calling process.
+    """
+    def __init__(self, polygon_simplifier: PolygonSimplifier, parameter_extractor: ParameterExtractor, workers: int = 0):
+        self.polygon_simplifier = polygon_simplifier
+        self.parameter_extractor = parameter_extractor
+        self.workers = workers
+
+        self._lock = threading.Lock()
+        self._executor = None
+        if workers > 0:
+            # Spawned workers do not inherit the state of loaded models (e.g. CUDA contexts)
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(polygon_simplifier, parameter_extractor))
+
+
+    def submit(self, mask: np.ndarray, template, offset: tuple = (0, 0)):
+        """
+        Schedules the fit of a template to a segmentation mask.
+
+        Args:
+            mask (np.ndarray): Binary mask of the cross-section.
+            template: Template instance to fit, see `ParameterExtractor.optimize`.
+            offset (tuple): Position (x, y) of the mask in the image, for masks cropped from the image.
+
+        Returns:
+            Future: Future of the tuple (reference_polygon, final_parameters), with the
+            simplified polygon in image coordinates and the optimal template parameters.
+        """
+        mask_crop, (crop_x, crop_y) = self.crop_to_foreground(mask)
+        offset = (offset[0] + crop_x, offset[1] + crop_y)
+
+        if self._executor is not None:
+            return self._executor.submit(_fit_in_worker, mask_crop, offset, template)
+
+        future = Future()
+        try:
+            with self._lock:
+                future.set_result(self.fit(mask_crop, offset, template))
+        except Exception as error:
+            future.set_exception(error)
+
+        return future
+
+
+    def fit(self, mask: np.ndarray, offset: tuple, template):
+        """
+        Simplifies a mask to a reference polygon and fits the template to it.
+
+        Args:
+            mask (np.ndarray): Binary mask, possibly cropped from the image.
+            offset (tuple): Position (x, y) of the mask's origin in the image.
+            template: Template instance to fit.
+
+        Returns:
+            tuple: Reference polygon in image coordinates and the optimal template parameters.
+        """
+        reference_polygon = self.polygon_simplifier.simplify(mask, offset)
+
+        mask_contours = None
+        if self.parameter_extractor.loss_backend == "contour":
+            mask_contours = MaskContours(mask, offset)
+
+        final_parameters = self.parameter_extractor.optimize(template, reference_polygon, mask_contours=mask_contours)
+
+        return reference_polygon, final_parameters
+
+
+    @staticmethod
+    def crop_to_foreground(mask: np.ndarray, padding: int = 1):
+        """
+        Crops a binary mask to the bounding box of its foreground.
+
+        Args:
+            mask (np.ndarray): Binary mask.
+            padding (int): Background pixels kept around the foreground, so that
+                contours do not touch the border of the crop.
+
+        Returns:
+            tuple: Cropped mask and the position (x, y) of the crop in the mask.
+        """
+        x, y, width, height = cv2.boundingRect(mask.astype(np.uint8))
+        x0, y0 = max(x - padding, 0), max(y - padding, 0)
+        x1, y1 = min(x + width + padding, mask.shape[1]), min(y + height + padding, mask.shape[0])
+
+        return np.ascontiguousarray(mask[y0:y1, x0:x1]), (x0, y0)
+
+
+    def close(self):
+        """
+        Waits for pending fits and shuts down the worker pool.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.parameter_extractor.close()
+
+
+_worker_fitter = None
+
+
+def _init_worker(polygon_simplifier: PolygonSimplifier, parameter_extractor: ParameterExtractor):
+    """
+    Creates the in-process fitter of a worker once, instead of shipping it with every task.
+    """
+    global _worker_fitter
+    _worker_fitter = CrossSectionFitter(polygon_simplifier, parameter_extractor)
+
+
+def _fit_in_worker(mask: np.ndarray, offset: tuple, template):
+    """
+    Runs `CrossSectionFitter.fit` in a worker process.
+    """
+    return _worker_fitter.fit(mask, offset, template)
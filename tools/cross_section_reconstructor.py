@@ -0,0 +1,496 @@
+from pathlib import Path
+from typing import Iterable
+import cv2
+import numpy as np
+
+from templates.registry import get_template
+from tools.lazy_model import LazyModel
+from tools.pipeline import Pipeline, PipelineStage
+from tools.startup_profiler import StartupProfiler
+from utils import general_utils
+
+
+CSV_HEADER = [
+    "Bbox_x0",
+    "Bbox_y0",
+    "Bbox_x1",
+    "Bbox_y1",
+    "template_class_id",
+    "P1",
+    "P2",
+    "P3",
+    "P4",
+    "P5",
+    "P6",
+    "P7",
+    "P8"
+]
+
+
+class CrossSectionReconstructor:
+    """
+    Reconstructs the cross-sections of drawings: detection, segmentation and template fitting,
+    run as the stages decode, detect, segment and fit of a `Pipeline`.
+
+    The models are loaded lazily on first use, one instance per worker of the model stages,
+    and stay loaded between runs, so a long-running process such as the reconstruction
+    service pays their load time only once.
+
+    Args:
+        config (dict): Configuration, see `default.yaml`.
+        profiler (StartupProfiler, optional): Profiler recording import and model load times.
+    """
+    def __init__(self, config: dict, profiler: StartupProfiler = None):
+        self.config = config
+        self.profiler = profiler if profiler is not None else StartupProfiler()
+
+        # One model instance per worker of the model stages, the fitter is shared
+        self.cross_section_detectors = [
+            LazyModel(self._make_cross_section_detector, "cross-section detector", self.profiler)
+            for _ in range(config["Pipeline"]["detect_workers"])
+        ]
+        self.mask_generators = [
+            LazyModel(self._make_mask_generator, "mask generator", self.profiler)
+            for _ in range(config["Pipeline"]["segment_workers"])
+        ]
+        self.cross_section_fitter = LazyModel(self._make_cross_section_fitter, "cross-section fitter", self.profiler)
+        # Cache of fitted parameters, created with the fitter if configured
+        self.result_cache = None
+
+        # Each worker thread takes one instance
+        self._unassigned_detectors = list(self.cross_section_detectors)
+        self._unassigned_mask_generators = list(self.mask_generators)
+
+        # Decode, detect, embed+segment and fit run in stages; results are yielded in input order
+        self.pipeline = Pipeline(
+            stages=[
+                PipelineStage("decode", lambda: self.read_image, config["Pipeline"]["decode_workers"], config["Pipeline"]["queue_size"]),
+                PipelineStage("detect", self._make_detect_worker, config["Pipeline"]["detect_workers"], config["Pipeline"]["queue_size"],
+                              batch_size=config["CrossSectionDetector"]["batch_size"], max_wait=config["CrossSectionDetector"]["max_wait"]),
+                PipelineStage("segment", self._make_segment_worker, config["Pipeline"]["segment_workers"], config["Pipeline"]["queue_size"],
+                              batch_size=config["MaskGenerator"]["batch_size"], max_wait=config["MaskGenerator"]["max_wait"]),
+                PipelineStage("fit", lambda: self.fit, config["Pipeline"]["fit_workers"], config["Pipeline"]["queue_size"]),
+            ],
+            max_in_flight=config["Pipeline"]["max_in_flight"]
+        )
+
+
+    def run(self, sources: Iterable, return_exceptions: bool = False):
+        """
+        Reconstructs the cross-sections of the given drawings.
+
+        Args:
+            sources (Iterable): Paths of image files, or tuples (file_name, data) of encoded image bytes.
+            return_exceptions (bool): If True, the exception of a failed drawing is yielded in place of its result.
+
+        Yields:
+            tuple: (img_path, img, boxes) per drawing in input order, where boxes is a list of
+            (template_class_id, bbox_xyxy, bi_mask, mask_offset, template, reference_polygon, final_parameters).
+        """
+        return self.pipeline.run(sources, return_exceptions)
+
+
+    def preload(self):
+        """
+        Loads all models and imports the templates, instead of waiting for their first use.
+        """
+        for lazy_model in [*self.cross_section_detectors, *self.mask_generators, self.cross_section_fitter]:
+            lazy_model.get()
+
+        with self.profiler.measure("import templates"):
+            from templates.registry import load_templates
+            load_templates()
+
+
+    def close(self):
+        """
+        Shuts down the worker processes of the fitter, if it was loaded.
+        """
+        if self.cross_section_fitter.is_loaded:
+            self.cross_section_fitter.get().close()
+
+
+    def _make_cross_section_detector(self):
+        with self.profiler.measure("import tools.cross_section_detector"):
+            from tools.cross_section_detector import CrossSectionDetector
+
+        return CrossSectionDetector(
+            weight_path=self.config["CrossSectionDetector"]["model"]
+        )
+
+
+    def _make_mask_generator(self):
+        config = self.config["MaskGenerator"]
+
+        match config["runtime"]:
+            case "torch":
+                with self.profiler.measure("import tools.mask_generator"):
+                    from tools.mask_generator import MaskGenerator
+
+                return MaskGenerator(
+                    sam_chkpt=config["sam_chkpt"],
+                    model_type=config["model_type"],
+                    device=config["device"],
+                    cache_dir=config["cache_dir"],
+                    cache_size=config["cache_size"]
+                )
+            case "onnx":
+                with self.profiler.measure("import tools.onnx_mask_generator"):
+                    from tools.onnx_mask_generator import OnnxMaskGenerator
+
+                return OnnxMaskGenerator(
+                    encoder_path=config["onnx_encoder"],
+                    decoder_path=config["onnx_decoder"],
+                    cache_dir=config["cache_dir"],
+                    cache_size=config["cache_size"],
+                    threads=config["onnx_threads"]
+                )
+            case unknown:
+                raise ValueError(f"Unknown SAM runtime: {unknown}")
+
+
+    def _make_cross_section_fitter(self):
+        with self.profiler.measure("import tools.cross_section_fitter"):
+            from tools.polygon_simplifier import PolygonSimplifier
+            from tools.parameter_extractor import ParameterExtractor
+            from tools.cross_section_fitter import CrossSectionFitter
+
+        config = self.config["ParameterOptimizer"]
+
+        polygon_simplifier = PolygonSimplifier(
+            factor_arclength = self.config["PolygonSimplifier"]["factor_arclength"],
+            approx_method = cv2.CHAIN_APPROX_NONE
+        )
+
+        match config["optimizer"]:
+            case "dual_annealing":
+                from optimizers.dual_annealing_optimizer import DualAnnealingOptimizer
+                optimizer = DualAnnealingOptimizer(
+                    maxiter = config["maxiter"],
+                    initial_temp = config["initial_temp"]
+                )
+            case "differential_evolution":
+                from optimizers.differential_evolution_optimizer import DifferentialEvolutionOptimizer
+                optimizer = DifferentialEvolutionOptimizer(
+                    maxiter = config["max_generations"],
+                    popsize = config["popsize"]
+                )
+            case "cma_es":
+                from optimizers.cma_es_optimizer import CMAESOptimizer
+                optimizer = CMAESOptimizer(
+                    maxiter = config["max_generations"],
+                    popsize = config["popsize"]
+                )
+            case unknown:
+                raise ValueError(f"Unknown optimizer: {unknown}")
+
+        if config["result_cache"] is not None:
+            from tools.fit_cache import FitCache
+            self.result_cache = FitCache(config["result_cache"], config["result_cache_size"])
+
+        parameter_extractor = ParameterExtractor(
+            weight_overlap = config["weight_overlap"],
+            weight_distance = config["weight_distance"],
+            weight_aspect_ratio = config["weight_aspect_ratio"],
+            loss_backend = config["loss_backend"],
+            raster_resolution = config["raster_resolution"],
+            optimizer = optimizer,
+            target_loss = config["target_loss"],
+            patience = config["patience"],
+            max_time = config["max_time"],
+            restarts = config["restarts"],
+            workers = config["workers"],
+            result_cache = self.result_cache,
+            refine = config["refine"],
+            refine_maxiter = config["refine_maxiter"],
+            smooth_sigma = config["smooth_sigma"],
+            coarse_to_fine = config["coarse_to_fine"],
+            coarse_tolerance = config["coarse_tolerance"],
+            coarse_resolution = config["coarse_resolution"],
+            coarse_budget = config["coarse_budget"],
+            fine_budget = config["fine_budget"],
+            fine_range = config["fine_range"]
+        )
+
+        return CrossSectionFitter(
+            polygon_simplifier = polygon_simplifier,
+            parameter_extractor = parameter_extractor,
+            workers = self.config["Pipeline"]["fit_processes"]
+        )
+
+
+    @staticmethod
+    def read_image(source):
+        """
+        Decodes a drawing from a file or from encoded image bytes.
+
+        Args:
+            source: Path of an image file, or a tuple (file_name, data) of encoded image bytes.
+
+        Returns:
+            tuple: Path (or file name) of the drawing and the image in BGR format.
+        """
+        if isinstance(source, tuple):
+            file_name, data = source
+            img_path, img = Path(file_name), cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        else:
+            img_path, img = Path(source), cv2.imread(str(source))
+
+        if img is None:
+            raise ValueError(f"The image could not be decoded: {img_path}")
+
+        return img_path, img
+
+
+    def _make_detect_worker(self):
+        lazy_detector = self._unassigned_detectors.pop()
+        config = self.config["CrossSectionDetector"]
+
+        def detect(items):
+            cross_section_detector = lazy_detector.get()
+
+            if config["tiled"]:
+                # Tiles of each image are batched instead of images
+                for img_path, img in items:
+                    boxes_xyxy, scores, classes = cross_section_detector.predict_tiled(
+                        image=img,
+                        tile_size=config["tile_size"],
+                        stride=config["tile_stride"],
+                        batch_size=config["batch_size"],
+                        conf=config["conf"],
+                        iou=config["iou"],
+                        device=config["device"]
+                    )
+
+                    yield img_path, img, list(zip(classes.tolist(), boxes_xyxy.tolist()))
+                return
+
+            detection_results = cross_section_detector.predict_batch(
+                sources=(img for _, img in items),
+                batch_size=config["batch_size"],
+                conf=config["conf"],
+                iou=config["iou"],
+                imgsz=config["imgsz"],
+                device=config["device"]
+            )
+
+            for (img_path, img), detection_result in zip(items, detection_results):
+                detections = [
+                    (int(box.cls.cpu().tolist()[0]), box.xyxy.cpu().tolist()[0])
+                    for box in detection_result.boxes
+                ]
+
+                yield img_path, img, detections
+
+        return detect
+
+
+    def _make_segment_worker(self):
+        lazy_mask_generator = self._unassigned_mask_generators.pop()
+        config = self.config["MaskGenerator"]
+
+        def segment(item):
+            img_path, img, detections = item
+
+            if len(detections) == 0:
+                return img_path, img, []
+
+            mask_generator = lazy_mask_generator.get()
+
+            if config["crop_mode"]:
+                # Every box is embedded in its own crop, masks are returned in crop coordinates
+                masks, scores, offsets = mask_generator.predict_crops(
+                    image=img,
+                    boxes_xyxy=np.array([bbox_xyxy for _, bbox_xyxy in detections]),
+                    padding=config["crop_padding"],
+                    multimask_output=config["multimask"]
+                )
+            else:
+                mask_generator.set_image(img)
+
+                # All boxes of the image are decoded in one pass
+                masks, scores, logits = mask_generator.predict_boxes(
+                    boxes_xyxy=np.array([bbox_xyxy for _, bbox_xyxy in detections]),
+                    multimask_output=config["multimask"]
+                )
+                offsets = [(0, 0)] * len(detections)
+
+            return img_path, img, self._make_boxes(detections, masks, offsets)
+
+        def segment_batch(items):
+            if config["crop_mode"]:
+                # Crops are embedded per image
+                for item in items:
+                    yield segment(item)
+                return
+
+            # The images with detections are embedded in one encoder batch
+            detected = [(img_path, img, detections) for img_path, img, detections in items if len(detections) > 0]
+            predictions = lazy_mask_generator.get().predict_boxes_batch(
+                images=[img for _, img, _ in detected],
+                boxes_xyxy=[np.array([bbox_xyxy for _, bbox_xyxy in detections]) for _, _, detections in detected],
+                multimask_output=config["multimask"]
+            ) if detected else iter(())
+
+            for img_path, img, detections in items:
+                if len(detections) == 0:
+                    yield img_path, img, []
+                    continue
+
+                masks, scores, logits = next(predictions)
+                yield img_path, img, self._make_boxes(detections, masks, [(0, 0)] * len(detections))
+
+        return segment if config["batch_size"] == 1 else segment_batch
+
+
+    @staticmethod
+    def _make_boxes(detections: list, masks: np.ndarray, offsets: list):
+        """
+        Combines the detections of a drawing with the first mask of each box.
+        """
+        return [
+            (template_class_id, tuple(bbox_xyxy), box_masks[0], offset)
+            for (template_class_id, bbox_xyxy), box_masks, offset in zip(detections, masks, offsets)
+        ]
+
+
+    def fit(self, item):
+        """
+        Fits the templates of all boxes of a drawing, see `CrossSectionFitter`.
+        """
+        img_path, img, boxes = item
+
+        fits = []
+        for template_class_id, bbox_xyxy, bi_mask, mask_offset in boxes:
+            # Templates are shared by all boxes of their class
+            template = get_template(template_class_id)
+
+            fit_future = self.cross_section_fitter.get().submit(bi_mask, template, mask_offset)
+            fits.append((template_class_id, bbox_xyxy, bi_mask, mask_offset, template, fit_future))
+
+        # Submit all boxes before waiting, so that they are fitted in parallel
+        boxes = [
+            (template_class_id, bbox_xyxy, bi_mask, mask_offset, template, *fit_future.result())
+            for template_class_id, bbox_xyxy, bi_mask, mask_offset, template, fit_future in fits
+        ]
+
+        return img_path, img, boxes
+
+
+    def make_image_result(self, img_path: Path, img: np.ndarray, boxes: list, draw_results: bool = False, save_coco: bool = False):
+        """
+        Converts the reconstruction of a drawing to its outputs, see `ResultWriter`.
+
+        Args:
+            img_path (Path): Path or file name of the drawing.
+            img (np.ndarray): Drawing in BGR format.
+            boxes (list): Fitted cross-sections, as yielded by `run`.
+            draw_results (bool): Draw the boxes, masks, reference and final polygons.
+            save_coco (bool): Encode the masks as COCO annotations.
+
+        Returns:
+            dict: Result with the keys 'file_name', 'width', 'height', 'csv' (rows including the header),
+            'annotations' (COCO annotations without ids), 'tcl' (Allplan parameter file of the first
+            cross-section, None without cross-sections) and 'drawings' (images keyed by name).
+        """
+        img_height, img_width, _ = img.shape
+
+        if draw_results:
+            from utils import drawing_utils
+
+            result_image_bbox = drawing_utils.clone_image(img)
+            result_image_mask = drawing_utils.clone_image(img)
+            result_image_polygon = drawing_utils.clone_image(img)
+            result_image_final_polygon = drawing_utils.clone_image(img)
+
+        csv_result_file = [CSV_HEADER]
+        annotations = []
+        tcl = None
+
+        for template_class_id, (x0, y0, x1, y1), bi_mask, mask_offset, template, reference_polygon, final_parameters in boxes:
+            bbox = [x0, y0, x1-x0, y1-y0]
+
+            if save_coco:
+                rle = general_utils.binary_mask_crop_to_rle_compressed(bi_mask, mask_offset, (img_height, img_width))
+
+                area = (x1 - x0)*(y1 - y0)
+
+                annotations.append({
+                    "category_id": 0,
+                    "segmentation": rle,
+                    "area": area,
+                    "bbox": bbox,
+                    "iscrowd": 1,
+                })
+
+            P1, P2, P3, P4, P5, P6, P7, P8 = template.allplan_parameters(final_parameters)
+
+            csv_result_file.append(
+                [
+                    round(x0, 4), round(y0,4), round(x1,4), round(y1,4),
+                    template_class_id,
+                    round(P1, 4), round(P2, 4), round(P3, 4), round(P4, 4),
+                    round(P5, 4), round(P6, 4), round(P7, 4), round(P8, 4)
+                ]
+            )
+
+            # Currently, only the first cross-section is exported to the Allplan Bridge script
+            if tcl is None:
+                tcl = general_utils.format_allplan_parameter_file([P1, P2, P3, P4, P5, P6, P7, P8], template_class_id)
+
+            if draw_results:
+                result_image_bbox = drawing_utils.draw_bbox(
+                    result_image_bbox,
+                    bbox,
+                    color_hex=self.config["General"]["bbox_color"],
+                    alpha=0.5
+                )
+
+                result_image_bbox = drawing_utils.draw_text(
+                    result_image_bbox,
+                    str(template_class_id),
+                    (int(bbox[0]), int(bbox[1])),
+                    color_hex=self.config["General"]["bbox_color"],
+                )
+
+                result_image_mask = drawing_utils.draw_mask(
+                    result_image_mask,
+                    bi_mask,
+                    color_hex=self.config["General"]["mask_color"],
+                    alpha=0.5,
+                    offset=mask_offset
+                )
+
+                result_image_polygon = drawing_utils.draw_polygon(
+                    result_image_polygon,
+                    reference_polygon,
+                    color_hex=self.config["General"]["polygon_color"],
+                    alpha=0.5
+                )
+
+                final_polygon = template.make_polygon_from_params(final_parameters)
+                result_image_final_polygon = drawing_utils.draw_polygon(
+                    result_image_final_polygon,
+                    final_polygon,
+                    color_hex=self.config["General"]["final_polygon_color"],
+                    alpha=0.5
+                )
+
+        drawings = {}
+        if draw_results:
+            drawings = {
+                "bbox": result_image_bbox,
+                "mask": result_image_mask,
+                "polygon": result_image_polygon,
+                "final_polygon": result_image_final_polygon,
+            }
+
+        return {
+            "file_name": img_path.name,
+            "width": img_width,
+            "height": img_height,
+            "csv": csv_result_file,
+            "annotations": annotations,
+            "tcl": tcl,
+            "drawings": drawings,
+        }
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of image embeddings, stored as one `.npy` file per entry.
+
+    Entries are read memory-mapped. The least recently used entries are evicted once the
+    total size of the cache exceeds its cap, using the modification time of the files as
+    the access time. Entries are written atomically, so several processes can share a cache directory.
+
+    Args:
+        cache_dir (str): Directory of the cache files; created if it does not exist.
+        max_size (float): Size cap of the cache in gigabytes.
+
+    Attributes:
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups without a cache entry.
+    """
+    def __init__(self, cache_dir: str, max_size: float = 10.0):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+
+    @staticmethod
+    def make_key(image: np.ndarray, *identifiers):
+        """
+        Computes the cache key of an image from its content and further identifiers,
+        e.g. of the model that computes the embedding.
+
+        Args:
+            image (np.ndarray): Image array.
+            *identifiers: Values that the embedding depends on besides the image.
+
+        Returns:
+            str: Hexadecimal key.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr((image.shape, image.dtype.str, identifiers)).encode())
+        digest.update(np.ascontiguousarray(image).data)
+
+        return digest.hexdigest()
+
+
+    def get(self, key: str):
+        """
+        Looks up an embedding and marks it as recently used.
+
+        Args:
+            key (str): Cache key, see `make_key`.
+
+        Returns:
+            np.ndarray or None: Memory-mapped embedding, or None if the key is not cached.
+        """
+        path = self._path(key)
+        try:
+            embedding = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # Missing, evicted by another process or incomplete
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return embedding
+
+
+    def put(self, key: str, embedding: np.ndarray):
+        """
+        Stores an embedding and evicts the least recently used entries beyond the size cap.
+
+        Args:
+            key (str): Cache key, see `make_key`.
+            embedding (np.ndarray): Embedding to store.
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.save(file, embedding)
+            os.replace(temporary_path, self._path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        self.evict()
+
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits into its size cap.
+        """
+        entries = []
+        for path in self.cache_dir.glob("*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size * 1e9:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+
+
+    def _path(self, key: str):
+        return self.cache_dir / f"{key}.npy"
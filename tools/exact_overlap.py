@@ -0,0 +1,46 @@
+import numpy as np
+import shapely
+from shapely import Polygon
+
+
+class ExactOverlap:
+    """
+    Computes the exact overlap area between a fixed reference polygon and candidate polygons
+    with a single GEOS intersection per candidate.
+
+    Area, centroid and bounds of the reference polygon are computed once on construction,
+    since the reference stays fixed for a whole optimization run. The union area is not
+    computed by an overlay but derived as area(A) + area(B) - intersection by the caller.
+
+    Args:
+        reference_polygon (Polygon): Target polygon that all candidates are compared against.
+
+    Attributes:
+        reference_polygon (Polygon): The reference polygon.
+        area (float): Area of the reference polygon.
+        centroid (np.ndarray): Centroid of the reference polygon as [x, y].
+        bounds (np.ndarray): Bounds of the reference polygon as [min_x, min_y, max_x, max_y].
+    """
+
+    def __init__(self, reference_polygon: Polygon):
+        self.reference_polygon = reference_polygon
+        self.area = reference_polygon.area
+        self.centroid = np.array(reference_polygon.centroid.coords[0])
+        self.bounds = np.array(reference_polygon.bounds)
+
+
+    def intersection_area(self, vertices: np.ndarray):
+        """
+        Computes the exact intersection area between the reference and candidate polygons.
+
+        Args:
+            vertices (np.ndarray): Candidate vertices of shape (V, 2) or (N, V, 2), implicitly closed.
+
+        Returns:
+            float or np.ndarray: Intersection area, or intersection areas of shape (N,).
+        """
+        if vertices.ndim == 2:
+            return self.reference_polygon.intersection(Polygon(vertices)).area
+
+        candidates = shapely.polygons(vertices)
+        return shapely.area(shapely.intersection(self.reference_polygon, candidates))
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+import numpy as np
+import shapely
+from shapely import Polygon
+
+
+class FitCache:
+    """
+    Content-addressed cache of fitted template parameters, stored in an SQLite database.
+
+    Standard cross-sections recur across drawings, and the fit of a template depends only on the
+    shape of the reference polygon, not on its position. Entries are therefore keyed on the WKB
+    of the reference polygon translated to the origin, together with the template and the
+    settings of the fit, and store the parameters relative to that origin. On a hit, the cached
+    offset parameters are translated back to the position of the current reference polygon.
+
+    The least recently used entries are evicted beyond the size cap. Lookups and entries are
+    counted in the database, so the hit rate covers all processes that share the cache file.
+
+    Args:
+        path (str): Path of the database file; its directory is created if it does not exist.
+        max_entries (int): Size cap of the cache in entries.
+
+    Attributes:
+        hits (int): Number of lookups of this instance served from the cache.
+        misses (int): Number of lookups of this instance without a cache entry.
+    """
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection = None
+
+
+    def __getstate__(self):
+        """
+        Excludes the connection and the lock from pickling; worker processes open their own connection.
+        """
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        del state["_lock"]
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def normalize(reference_polygon: Polygon):
+        """
+        Translates a reference polygon so that its bounding box starts at the origin.
+
+        Args:
+            reference_polygon (Polygon): Reference polygon in image coordinates.
+
+        Returns:
+            tuple: Translated polygon and the origin (x, y) of the original bounding box.
+        """
+        origin_x, origin_y = reference_polygon.bounds[:2]
+        normalized_polygon = shapely.transform(reference_polygon, lambda coords: coords - [origin_x, origin_y])
+
+        return normalized_polygon, (origin_x, origin_y)
+
+
+    @staticmethod
+    def make_key(normalized_polygon: Polygon, *identifiers):
+        """
+        Computes the cache key of a normalized reference polygon and further identifiers,
+        e.g. of the template and the optimizer settings.
+
+        Args:
+            normalized_polygon (Polygon): Reference polygon translated to the origin, see `normalize`.
+            *identifiers: Values that the fit depends on besides the polygon.
+
+        Returns:
+            str: Hexadecimal key.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr(identifiers).encode())
+        digest.update(shapely.to_wkb(normalized_polygon))
+
+        return digest.hexdigest()
+
+
+    def get(self, key: str):
+        """
+        Looks up the parameters of a fit and marks them as recently used.
+
+        Args:
+            key (str): Cache key, see `make_key`.
+
+        Returns:
+            tuple or None: Parameters relative to the origin as np.ndarray and their loss, or None if the key is not cached.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                row = connection.execute("SELECT params, loss FROM fits WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    connection.execute("UPDATE fits SET last_used = ? WHERE key = ?", (time.time(), key))
+                connection.execute(
+                    "UPDATE counters SET value = value + 1 WHERE name = ?",
+                    ("hits" if row is not None else "misses",)
+                )
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        params, loss = row
+        return np.array(json.loads(params), dtype=float), loss
+
+
+    def put(self, key: str, params: np.ndarray, loss: float):
+        """
+        Stores the parameters of a fit and evicts the least recently used entries beyond the size cap.
+
+        Args:
+            key (str): Cache key, see `make_key`.
+            params (np.ndarray): Fitted parameters relative to the origin of the normalized polygon.
+            loss (float): Loss of the fitted parameters.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO fits (key, params, loss, last_used) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(np.asarray(params, dtype=float).tolist()), float(loss), time.time())
+                )
+                connection.execute(
+                    "DELETE FROM fits WHERE key IN (SELECT key FROM fits ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+
+    def stats(self):
+        """
+        Returns:
+            dict: Keys 'entries', 'hits', 'misses' and 'hit_rate' of all processes sharing the cache file.
+        """
+        with self._lock:
+            connection = self._connect()
+            entries = connection.execute("SELECT COUNT(*) FROM fits").fetchone()[0]
+            counters = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "entries": entries,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+        }
+
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+    def _connect(self):
+        if self._connection is None:
+            # Fits of several threads are serialized by the lock
+            self._connection = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS fits (key TEXT PRIMARY KEY, params TEXT NOT NULL, loss REAL NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._connection.execute("CREATE INDEX IF NOT EXISTS fits_last_used ON fits (last_used)")
+                self._connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                self._connection.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('hits', 0), ('misses', 0)")
+
+        return self._connection
+
+
+def format_cache_stats(stats: dict):
+    """
+    Formats the statistics of a result cache as a single line.
+
+    Args:
+        stats (dict): Statistics of the cache, see `FitCache.stats`, e.g. as reported by a reconstruction service.
+
+    Returns:
+        str: Entries, hit rate, hits and misses of the cache.
+    """
+    return f"result cache: {stats['entries']} entries, hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses)"
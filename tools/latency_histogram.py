@@ -0,0 +1,88 @@
+import math
+import threading
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies with logarithmically spaced buckets, which resolves milliseconds
+    as well as minutes with a fixed relative error and constant memory.
+
+    Args:
+        min_latency (float): Upper bound of the first bucket in seconds.
+        max_latency (float): Lower bound of the last, unbounded bucket in seconds.
+        buckets_per_decade (int): Number of buckets per factor of ten.
+    """
+    def __init__(self, min_latency: float = 1e-3, max_latency: float = 1e3, buckets_per_decade: int = 10):
+        decades = math.log10(max_latency / min_latency)
+        self.bounds = np.logspace(math.log10(min_latency), math.log10(max_latency), round(decades * buckets_per_decade) + 1)
+        self.counts = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+        self.total = 0.0
+
+        self._lock = threading.Lock()
+
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+
+    def record(self, latency: float):
+        """
+        Adds a latency to the histogram.
+
+        Args:
+            latency (float): Latency in seconds.
+        """
+        bucket = int(np.searchsorted(self.bounds, latency))
+        with self._lock:
+            self.counts[bucket] += 1
+            self.total += latency
+
+
+    def mean(self):
+        """
+        Returns:
+            float: Mean latency in seconds, 0 without latencies.
+        """
+        count = self.count
+        return self.total / count if count else 0.0
+
+
+    def quantile(self, q: float):
+        """
+        Estimates a quantile by the upper bound of the bucket that contains it.
+
+        Args:
+            q (float): Quantile between 0 and 1, e.g. 0.99.
+
+        Returns:
+            float: Latency in seconds, 0 without latencies.
+        """
+        cumulative = np.cumsum(self.counts)
+        if cumulative[-1] == 0:
+            return 0.0
+
+        bucket = int(np.searchsorted(cumulative, q * cumulative[-1]))
+        # The last bucket is unbounded
+        return float(self.bounds[min(bucket, len(self.bounds) - 1)])
+
+
+    def to_dict(self):
+        """
+        Summarizes the histogram, e.g. for a JSON report.
+
+        Returns:
+            dict: Keys 'count', 'mean', 'p50', 'p90', 'p99' and 'buckets', the latter as
+            [upper bound, count] pairs of the non-empty buckets (upper bound None for the last bucket).
+        """
+        upper_bounds = self.bounds.tolist() + [None]
+
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": [[upper_bounds[bucket], int(count)] for bucket, count in enumerate(self.counts) if count],
+        }
@@ -0,0 +1,49 @@
+import threading
+from typing import Callable
+
+from tools.startup_profiler import StartupProfiler
+
+
+class LazyModel:
+    """
+    Defers the creation of a model, including the import of its dependencies, until its first use.
+
+    Runs without input images or without detections then never load the models they do not need.
+    The model is created once, even if several threads request it at the same time.
+
+    Args:
+        factory (Callable): Creates the model; should import heavy dependencies itself.
+        name (str): Name of the model in the startup profile.
+        profiler (StartupProfiler, optional): Profiler recording the load time.
+    """
+    def __init__(self, factory: Callable, name: str = "model", profiler: StartupProfiler = None):
+        self.factory = factory
+        self.name = name
+        self.profiler = profiler
+
+        self._model = None
+        self._lock = threading.Lock()
+
+
+    @property
+    def is_loaded(self):
+        return self._model is not None
+
+
+    def get(self):
+        """
+        Returns the model, creating it on the first call.
+
+        Returns:
+            The model created by the factory.
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    if self.profiler is None:
+                        self._model = self.factory()
+                    else:
+                        with self.profiler.measure(f"load {self.name}"):
+                            self._model = self.factory()
+
+        return self._model
@@ -0,0 +1,81 @@
+import hashlib
+import math
+import cv2
+import numpy as np
+import shapely
+from shapely import Polygon
+
+
+class MaskContours:
+    """
+    Boundaries of a binary mask, extracted once per cross-section for the "contour" loss backend.
+
+    Pixel centers lie at integer coordinates, as the contour points of `PolygonSimplifier`, so the
+    contours run through the centers of the boundary pixels of the mask, like the reference polygon.
+
+    Args:
+        mask (np.ndarray): Binary mask of the cross-section, possibly cropped from the image.
+        offset (tuple): Position (x, y) of the mask in the image; contours are given in image coordinates.
+
+    Attributes:
+        mask (np.ndarray): Binary mask of shape (rows, cols), bool.
+        origin (np.ndarray): Image coordinates [x, y] of the first pixel center.
+        contours (list): Boundaries of the mask through the centers of its boundary pixels, as
+            arrays of shape (K, 2) in image coordinates, including the boundaries of holes.
+    """
+
+    def __init__(self, mask: np.ndarray, offset: tuple = (0, 0)):
+        self.mask = np.asarray(mask) > 0
+        self.origin = np.array(offset, dtype=float)
+        self._digest = None
+
+        # Background border, so that masks touching the edge of the crop get closed contours
+        padded = np.pad(self.mask, 1).astype(np.uint8)
+        contours, _ = cv2.findContours(padded, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE, offset=(int(offset[0]) - 1, int(offset[1]) - 1))
+        self.contours = [contour.reshape(-1, 2).astype(float) for contour in contours]
+
+
+    @classmethod
+    def from_polygon(cls, polygon: Polygon, padding: int = 2):
+        """
+        Creates the contours of a rasterized polygon, for references without a mask.
+
+        Args:
+            polygon (Polygon): Polygon or multi-polygon in image coordinates.
+            padding (int): Background pixels around the polygon.
+
+        Returns:
+            MaskContours: Contours of the polygon's pixel mask.
+        """
+        min_x, min_y, max_x, max_y = polygon.bounds
+        offset = np.array([math.floor(min_x) - padding, math.floor(min_y) - padding])
+        width = math.ceil(max_x) + padding + 1 - offset[0]
+        height = math.ceil(max_y) + padding + 1 - offset[1]
+
+        # Sub-pixel vertex positions with 4 fractional bits
+        def to_pixels(ring):
+            return np.round((np.asarray(ring.coords) - offset) * 16).astype(np.int32)
+
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for part in shapely.get_parts(polygon):
+            cv2.fillPoly(mask, [to_pixels(part.exterior)], 1, shift=4)
+            for interior in part.interiors:
+                cv2.fillPoly(mask, [to_pixels(interior)], 0, shift=4)
+
+        return cls(mask, tuple(offset.tolist()))
+
+
+    def cache_key(self, origin: tuple):
+        """
+        Identifies the mask relative to a reference position, for the keys of the result cache.
+
+        Args:
+            origin (tuple): Reference position (x, y), e.g. the origin of the normalized reference polygon.
+
+        Returns:
+            tuple: Digest of the mask pixels, the mask shape and the position of the mask relative to `origin`.
+        """
+        if self._digest is None:
+            self._digest = hashlib.blake2b(np.packbits(self.mask).tobytes(), digest_size=20).hexdigest()
+
+        return self._digest, self.mask.shape, tuple((self.origin - origin).tolist())
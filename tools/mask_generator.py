@@ -1,30 +1,50 @@
 
+import math
+import os
+from typing import Sequence
+import numpy as np
+import torch
 from segment_anything import SamPredictor
 from segment_anything import sam_model_registry
 
+from tools.embedding_cache import EmbeddingCache
+
 class MaskGenerator(SamPredictor):
     """
     A wrapper for the Segment Anything Model (SAM) that generates segmentation masks
     for detected cross-sections.
 
-    This class currently extends the base `SamAutomaticMaskGenerator` provided by the 
-    SAM model API and passes configuration parameters during initialization. While it 
-    doesn't implement new functionality at the moment, it provides a dedicated interface 
-    within the geometry reconstruction pipeline for future integration or customization.
-    
+    This class extends the `SamPredictor` of the SAM model API with the prompting modes of
+    the geometry reconstruction pipeline:
+
+    - `predict_boxes` decodes all box prompts of the image set with `set_image` in a single
+      pass of the prompt encoder and mask decoder.
+    - `predict_boxes_batch` embeds several images in one batch of the image encoder (see
+      `embed_images`) before decoding the box prompts of each image.
+    - `predict_crops` embeds a padded crop around each box instead of the whole image, which
+      resolves small cross-sections finer and returns the masks in crop coordinates.
+
     Pretrained weights can be downloaded from:
     https://github.com/facebookresearch/segment-anything/blob/main/README.md#model-checkpoints
 
+    Image embeddings can be cached on disk (see `EmbeddingCache`), so that reprocessing
+    an image skips the image encoder in all modes. Cache entries are keyed by the image 
+    content, the model type and the checkpoint file.
+
     Args:
         sam_chkpt (str): Path to the SAM model checkpoint file.
         model_type (str): Variant of the SAM model to initialize. Options include "vit_h", "vit_l", and "vit_b".
         device (str): Torch device identifier, for example, "cuda:0" or "cpu".
+        cache_dir (str, optional): Directory of the embedding cache; no caching if None.
+        cache_size (float): Size cap of the embedding cache in gigabytes.
     """
 
     def __init__(self, 
                  sam_chkpt: str, 
                  model_type: str, 
                  device: str, 
+                 cache_dir: str = None,
+                 cache_size: float = 10.0
                 ):
         
         sam = sam_model_registry[model_type](checkpoint=sam_chkpt)
@@ -32,5 +52,199 @@ class MaskGenerator(SamPredictor):
         
         super().__init__(sam)
 
+        self.model_type = model_type
+        self._init_embedding_cache(cache_dir, cache_size, sam_chkpt)
+
+
+    def _init_embedding_cache(self, cache_dir: str, cache_size: float, model_file: str):
+        """
+        Creates the embedding cache, if enabled, for embeddings computed with the given model file.
+        """
+        self.embedding_cache = None
+        if cache_dir is not None:
+            self.embedding_cache = EmbeddingCache(cache_dir, cache_size)
+
+            # Identify the checkpoint by its path, size and modification time instead of hashing gigabytes
+            chkpt_stat = os.stat(model_file)
+            self.chkpt_id = (os.path.abspath(model_file), chkpt_stat.st_size, chkpt_stat.st_mtime_ns)
+
+
+    def set_image(self, image: np.ndarray, image_format: str = "RGB"):
+        """
+        Calculates the image embedding, or loads it from the embedding cache, 
+        and prepares the predictor for mask prediction.
+
+        Args:
+            image (np.ndarray): Image in HWC uint8 format.
+            image_format (str): Color format of the image, "RGB" or "BGR".
+        """
+        self._set_embedding(self.embed_images([image], image_format)[0], image.shape[:2])
+
+
+    def embed_images(self, images: Sequence[np.ndarray], image_format: str = "RGB"):
+        """
+        Calculates the embeddings of several images, running the image encoder once on all
+        images whose embeddings are not in the embedding cache.
+
+        Args:
+            images (Sequence[np.ndarray]): Images in HWC uint8 format.
+            image_format (str): Color format of the images, "RGB" or "BGR".
+
+        Returns:
+            list: Embedding of each image, of shape (1, C, H, W).
+        """
+        if self.embedding_cache is None:
+            return self._encode_images(images, image_format) if len(images) else []
+
+        keys = [self.embedding_cache.make_key(image, image_format, self.model_type, self.chkpt_id) for image in images]
+        embeddings = [self.embedding_cache.get(key) for key in keys]
+
+        missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            encoded = self._encode_images([images[index] for index in missing], image_format)
+            for index, embedding in zip(missing, encoded):
+                embeddings[index] = embedding
+                self.embedding_cache.put(keys[index], embedding.cpu().numpy())
+
+        return embeddings
+
+
+    def _encode_images(self, images: Sequence[np.ndarray], image_format: str):
+        """
+        Runs the image encoder on a batch of images, with the preprocessing of `SamPredictor.set_image`.
+
+        Returns:
+            list: Embedding tensor of each image.
+        """
+        if image_format not in ("RGB", "BGR"):
+            raise ValueError(f"Unknown image format: {image_format}")
+
+        input_images = []
+        for image in images:
+            if image_format != self.model.image_format:
+                image = image[..., ::-1]
+            input_image = torch.as_tensor(self.transform.apply_image(image), device=self.device)
+            input_images.append(self.model.preprocess(input_image.permute(2, 0, 1).contiguous()[None, :, :, :]))
+
+        with torch.no_grad():
+            features = self.model.image_encoder(torch.cat(input_images))
+
+        return list(features.split(1))
+
+
+    def _set_embedding(self, embedding, original_size: tuple):
+        """
+        Prepares the predictor for mask prediction with a precomputed embedding,
+        restoring the state that `SamPredictor.set_torch_image` leaves behind.
+        """
+        self.reset_image()
+        self.original_size = tuple(original_size)
+        self.input_size = self.transform.get_preprocess_shape(*original_size, self.transform.target_length)
+        if not torch.is_tensor(embedding):
+            embedding = torch.from_numpy(np.array(embedding))
+        self.features = embedding.to(self.device)
+        self.is_image_set = True
+
+
+    def predict_boxes(self, boxes_xyxy: np.ndarray, multimask_output: bool = False):
+        """
+        Predicts masks for multiple box prompts on the image set with `set_image`.
+
+        Unlike calling `predict` once per box, all boxes are encoded and decoded in a
+        single forward pass of the prompt encoder and mask decoder.
+
+        Args:
+            boxes_xyxy (np.ndarray): Box prompts of shape (N, 4) as [x0, y0, x1, y1] in image coordinates.
+            multimask_output (bool): If True, returns three masks per box, otherwise a single one.
+
+        Returns:
+            tuple: 
+                - masks (np.ndarray): Binary masks of shape (N, C, H, W), with C = 3 if `multimask_output` else 1.
+                - scores (np.ndarray): Predicted mask qualities of shape (N, C).
+                - logits (np.ndarray): Low-resolution mask logits of shape (N, C, 256, 256).
+        """
+        boxes = torch.as_tensor(np.asarray(boxes_xyxy, dtype=np.float32).reshape(-1, 4), device=self.device)
+        if len(boxes) == 0:
+            num_masks = 3 if multimask_output else 1
+            return (
+                np.zeros((0, num_masks, *self.original_size), dtype=bool),
+                np.zeros((0, num_masks), dtype=np.float32),
+                np.zeros((0, num_masks, 256, 256), dtype=np.float32)
+            )
+
+        transformed_boxes = self.transform.apply_boxes_torch(boxes, self.original_size)
+
+        masks, scores, logits = self.predict_torch(
+            point_coords=None,
+            point_labels=None,
+            boxes=transformed_boxes,
+            multimask_output=multimask_output
+        )
+
+        return masks.cpu().numpy(), scores.cpu().numpy(), logits.cpu().numpy()
+
+
+    def predict_boxes_batch(self, images: Sequence[np.ndarray], boxes_xyxy: Sequence[np.ndarray], multimask_output: bool = False):
+        """
+        Predicts masks for the box prompts of several images, see `predict_boxes`. The images
+        are embedded in a single batch of the image encoder, which uses accelerators better
+        than one image at a time.
+
+        Args:
+            images (Sequence[np.ndarray]): Images in HWC uint8 format.
+            boxes_xyxy (Sequence[np.ndarray]): Box prompts of each image with shape (N, 4) as [x0, y0, x1, y1].
+            multimask_output (bool): If True, returns three masks per box, otherwise a single one.
+
+        Yields:
+            tuple: Masks, scores and logits of each image in order, see `predict_boxes`.
+        """
+        embeddings = self.embed_images(images)
+
+        for image, embedding, image_boxes in zip(images, embeddings, boxes_xyxy):
+            self._set_embedding(embedding, image.shape[:2])
+            yield self.predict_boxes(image_boxes, multimask_output)
+
+
+    def predict_crops(self, image: np.ndarray, boxes_xyxy: np.ndarray, padding: float = 0.2, multimask_output: bool = False):
+        """
+        Predicts masks for multiple box prompts, embedding a padded crop around each box instead of the whole image.
+
+        Since SAM resizes its input to a fixed size, small cross-sections on large drawings are
+        embedded at a much higher resolution. The masks are returned in crop coordinates, which
+        saves the memory of image-sized masks. Every box needs its own image embedding, so the
+        mode pays off for drawings with few cross-sections.
+
+        Args:
+            image (np.ndarray): Image in HWC uint8 format.
+            boxes_xyxy (np.ndarray): Box prompts of shape (N, 4) as [x0, y0, x1, y1] in image coordinates.
+            padding (float): Margin around each box, relative to the longer side of the box.
+            multimask_output (bool): If True, returns three masks per box, otherwise a single one.
+
+        Returns:
+            tuple: 
+                - masks (list): Binary masks of each box with shape (C, h, w) in crop coordinates,
+                  with C = 3 if `multimask_output` else 1.
+                - scores (np.ndarray): Predicted mask qualities of shape (N, C).
+                - offsets (list): Position (x, y) of each crop in the image.
+        """
+        image_height, image_width = image.shape[:2]
+
+        masks, scores, offsets = [], [], []
+        for x0, y0, x1, y1 in np.asarray(boxes_xyxy, dtype=float).reshape(-1, 4):
+            margin = padding * max(x1 - x0, y1 - y0)
+            crop_x0, crop_y0 = max(math.floor(x0 - margin), 0), max(math.floor(y0 - margin), 0)
+            crop_x1, crop_y1 = min(math.ceil(x1 + margin), image_width), min(math.ceil(y1 + margin), image_height)
+
+            self.set_image(image[crop_y0:crop_y1, crop_x0:crop_x1])
+
+            box_masks, box_scores, _ = self.predict(
+                box=np.array([x0 - crop_x0, y0 - crop_y0, x1 - crop_x0, y1 - crop_y0]),
+                multimask_output=multimask_output
+            )
+
+            masks.append(box_masks)
+            scores.append(box_scores)
+            offsets.append((crop_x0, crop_y0))
 
-    
\ No newline at end of file
+        num_masks = 3 if multimask_output else 1
+        return masks, np.array(scores, dtype=np.float32).reshape(-1, num_masks), offsets
@@ -0,0 +1,154 @@
+from typing import Sequence
+import numpy as np
+import torch
+from segment_anything.utils.transforms import ResizeLongestSide
+
+from tools.mask_generator import MaskGenerator
+
+
+class OnnxMaskGenerator(MaskGenerator):
+    """
+    A `MaskGenerator` that runs ONNX exports of SAM with onnxruntime instead of the PyTorch model.
+
+    The image encoder and the prompt encoder with mask decoder are separate models, as written
+    by `export.py`, optionally with INT8 weights from dynamic quantization. On CPU, this avoids
+    the overhead of eager PyTorch and the quantized encoder is considerably faster. The class
+    offers the same interface as `MaskGenerator` (`set_image`, `predict`, `predict_boxes`
+    and `predict_crops`), including the embedding cache.
+
+    Args:
+        encoder_path (str): Path to the ONNX export of the image encoder.
+        decoder_path (str): Path to the ONNX export of the prompt encoder and mask decoder.
+        cache_dir (str, optional): Directory of the embedding cache; no caching if None.
+        cache_size (float): Size cap of the embedding cache in gigabytes.
+        threads (int, optional): Intra-op threads of onnxruntime; defaults to the number of cores.
+    """
+    IMAGE_SIZE = 1024
+    PIXEL_MEAN = np.array([123.675, 116.28, 103.53], dtype=np.float32)
+    PIXEL_STD = np.array([58.395, 57.12, 57.375], dtype=np.float32)
+    MASK_THRESHOLD = 0.0
+
+    def __init__(self,
+                 encoder_path: str,
+                 decoder_path: str,
+                 cache_dir: str = None,
+                 cache_size: float = 10.0,
+                 threads: int = None
+                ):
+        # Optional dependency, only needed for this runtime
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads is not None:
+            options.intra_op_num_threads = threads
+
+        self.encoder = onnxruntime.InferenceSession(encoder_path, options, providers=["CPUExecutionProvider"])
+        self.decoder = onnxruntime.InferenceSession(decoder_path, options, providers=["CPUExecutionProvider"])
+
+        # The sessions replace the PyTorch model of `SamPredictor`
+        self.model = None
+        self.transform = ResizeLongestSide(self.IMAGE_SIZE)
+        self.reset_image()
+
+        self.model_type = "onnx"
+        self._init_embedding_cache(cache_dir, cache_size, encoder_path)
+
+
+    @property
+    def device(self):
+        return torch.device("cpu")
+
+
+    def _encode_images(self, images: Sequence[np.ndarray], image_format: str):
+        """
+        Runs the encoder session on each image, with the preprocessing of `Sam.preprocess`.
+        The exported encoder has a fixed batch size of one.
+        """
+        if image_format not in ("RGB", "BGR"):
+            raise ValueError(f"Unknown image format: {image_format}")
+
+        embeddings = []
+        for image in images:
+            if image_format == "BGR":
+                image = image[..., ::-1]
+
+            input_image = self.transform.apply_image(image)
+            height, width = input_image.shape[:2]
+
+            # Normalize and pad to the square input of the encoder
+            encoder_input = np.zeros((1, 3, self.IMAGE_SIZE, self.IMAGE_SIZE), dtype=np.float32)
+            encoder_input[0, :, :height, :width] = ((input_image - self.PIXEL_MEAN) / self.PIXEL_STD).transpose(2, 0, 1)
+
+            embedding = self.encoder.run(None, {self.encoder.get_inputs()[0].name: encoder_input})[0]
+            embeddings.append(torch.from_numpy(embedding))
+
+        return embeddings
+
+
+    def predict_torch(
+        self,
+        point_coords: torch.Tensor,
+        point_labels: torch.Tensor,
+        boxes: torch.Tensor = None,
+        mask_input: torch.Tensor = None,
+        multimask_output: bool = True,
+        return_logits: bool = False,
+    ):
+        """
+        Predicts masks for prompts in the input frame of the encoder with the decoder session,
+        see `SamPredictor.predict_torch`. Each prompt is decoded in its own session run.
+
+        Returns:
+            tuple: Masks of shape (B, C, H, W), predicted mask qualities of shape (B, C) and
+            low-resolution mask logits of shape (B, C, 256, 256), as tensors.
+        """
+        if not self.is_image_set:
+            raise RuntimeError("An image must be set with .set_image(...) before mask prediction.")
+
+        coords, labels = [], []
+        if point_coords is not None:
+            coords.append(point_coords.cpu().numpy())
+            labels.append(point_labels.cpu().numpy())
+        if boxes is not None:
+            # The decoder takes boxes as two corner points with the labels 2 and 3
+            box_corners = boxes.cpu().numpy().reshape(-1, 2, 2)
+            coords.append(box_corners)
+            labels.append(np.broadcast_to([2, 3], box_corners.shape[:2]))
+        else:
+            # Without boxes, the prompt encoder appends a padding point
+            coords.append(np.zeros((len(coords[0]), 1, 2)))
+            labels.append(-np.ones((len(coords[0]), 1)))
+
+        coords = np.concatenate(coords, axis=1).astype(np.float32)
+        labels = np.concatenate(labels, axis=1).astype(np.float32)
+
+        if mask_input is not None:
+            mask_input = mask_input.cpu().numpy().astype(np.float32)
+        has_mask_input = np.array([0.0 if mask_input is None else 1.0], dtype=np.float32)
+        embedding = self.features.cpu().numpy()
+        original_size = np.array(self.original_size, dtype=np.float32)
+
+        # The export returns the single-mask output first, followed by the three multimask outputs
+        channels = slice(1, None) if multimask_output else slice(0, 1)
+
+        masks, scores, low_res_masks = [], [], []
+        for index in range(len(coords)):
+            prompt_masks, prompt_scores, prompt_low_res_masks = self.decoder.run(None, {
+                "image_embeddings": embedding,
+                "point_coords": coords[index:index + 1],
+                "point_labels": labels[index:index + 1],
+                "mask_input": mask_input[index:index + 1] if mask_input is not None else np.zeros((1, 1, 256, 256), dtype=np.float32),
+                "has_mask_input": has_mask_input,
+                "orig_im_size": original_size,
+            })
+
+            masks.append(prompt_masks[:, channels])
+            scores.append(prompt_scores[:, channels])
+            low_res_masks.append(prompt_low_res_masks[:, channels])
+
+        masks = torch.from_numpy(np.concatenate(masks))
+        if not return_logits:
+            masks = masks > self.MASK_THRESHOLD
+
+        return masks, torch.from_numpy(np.concatenate(scores)), torch.from_numpy(np.concatenate(low_res_masks))
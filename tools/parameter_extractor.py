@@ -1,7 +1,25 @@
+import copy
 import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import shapely
 from shapely import Polygon
 from typing import Sequence
-from  scipy.optimize import dual_annealing
+from scipy.optimize import OptimizeResult, minimize
+
+from optimizers.base_optimizer import BaseOptimizer
+from optimizers.dual_annealing_optimizer import DualAnnealingOptimizer
+from optimizers.early_stopping import EarlyStopping, StopOptimization
+from tools.convex_clip_overlap import ConvexClipOverlap
+from tools.contour_overlap import ContourOverlap
+from tools.exact_overlap import ExactOverlap
+from tools.fit_cache import FitCache
+from tools.raster_overlap import RasterOverlap
+from tools.mask_contours import MaskContours
+from tools.smooth_overlap import SmoothOverlap
+from utils import geometry_utils
 
 class ParameterExtractor:
     """
@@ -13,17 +31,120 @@ class ParameterExtractor:
         weight_overlap (float): Weight for the IoU-based overlap area term.
         weight_distance (float): Weight for the DIoU-based center distance term.
         weight_aspect_ratio (float): Weight for the CIoU-based aspect ratio term.
+        loss_backend (str): Loss evaluation backend, one of "shapely" (exact polygon intersection, 
+            see `ExactOverlap`), "raster" (occupancy grid of the reference polygon, see `RasterOverlap`;
+            batched optimizers only, see `BaseOptimizer.BATCHED`),
+            "convex" (NumPy clipping of convex pieces, see `ConvexClipOverlap`) or "contour" (boundary
+            integrals over the contours of the reference mask, see `ContourOverlap`).
+        raster_resolution (int): Grid cells along the longer side of the reference polygon 
+            when using the "raster" backend.
+        optimizer (BaseOptimizer, optional): Global optimization strategy, see the `optimizers` 
+            package. Defaults to dual annealing with its default settings.
+        target_loss (float, optional): Stop the optimization once the loss reaches this value.
+        patience (int, optional): Stop the optimization after this many iterations without improvement, see `EarlyStopping`.
+        max_time (float, optional): Wall-clock budget per optimization in seconds.
+        restarts (int): Number of independent optimization runs per fit, each with its own seed.
+            Runs beyond the first are distributed over a pool of worker processes.
+        workers (int, optional): Number of worker processes for the restarts; defaults to
+            the number of restarts, at most the number of CPUs.
+        result_cache (FitCache, optional): Cache of fitted parameters; recurring reference
+            polygons skip the optimization, see `FitCache`.
+        refine (bool): Refine the result of the global search with L-BFGS-B on a smooth surrogate
+            of the loss with an analytic gradient, see `smooth_loss`. Combined with a short
+            global search, this reaches a comparable fit with far fewer loss evaluations.
+        refine_maxiter (int): Maximum number of L-BFGS-B iterations of the refinement.
+        smooth_sigma (float): Blur of the reference density of the surrogate loss in grid cells
+            of `raster_resolution`, see `SmoothOverlap`.
+        coarse_to_fine (bool): Fit in two stages, see `optimize_run`: first against a coarser
+            reference within the wide bounds of the template, then against the full reference
+            within narrow bounds around the coarse result.
+        coarse_tolerance (float): Simplification tolerance of the coarse reference polygon as
+            a fraction of its perimeter, as `factor_arclength` of `PolygonSimplifier`.
+        coarse_resolution (int): Grid cells along the longer side of the coarse reference
+            when using the "raster" backend.
+        coarse_budget (float): Iterations of the coarse stage as a fraction of the optimizer's `maxiter`
+            (iterations for dual annealing, generations for population-based optimizers).
+        fine_budget (float): Iterations of the fine stage as a fraction of the optimizer's `maxiter`.
+        fine_range (float): Half-width of the bounds of the fine stage as a fraction of the longer
+            side of the reference bounding box, at most `parameter_range_limit` of the template.
     """
     
+    LOSS_BACKENDS = ("shapely", "raster", "convex", "contour")
+
     def __init__(
         self,
         weight_overlap: float,
         weight_distance: float,
-        weight_aspect_ratio: float
+        weight_aspect_ratio: float,
+        loss_backend: str = "shapely",
+        raster_resolution: int = 256,
+        optimizer: BaseOptimizer = None,
+        target_loss: float = None,
+        patience: int = None,
+        max_time: float = None,
+        restarts: int = 1,
+        workers: int = None,
+        result_cache: FitCache = None,
+        refine: bool = False,
+        refine_maxiter: int = 100,
+        smooth_sigma: float = 1.0,
+        coarse_to_fine: bool = False,
+        coarse_tolerance: float = 0.03,
+        coarse_resolution: int = 64,
+        coarse_budget: float = 0.1,
+        fine_budget: float = 0.1,
+        fine_range: float = 0.1
     ):
+        if loss_backend not in self.LOSS_BACKENDS:
+            raise ValueError(f"Unknown loss backend '{loss_backend}', expected one of {self.LOSS_BACKENDS}")
+
+        optimizer = optimizer if optimizer is not None else DualAnnealingOptimizer()
+        # A raster evaluation costs more than an exact overlay unless it is vectorized over a batch
+        if loss_backend == "raster" and not optimizer.BATCHED:
+            raise ValueError(f"The 'raster' loss backend requires a batched optimizer, {type(optimizer).__name__} evaluates one candidate at a time")
+
         self.w_overlap = weight_overlap
         self.w_distance = weight_distance
         self.w_aspect_ratio = weight_aspect_ratio
+        self.loss_backend = loss_backend
+        self.raster_resolution = raster_resolution
+        self.optimizer = optimizer
+        self.early_stopping = EarlyStopping(target_loss, patience, max_time)
+        self.restarts = max(1, restarts)
+        self.workers = workers if workers is not None else min(self.restarts, os.cpu_count() or 1)
+        self.result_cache = result_cache
+        self.refine = refine
+        self.refine_maxiter = refine_maxiter
+        self.smooth_sigma = smooth_sigma
+        self.coarse_to_fine = coarse_to_fine
+        self.coarse_tolerance = coarse_tolerance
+        self.coarse_resolution = coarse_resolution
+        self.coarse_budget = coarse_budget
+        self.fine_budget = fine_budget
+        self.fine_range = fine_range
+        self._executor = None
+
+
+    def __getstate__(self):
+        """
+        Excludes the reference state of the last fit and the worker pool from pickling, 
+        so that the extractor can be shipped cheaply to the restart workers.
+        """
+        state = self.__dict__.copy()
+        for attribute in ("reference_polygon", "overlap", "smooth_overlap", "_executor"):
+            state.pop(attribute, None)
+        return state
+
+
+    def close(self):
+        """
+        Shuts down the worker pool of the restarts, if one was started, and closes the result cache.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self.result_cache is not None:
+            self.result_cache.close()
 
 
     def ciou_loss(self, params: Sequence[float], template):
@@ -35,27 +156,271 @@ class ParameterExtractor:
         2. Centroid distance loss (center alignment)
         3. Aspect ratio loss (shape similarity)
 
+        The overlap with the reference is evaluated once by the active backend (`self.overlap`) 
+        and shared by all three terms. Area, centroid and bounds of the candidate are computed 
+        in closed form from its vertices, those of the reference are precomputed.
+
         Args:
             params (Sequence[float]): Parameter vector used to generate the candidate polygon.
-            template: Template object with a `make_polygon_from_params` method.
+            template: Template object with a `make_vertices_from_params` method.
 
         Returns:
             float: Combined geometric loss value.
         """
         
-        candidate_polygon = template.make_polygon_from_params(params)
-        reference_polygon = self.reference_polygon
+        vertices = template.make_vertices_from_params(params)
+        intersection = self.overlap.intersection_area(vertices)
 
-        overlap_loss = self.iou_loss(reference_polygon, candidate_polygon)
-        centroid_loss = self.centroid_alignment_loss(reference_polygon, candidate_polygon)
-        aspect_loss = self.aspect_ratio_loss(reference_polygon, candidate_polygon)
+        return float(self.combined_loss_from_overlap(self.overlap, vertices, intersection))
 
-        total_loss = self.w_overlap*overlap_loss + self.w_distance*centroid_loss + self.w_aspect_ratio*aspect_loss
-        
-        return total_loss
+
+    def ciou_loss_batch(self, params_matrix: np.ndarray, template, chunk_size: int = 1024):
+        """
+        Compute the combined geometric CIoU loss for many parameter vectors in one call.
+
+        Equivalent to calling `ciou_loss` for every row, but candidate vertices, overlaps and 
+        loss terms are evaluated as NumPy arrays. Large batches are processed in chunks to 
+        bound the memory of the intermediate arrays.
+
+        Args:
+            params_matrix (np.ndarray): Parameter vectors of shape (N, P).
+            template: Template object with a `make_vertices_batch` method.
+            chunk_size (int): Maximum number of candidates evaluated at once.
+
+        Returns:
+            np.ndarray: Combined geometric loss values of shape (N,).
+        """
+
+        params_matrix = np.atleast_2d(params_matrix)
+        losses = np.empty(len(params_matrix))
+
+        for start in range(0, len(params_matrix), chunk_size):
+            vertices = template.make_vertices_batch(params_matrix[start:start + chunk_size])
+            intersection = self.overlap.intersection_area(vertices)
+            losses[start:start + chunk_size] = self.combined_loss_from_overlap(self.overlap, vertices, intersection)
+
+        return losses
+
+
+    def set_reference(self, reference_polygon: Polygon, template, mask_contours: MaskContours = None):
+        """
+        Set the reference polygon and precompute the overlap backend for it. 
+        Called by `optimize`, and required before calling `ciou_loss` or `ciou_loss_batch` directly.
+
+        Args:
+            reference_polygon (Polygon): Target polygon to fit the template to.
+            template: Template object whose candidates are compared against the reference.
+            mask_contours (MaskContours, optional): Contours of the reference mask for the
+                "contour" backend; those of the rasterized reference polygon if None.
+        """
+
+        self.reference_polygon = reference_polygon
+        self.overlap = self.create_overlap(reference_polygon, template, mask_contours)
+        self.smooth_overlap = SmoothOverlap(reference_polygon, self.raster_resolution, self.smooth_sigma) if self.refine else None
+
+
+    def create_overlap(self, reference_polygon: Polygon, template, mask_contours: MaskContours = None, raster_resolution: int = None):
+        """
+        Create the overlap backend for a reference polygon according to `self.loss_backend`.
+
+        Args:
+            reference_polygon (Polygon): Target polygon to fit the template to.
+            template: Template object whose candidates are compared against the reference.
+            mask_contours (MaskContours, optional): Contours of the reference mask, see `set_reference`.
+            raster_resolution (int, optional): Grid resolution of the "raster" backend; defaults to `raster_resolution`.
+
+        Returns:
+            ExactOverlap, RasterOverlap, ConvexClipOverlap or ContourOverlap: Backend with precomputed reference geometry.
+        """
+
+        if self.loss_backend == "raster":
+            return RasterOverlap(reference_polygon, raster_resolution or self.raster_resolution)
         
+        if self.loss_backend == "convex":
+            return ConvexClipOverlap(reference_polygon, template)
+
+        if self.loss_backend == "contour":
+            if mask_contours is None:
+                mask_contours = MaskContours.from_polygon(reference_polygon)
+            return ContourOverlap(reference_polygon, mask_contours)
+
+        return ExactOverlap(reference_polygon)
+
+
+    def combined_loss_from_overlap(self, reference, vertices: np.ndarray, intersection):
+        """
+        Compute the combined geometric CIoU loss from a precomputed overlap area.
+
+        Equivalent to `iou_loss`, `centroid_alignment_loss` and `aspect_ratio_loss` combined, 
+        but evaluated in closed form so that a single overlap evaluation serves all three terms.
+        Works on a single candidate as well as on a stack of candidates.
+
+        Args:
+            reference: Precomputed reference geometry with `area`, `centroid` and `bounds` attributes.
+            vertices (np.ndarray): Candidate vertices of shape (V, 2) or (N, V, 2).
+            intersection (float or np.ndarray): Intersection area with the reference, scalar or of shape (N,).
+
+        Returns:
+            float or np.ndarray: Combined geometric loss value(s), scalar or of shape (N,).
+        """
+
+        candidate_area, x_cand, y_cand = geometry_utils.polygon_area_centroid(vertices)
+        minx_cand, miny_cand, maxx_cand, maxy_cand = geometry_utils.polygon_bounds(vertices)
+
+        x_ref, y_ref = reference.centroid.tolist()
+        minx_ref, miny_ref, maxx_ref, maxy_ref = reference.bounds.tolist()
+
+        # IoU-based overlap loss, union derived from the intersection
+        union = reference.area + candidate_area - intersection
+        iou = intersection / (union + 1e-10)
+        overlap_loss = 1 - iou
+
+        # Centroid alignment loss
+        squared_distance = (x_ref - x_cand) ** 2 + (y_ref - y_cand) ** 2
+
+        enclosing_width = np.maximum(maxx_ref, maxx_cand) - np.minimum(minx_ref, minx_cand)
+        enclosing_height = np.maximum(maxy_ref, maxy_cand) - np.minimum(miny_ref, miny_cand)
+        enclosing_diag_squared = enclosing_width ** 2 + enclosing_height ** 2 + 1e-10
+
+        centroid_loss = squared_distance / enclosing_diag_squared
+
+        # Aspect ratio loss, only active for sufficiently overlapping candidates
+        angle_diff = (
+            math.atan2(maxx_ref - minx_ref, maxy_ref - miny_ref) 
+            - np.arctan2(maxx_cand - minx_cand, maxy_cand - miny_cand)
+        )
+        v = (4 / math.pi**2) * (angle_diff ** 2)
+
+        alpha = v / (1 - iou + v + 1e-10)
+        aspect_loss = (iou >= 0.5) * alpha * v
+
+        return self.w_overlap*overlap_loss + self.w_distance*centroid_loss + self.w_aspect_ratio*aspect_loss
     
     
+    def smooth_loss(self, params: Sequence[float], template):
+        """
+        Compute a smooth surrogate of the combined geometric CIoU loss and its analytic gradient.
+
+        The terms are those of `combined_loss_from_overlap`, with the overlap evaluated on the
+        blurred reference density of `self.smooth_overlap`. Area, centroid and bounds of the
+        candidate are differentiated in closed form, the bounds with respect to their extreme
+        vertices. As in CIoU, the trade-off weight of the aspect ratio term is treated as a constant.
+        Requires `set_reference` with `refine` enabled.
+
+        Args:
+            params (Sequence[float]): Parameter vector used to generate the candidate polygon.
+            template: Template object with a `VERTEX_MAP`, see `BaseTemplate`.
+
+        Returns:
+            tuple: Surrogate loss (float) and its gradient with respect to the parameters of shape (P,).
+        """
+        reference = self.smooth_overlap
+        vertices = template.make_vertices_from_params(params)
+        intersection, d_intersection = reference.intersection_area_and_gradient(vertices)
+
+        x, y = vertices[:, 0], vertices[:, 1]
+        x_next, y_next = np.roll(x, -1), np.roll(y, -1)
+        cross = x * y_next - x_next * y
+        twice_area = cross.sum() or 1e-10
+        candidate_area = 0.5 * abs(twice_area)
+        x_cand = ((x + x_next) * cross).sum() / (3 * twice_area)
+        y_cand = ((y + y_next) * cross).sum() / (3 * twice_area)
+
+        min_index_x, min_index_y = np.argmin(vertices, axis=0)
+        max_index_x, max_index_y = np.argmax(vertices, axis=0)
+        minx_cand, miny_cand, maxx_cand, maxy_cand = x[min_index_x], y[min_index_y], x[max_index_x], y[max_index_y]
+
+        x_ref, y_ref = reference.centroid.tolist()
+        minx_ref, miny_ref, maxx_ref, maxy_ref = reference.bounds.tolist()
+
+        # IoU-based overlap loss
+        union = reference.area + candidate_area - intersection + 1e-10
+        iou = intersection / union
+        overlap_loss = 1 - iou
+
+        # Centroid alignment loss
+        squared_distance = (x_ref - x_cand) ** 2 + (y_ref - y_cand) ** 2
+        enclosing_width = max(maxx_ref, maxx_cand) - min(minx_ref, minx_cand)
+        enclosing_height = max(maxy_ref, maxy_cand) - min(miny_ref, miny_cand)
+        enclosing_diag_squared = enclosing_width ** 2 + enclosing_height ** 2 + 1e-10
+        centroid_loss = squared_distance / enclosing_diag_squared
+
+        # Aspect ratio loss
+        width_cand, height_cand = maxx_cand - minx_cand, maxy_cand - miny_cand
+        angle_diff = math.atan2(maxx_ref - minx_ref, maxy_ref - miny_ref) - math.atan2(width_cand, height_cand)
+        v = (4 / math.pi**2) * angle_diff ** 2
+        alpha = v / (1 - iou + v + 1e-10)
+        aspect_loss = alpha * v if iou >= 0.5 else 0.0
+
+        loss = self.w_overlap*overlap_loss + self.w_distance*centroid_loss + self.w_aspect_ratio*aspect_loss
+
+        # Gradients of the loss with respect to the intermediate quantities
+        grad_intersection = -self.w_overlap * (union + intersection) / union ** 2
+        grad_area = self.w_overlap * intersection / union ** 2
+        grad_x_cand = -2 * self.w_distance * (x_ref - x_cand) / enclosing_diag_squared
+        grad_y_cand = -2 * self.w_distance * (y_ref - y_cand) / enclosing_diag_squared
+        grad_width = -2 * self.w_distance * squared_distance * enclosing_width / enclosing_diag_squared ** 2
+        grad_height = -2 * self.w_distance * squared_distance * enclosing_height / enclosing_diag_squared ** 2
+
+        grad_bounds = np.array([
+            -grad_width * (minx_cand < minx_ref),
+            -grad_height * (miny_cand < miny_ref),
+            grad_width * (maxx_cand > maxx_ref),
+            grad_height * (maxy_cand > maxy_ref),
+        ])
+
+        if iou >= 0.5:
+            grad_angle = self.w_aspect_ratio * alpha * (8 / math.pi**2) * angle_diff
+            diagonal_squared = width_cand ** 2 + height_cand ** 2 + 1e-10
+            grad_width_cand = -grad_angle * height_cand / diagonal_squared
+            grad_height_cand = grad_angle * width_cand / diagonal_squared
+            grad_bounds += [-grad_width_cand, -grad_height_cand, grad_width_cand, grad_height_cand]
+
+        # Back through centroid and area to the shoelace cross products
+        grad_sum_x = grad_x_cand / (3 * twice_area)
+        grad_sum_y = grad_y_cand / (3 * twice_area)
+        grad_twice_area = -(grad_x_cand * x_cand + grad_y_cand * y_cand) / twice_area + 0.5 * np.sign(twice_area) * grad_area
+        grad_cross = grad_twice_area + grad_sum_x * (x + x_next) + grad_sum_y * (y + y_next)
+
+        grad_x = grad_sum_x * cross + np.roll(grad_sum_x * cross, 1) + grad_cross * y_next - np.roll(grad_cross * y, 1)
+        grad_y = grad_sum_y * cross + np.roll(grad_sum_y * cross, 1) - grad_cross * x_next + np.roll(grad_cross * x, 1)
+
+        grad_vertices = np.stack([grad_x, grad_y], axis=-1) + grad_intersection * d_intersection
+        grad_vertices[min_index_x, 0] += grad_bounds[0]
+        grad_vertices[min_index_y, 1] += grad_bounds[1]
+        grad_vertices[max_index_x, 0] += grad_bounds[2]
+        grad_vertices[max_index_y, 1] += grad_bounds[3]
+
+        # Vertices are a linear map of the parameters
+        grad_params = template.VERTEX_MAP.reshape(-1, len(params)).T @ grad_vertices.reshape(-1)
+
+        return float(loss), grad_params
+
+
+    def refine_parameters(self, template, x0: Sequence[float], bounds: Sequence[Sequence[float]]):
+        """
+        Refines parameters locally with L-BFGS-B on the smooth surrogate loss, see `smooth_loss`.
+
+        Args:
+            template: Template object to fit.
+            x0 (Sequence[float]): Parameters to start from, e.g. the result of the global search.
+            bounds (Sequence[Sequence[float]]): Bounds of the parameters, see `BaseTemplate.create_bounds`.
+
+        Returns:
+            OptimizeResult: Result of L-BFGS-B, with `x` clipped to the bounds.
+        """
+        refinement = minimize(
+            lambda params: self.smooth_loss(params, template),
+            x0=np.asarray(x0, dtype=float),
+            jac=True,
+            method="L-BFGS-B",
+            bounds=bounds,
+            options={"maxiter": self.refine_maxiter})
+        refinement.x = np.clip(refinement.x, *np.asarray(bounds, dtype=float).T)
+
+        return refinement
+
+
     def iou_loss(self, reference_polygon: Polygon, candidate_polygon: Polygon):            
         """
         Compute the IoU-based loss between the reference and candidate polygons.
@@ -145,33 +510,133 @@ class ParameterExtractor:
         
 
 
-    def optimize(self, template, reference_polygon: Polygon, record_iterations: bool = False, **kwargs):
+    def optimize(
+        self, 
+        template, 
+        reference_polygon: Polygon, 
+        record_iterations: bool = False, 
+        return_result: bool = False, 
+        mask_contours: MaskContours = None,
+        **kwargs
+    ):
         """
         Optimize template parameters to best fit a given reference polygon.
-        The method performs global optimization using dual annealing. 
+        The method performs global optimization using the configured optimizer strategy
+        (dual annealing by default). The run ends early once one of the configured 
+        criteria (target loss, patience, wall-clock budget) is met.
+
+        With `restarts` > 1, independent runs with different seeds are distributed over a 
+        process pool and the best one is returned. The spread of the results across the 
+        runs indicates how reliably the fit was found.
+
+        With a result cache, a reference polygon whose shape was fitted before with the same
+        template and settings returns the cached parameters, translated to its position,
+        without optimization. Fits with `record_iterations` bypass the cache.
 
         Args:
-            template: Parametric cross-section template with a method 
-                `make_polygon_from_params(params: Sequence[float])`.
+            template: Parametric cross-section template with the methods 
+                `make_polygon_from_params(params: Sequence[float])`,
+                `make_vertices_from_params(params: Sequence[float])` and
+                `make_vertices_batch(params: np.ndarray)`.
             reference_polygon (Polygon): Target polygon to fit the template to.
-            track_history (bool): If True, returns all evaluated parameter vectors 
-                along with their associated loss values.
+            record_iterations (bool): If True, returns the best parameter vector
+                along with its loss value after every iteration.
+            return_result (bool): If True, returns a result object instead of the bare 
+                parameter vector, reporting the loss, the number of loss evaluations and
+                why the optimization stopped.
+            mask_contours (MaskContours, optional): Contours of the reference mask for the
+                "contour" backend, see `set_reference`.
+            **kwargs: Options passed to the optimizer's `minimize` method (e.g. `maxiter`).
 
         Returns:
-            Sequence[float]: Optimal parameter vector.
-            If `track_history` is True, also returns a list of all iterations as
-            lists (parameter_vector, loss_value).
+            Sequence[float] or OptimizeResult: Optimal parameter vector or, if `return_result` 
+            is True, a result with the attributes `x`, `fun`, `nfev`, `stop_reason` 
+            ("completed", "target_loss", "patience", "max_time" or "cached") and `message`.
+            With restarts, the result additionally holds the final losses of all runs 
+            (`restart_losses`), their standard deviation (`loss_spread`) and the standard 
+            deviation of the fitted parameters across the runs (`parameter_spread`).
+            If `record_iterations` is True, also returns a list of all iterations as
+            lists (parameter_vector, loss_value) of the best run.
         """
-        
-        self.reference_polygon = reference_polygon
+        use_cache = self.result_cache is not None and not record_iterations
+        if use_cache:
+            normalized_polygon, origin = FitCache.normalize(reference_polygon)
+            # Fits on mask contours also depend on the mask behind the reference polygon
+            mask_key = mask_contours.cache_key(origin) if mask_contours is not None else None
+            cache_key = FitCache.make_key(normalized_polygon, *self.cache_identifiers(template), sorted(kwargs.items()), mask_key)
+
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                params, loss = cached
+                # The offset parameters are stored relative to the origin of the reference polygon
+                params[:2] += origin
+                results = OptimizeResult(x=params, fun=loss, nfev=0, message="Loaded from the result cache.", stop_reason="cached")
+                return results if return_result else results.x
+
+        if self.restarts > 1:
+            results, iterations = self.optimize_restarts(template, reference_polygon, record_iterations, mask_contours, **kwargs)
+        else:
+            results, iterations = self.optimize_run(template, reference_polygon, record_iterations, mask_contours, **kwargs)
+
+        if use_cache:
+            params = np.array(results.x, dtype=float)
+            params[:2] -= origin
+            self.result_cache.put(cache_key, params, results.fun)
+
+        final = results if return_result else results.x
+
+        if record_iterations:
+            return final, iterations
+
+        return final
+
+
+    def cache_identifiers(self, template):
+        """
+        Collects the settings that a fit depends on besides the reference polygon, for the keys of the result cache.
+
+        Args:
+            template: Template object to fit.
 
+        Returns:
+            tuple: Template class and settings, loss settings, optimizer class and settings, stopping criteria, refinement and stage settings.
+        """
+        return (
+            f"{type(template).__module__}.{type(template).__qualname__}",
+            sorted((name, value) for name, value in vars(template).items() if isinstance(value, (int, float, str))),
+            (self.w_overlap, self.w_distance, self.w_aspect_ratio, self.loss_backend, self.raster_resolution),
+            type(self.optimizer).__qualname__,
+            sorted(vars(self.optimizer).items()),
+            (self.early_stopping.target_loss, self.early_stopping.patience, self.early_stopping.max_time, self.restarts),
+            (self.refine, self.refine_maxiter, self.smooth_sigma),
+            (self.coarse_to_fine, self.coarse_tolerance, self.coarse_resolution, self.coarse_budget, self.fine_budget, self.fine_range),
+        )
+
+
+    def optimize_run(self, template, reference_polygon: Polygon, record_iterations: bool = False, mask_contours: MaskContours = None, **kwargs):
+        """
+        Runs a single optimization of the template parameters, see `optimize`.
+
+        With `coarse_to_fine`, the run has two stages. The coarse stage fits the template to the
+        reference polygon simplified with `coarse_tolerance` (and, for the "raster" backend, on a
+        grid of `coarse_resolution`) within the wide bounds of `BaseTemplate.create_bounds`, where
+        each evaluation is cheap while the search is still exploring. The fine stage fits the
+        full reference within bounds of `fine_range` around the coarse result, which scale with
+        the size of the cross-section. The stages get `coarse_budget` and `fine_budget` of the
+        optimizer's iterations. Both stages count towards the evaluations and the stopping
+        criteria of the run; recorded iterations include both stages. Strategies that do not
+        profit from the stages (see `BaseOptimizer.COARSE_TO_FINE`, e.g. CMA-ES) run a single stage.
+
+        Returns:
+            tuple: Result object and the list of recorded iterations (None if not recorded).
+        """
         initial_parameters = template.estimate_initial_parameters_simple(reference_polygon)
         initial_bounds = template.create_bounds(initial_parameters)
         
-        
+        iterations = None
         if record_iterations:
             def make_callback(storage):
-                def callback(x, f, context):
+                def callback(x, f):
                     storage.append([x.tolist(), f])  
                 return callback
         
@@ -179,17 +644,153 @@ class ParameterExtractor:
             callback = make_callback(iterations)
         
         else:
-            callback = lambda *_: None
-        
-        results = dual_annealing(
-            func=self.ciou_loss, 
-            bounds=initial_bounds, 
-            args=(template,), 
-            callback=callback,
-            **kwargs)
-    
+            callback = None
+        
+        self.set_reference(reference_polygon, template, mask_contours)
 
-        if record_iterations:
-            return results.x, iterations
+        if self.coarse_to_fine and self.optimizer.COARSE_TO_FINE:
+            coarse_polygon = reference_polygon.simplify(self.coarse_tolerance * reference_polygon.length)
+            if coarse_polygon.is_empty or not coarse_polygon.is_valid:
+                coarse_polygon = reference_polygon
+
+            # Both overlaps are prepared before the clock of the run starts
+            fine_overlap = self.overlap
+            self.overlap = self.create_overlap(coarse_polygon, template, mask_contours, self.coarse_resolution)
+            self.early_stopping.reset()
+
+            maxiter = kwargs.pop("maxiter", self.optimizer.maxiter)
+            coarse_maxiter = max(1, round(self.coarse_budget * maxiter))
+            coarse_results = self.run_stage(template, initial_parameters, initial_bounds, callback, maxiter=coarse_maxiter, **kwargs)
+
+            coarse_evaluations = self.early_stopping.evaluations
+            self.early_stopping.reset(restart_clock=False)
+            self.overlap = fine_overlap
+
+            size = max(np.ptp(np.reshape(reference_polygon.bounds, (2, 2)), axis=0))
+            range_limit = min(self.fine_range * size, template.parameter_range_limit)
+            initial_parameters = np.clip(coarse_results.x, *np.asarray(initial_bounds, dtype=float).T)
+            initial_bounds = template.create_bounds(initial_parameters, range_limit)
+
+            fine_maxiter = max(1, round(self.fine_budget * maxiter))
+            results = self.run_stage(template, initial_parameters, initial_bounds, callback, evaluate_x0=True, maxiter=fine_maxiter, **kwargs)
+            results.nfev += coarse_evaluations
+            results.coarse_fun = coarse_results.fun
+
+        else:
+            self.early_stopping.reset()
+            results = self.run_stage(template, initial_parameters, initial_bounds, callback, **kwargs)
+
+        if self.refine:
+            # The refinement is kept only if it improves the loss of the configured backend
+            refinement = self.refine_parameters(template, results.x, initial_bounds)
+            refined_loss = self.ciou_loss(refinement.x, template)
+            results.nfev += refinement.nfev + 1
+            results.refined = refined_loss < results.fun
+
+            if results.refined:
+                results.x, results.fun = refinement.x, refined_loss
+                if record_iterations:
+                    iterations.append([refinement.x.tolist(), refined_loss])
+
+        return results, iterations
+
+
+    def run_stage(self, template, x0: Sequence[float], bounds: Sequence[Sequence[float]], callback=None, evaluate_x0: bool = False, **kwargs):
+        """
+        Runs the optimizer on the current reference, monitored by the early stopping criteria.
+
+        Args:
+            template: Template object to fit.
+            x0 (Sequence[float]): Initial parameter estimate.
+            bounds (Sequence[Sequence[float]]): Bounds of the parameters, see `BaseTemplate.create_bounds`.
+            callback (Callable, optional): Called with the best parameter vector and its loss after every iteration.
+            evaluate_x0 (bool): Evaluate the initial estimate first, so that the result is at least as good,
+                also for optimizers that start from a random point.
+            **kwargs: Options passed to the optimizer's `minimize` method.
+
+        Returns:
+            OptimizeResult: Result with the attributes `x`, `fun`, `nfev`, `stop_reason` and `message`.
+        """
+        loss = self.early_stopping.wrap(lambda params: self.ciou_loss(params, template))
+
+        try:
+            if evaluate_x0:
+                loss(np.asarray(x0, dtype=float))
+
+            results = self.optimizer.minimize(
+                loss=loss,
+                loss_batch=self.early_stopping.wrap_batch(lambda params_matrix: self.ciou_loss_batch(params_matrix, template)),
+                bounds=bounds,
+                x0=x0,
+                callback=self.early_stopping.wrap_callback(callback),
+                **kwargs)
+            results.stop_reason = "completed"
+
+            if evaluate_x0 and results.fun > self.early_stopping.best_fun:
+                results.x, results.fun = self.early_stopping.best_x, self.early_stopping.best_fun
+        
+        except StopOptimization as stop:
+            results = OptimizeResult(
+                x=self.early_stopping.best_x, 
+                fun=self.early_stopping.best_fun, 
+                message=f"Stopped early ({stop}).", 
+                stop_reason=self.early_stopping.stop_reason)
+        
+        results.nfev = self.early_stopping.evaluations
+
+        return results
+
+
+    def optimize_restarts(self, template, reference_polygon: Polygon, record_iterations: bool = False, mask_contours: MaskContours = None, **kwargs):
+        """
+        Runs `restarts` independent optimizations in the worker pool and selects the best one, see `optimize`.
+        With a single worker, the runs are executed one after another in this process.
+
+        The seeds of the runs are derived from the optimizer's seed, so seeded fits stay reproducible.
+        The reference polygon is sent to the workers as WKB.
+
+        Returns:
+            tuple: Result object of the best run and its recorded iterations (None if not recorded).
+        """
+        base_seed = kwargs.pop("seed", self.optimizer.seed)
+        seeds = [
+            int(sequence.generate_state(1)[0]) 
+            for sequence in np.random.SeedSequence(base_seed).spawn(self.restarts)
+        ]
+        reference_wkb = shapely.to_wkb(reference_polygon)
+
+        if self.workers <= 1:
+            runs = [
+                _optimize_restart(copy.copy(self), template, reference_wkb, mask_contours, seed, record_iterations, kwargs) 
+                for seed in seeds
+            ]
+        else:
+            if self._executor is None:
+                # Spawned workers do not inherit the state of loaded models (e.g. CUDA contexts)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+            futures = [
+                self._executor.submit(_optimize_restart, self, template, reference_wkb, mask_contours, seed, record_iterations, kwargs)
+                for seed in seeds
+            ]
+            runs = [future.result() for future in futures]
+
+        losses = np.array([results.fun for results, _ in runs])
+        best_results, best_iterations = runs[int(np.argmin(losses))]
+
+        best_results.restart_losses = losses
+        best_results.loss_spread = float(losses.std())
+        best_results.parameter_spread = np.std([results.x for results, _ in runs], axis=0)
+        best_results.nfev = sum(results.nfev for results, _ in runs)
+
+        return best_results, best_iterations
+
+
+def _optimize_restart(extractor: ParameterExtractor, template, reference_wkb: bytes, mask_contours: MaskContours, seed: int, record_iterations: bool, kwargs: dict):
+    """
+    Runs one restart of `ParameterExtractor.optimize_restarts` in a worker process.
+    """
+    extractor.optimizer = copy.copy(extractor.optimizer)
+    extractor.optimizer.seed = seed
 
-        return results.x
+    return extractor.optimize_run(template, shapely.from_wkb(reference_wkb), record_iterations, mask_contours, **kwargs)
@@ -0,0 +1,384 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List
+
+from tools.latency_histogram import LatencyHistogram
+
+
+class PipelineStage:
+    """
+    A processing stage of a `Pipeline`, run by one or more worker threads that share a bounded input queue.
+
+    Each worker thread calls `make_worker` once and processes its items with the returned function.
+    This way every worker can hold its own model instance, since the models are not thread-safe.
+
+    Args:
+        name (str): Name of the stage in the statistics.
+        make_worker (Callable): Creates the function that processes one item and returns the
+            item for the next stage.
+        workers (int): Number of worker threads.
+        queue_size (int): Maximum number of items waiting in the input queue of the stage.
+        batch_size (int): Maximum number of items per call. With a batch size above 1, the
+            worker function receives a list of the items that are queued at the time, up to
+            the batch size, and yields their outputs in the same order. Outputs are passed on
+            as soon as they are yielded.
+        max_wait (float): Time in seconds a worker waits after the first item of a batch for
+            further items, to fill batches when items arrive one at a time, e.g. from a service.
+
+    Attributes:
+        processed (int): Number of items processed in the current run.
+        batches (int): Number of calls of the worker functions in the current run.
+        busy_time (float): Summed processing time of all workers in seconds.
+        wait_latency (LatencyHistogram): Time of the items between entering the input queue and the start of their batch.
+        process_latency (LatencyHistogram): Time of the items between the start of their batch and their output.
+    """
+    def __init__(
+        self,
+        name: str,
+        make_worker: Callable[[], Callable],
+        workers: int = 1,
+        queue_size: int = 4,
+        batch_size: int = 1,
+        max_wait: float = 0.0
+    ):
+        self.name = name
+        self.make_worker = make_worker
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+
+        self.input_queue = None
+        self.processed = 0
+        self.batches = 0
+        self.busy_time = 0.0
+        self.wait_latency = LatencyHistogram()
+        self.process_latency = LatencyHistogram()
+        self._lock = threading.Lock()
+        self._finished_workers = 0
+
+
+class _Failure:
+    """
+    Carries an exception raised while processing an item through the remaining stages.
+    """
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_END = object()
+
+
+class Pipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues, so that I/O,
+    model inference and CPU-bound work of different items overlap.
+
+    The outputs are yielded in input order. At most `max_in_flight` items are between the
+    source and the consumer at any time, which bounds the memory of a run independently
+    of the number of inputs. An exception raised by a stage is re-raised to the consumer
+    when the failed item is due.
+
+    Args:
+        stages (List[PipelineStage]): Stages in processing order.
+        max_in_flight (int): Maximum number of items inside the pipeline.
+    """
+    def __init__(self, stages: List[PipelineStage], max_in_flight: int = 16):
+        self.stages = stages
+        self.max_in_flight = max_in_flight
+        self.start_time = None
+
+
+    def run(self, items: Iterable, return_exceptions: bool = False):
+        """
+        Processes the items through all stages.
+
+        Args:
+            items (Iterable): Inputs of the first stage. The items are consumed lazily, so
+                the iterable may block while waiting for new inputs, e.g. of a service.
+            return_exceptions (bool): If True, the exception of a failed item is yielded in
+                place of its output and the run continues, otherwise it is raised.
+
+        Yields:
+            Outputs of the last stage, in the order of the inputs.
+        """
+        self.start_time = time.perf_counter()
+        stop = threading.Event()
+        in_flight = threading.Semaphore(self.max_in_flight)
+
+        for stage in self.stages:
+            stage.input_queue = queue.Queue(stage.queue_size)
+            stage.processed = 0
+            stage.batches = 0
+            stage.busy_time = 0.0
+            stage.wait_latency = LatencyHistogram()
+            stage.process_latency = LatencyHistogram()
+            stage._finished_workers = 0
+        # In-flight items are bounded by the semaphore, so the output queue needs no bound
+        output_queue = queue.Queue()
+
+        threads = [threading.Thread(target=self._feed, args=(items, in_flight, stop), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            next_queue = self.stages[index + 1].input_queue if index + 1 < len(self.stages) else output_queue
+            threads += [
+                threading.Thread(target=self._work, args=(stage, next_queue, stop), name=f"{stage.name}-{worker}", daemon=True)
+                for worker in range(stage.workers)
+            ]
+
+        for thread in threads:
+            thread.start()
+
+        # Reorder the outputs by input index
+        buffer = {}
+        next_index = 0
+        try:
+            while True:
+                entry = _get(output_queue, stop)
+                if entry is _END:
+                    break
+
+                index, payload, _ = entry
+                buffer[index] = payload
+
+                while next_index in buffer:
+                    payload = buffer.pop(next_index)
+                    next_index += 1
+                    in_flight.release()
+
+                    if isinstance(payload, _Failure):
+                        if not return_exceptions:
+                            raise payload.error
+                        payload = payload.error
+                    yield payload
+        finally:
+            # Let the workers finish their current items, so that no thread outlives the run
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+
+    def stats(self):
+        """
+        Reports queue depths and throughput of all stages.
+
+        Returns:
+            list: One dictionary per stage with the keys 'name', 'workers', 'queue_depth',
+            'queue_size', 'processed', 'throughput' (items per second of the run), 'utilization'
+            (busy fraction of the stage's workers), 'batch_size' (mean items per call), and
+            'wait_latency' and 'process_latency' (summaries of the latency histograms in seconds).
+        """
+        elapsed = max(time.perf_counter() - self.start_time, 1e-9) if self.start_time is not None else None
+
+        return [
+            {
+                "name": stage.name,
+                "workers": stage.workers,
+                "queue_depth": stage.input_queue.qsize() if stage.input_queue is not None else 0,
+                "queue_size": stage.queue_size,
+                "processed": stage.processed,
+                "throughput": stage.processed / elapsed if elapsed else 0.0,
+                "utilization": stage.busy_time / (elapsed * stage.workers) if elapsed else 0.0,
+                "batch_size": stage.processed / stage.batches if stage.batches else 0.0,
+                "wait_latency": stage.wait_latency.to_dict(),
+                "process_latency": stage.process_latency.to_dict(),
+            }
+            for stage in self.stages
+        ]
+
+
+    def format_queue_depths(self):
+        """
+        Formats the current queue depths, e.g. for a progress bar.
+
+        Returns:
+            str: Queue depths as 'name depth/size' per stage.
+        """
+        return " ".join(f"{stage['name']} {stage['queue_depth']}/{stage['queue_size']}" for stage in self.stats())
+
+
+    def format_stats(self):
+        """
+        Formats the statistics of all stages as a table, see `format_stats`.
+
+        Returns:
+            str: Table with one row per stage.
+        """
+        return format_stats(self.stats())
+
+
+    def _feed(self, items: Iterable, in_flight: threading.Semaphore, stop: threading.Event):
+        """
+        Puts the indexed items into the first stage, as long as the in-flight limit allows.
+        """
+        first_queue = self.stages[0].input_queue
+        iterator = iter(items)
+        index = 0
+        try:
+            while True:
+                # Acquire the slot before pulling the item, so that no item waits outside the limit
+                while not in_flight.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                _put(first_queue, (index, item, time.perf_counter()), stop)
+                index += 1
+        finally:
+            _put(first_queue, _END, stop)
+
+
+    def _work(self, stage: PipelineStage, next_queue: queue.Queue, stop: threading.Event):
+        """
+        Worker thread of a stage. Forwards the end of the input once all workers of the stage are done.
+        """
+        try:
+            function = stage.make_worker()
+        except Exception as error:
+            # Fail every item of this worker instead of stalling the pipeline
+            def function(item, error=error):
+                raise error
+
+        while not stop.is_set():
+            entries, end_of_input = self._next_batch(stage, stop)
+
+            # Failed items skip the stage
+            for index, payload, queued_time in entries:
+                if isinstance(payload, _Failure):
+                    _put(next_queue, (index, payload, queued_time), stop)
+            entries = [entry for entry in entries if not isinstance(entry[1], _Failure)]
+
+            if entries:
+                self._process(stage, function, entries, next_queue, stop)
+
+            if end_of_input:
+                with stage._lock:
+                    stage._finished_workers += 1
+                    last_worker = stage._finished_workers == stage.workers
+                if last_worker:
+                    _put(next_queue, _END, stop)
+                else:
+                    # Let the sibling workers see the end as well
+                    _put(stage.input_queue, _END, stop)
+                return
+
+
+    def _next_batch(self, stage: PipelineStage, stop: threading.Event):
+        """
+        Waits for the next item of a stage and adds up to `batch_size - 1` further items that are
+        already queued or arrive within `max_wait` seconds after the first item.
+
+        Returns:
+            tuple: List of (index, payload, queued_time) entries and whether the end of the input was reached.
+        """
+        entries = []
+        entry = _get(stage.input_queue, stop)
+        deadline = time.perf_counter() + stage.max_wait
+
+        while entry is not None and entry is not _END:
+            entries.append(entry)
+            if len(entries) == stage.batch_size:
+                return entries, False
+            try:
+                remaining = deadline - time.perf_counter()
+                if remaining > 0:
+                    entry = stage.input_queue.get(timeout=remaining)
+                else:
+                    entry = stage.input_queue.get_nowait()
+            except queue.Empty:
+                return entries, False
+
+        return entries, True
+
+
+    def _process(self, stage: PipelineStage, function: Callable, entries: list, next_queue: queue.Queue, stop: threading.Event):
+        """
+        Processes a batch of entries and forwards every output as soon as it is available.
+        """
+        pending = [index for index, _, _ in entries]
+        payloads = [payload for _, payload, _ in entries]
+        busy_time = 0.0
+
+        batch_start = time.perf_counter()
+        for _, _, queued_time in entries:
+            stage.wait_latency.record(batch_start - queued_time)
+
+        try:
+            start = batch_start
+            outputs = iter([function(payloads[0])] if stage.batch_size == 1 else function(payloads))
+
+            while pending:
+                output = next(outputs, _END)
+                if output is _END:
+                    raise RuntimeError(f"Stage '{stage.name}' returned fewer outputs than items")
+                output_time = time.perf_counter()
+                busy_time += output_time - start
+                stage.process_latency.record(output_time - batch_start)
+
+                _put(next_queue, (pending.pop(0), output, output_time), stop)
+                with stage._lock:
+                    stage.processed += 1
+
+                start = time.perf_counter()
+
+        except Exception as error:
+            # The remaining items of the batch fail with the error
+            for index in pending:
+                _put(next_queue, (index, _Failure(error), time.perf_counter()), stop)
+
+        with stage._lock:
+            stage.busy_time += busy_time
+            stage.batches += 1
+
+
+def format_stats(stats: List[dict]):
+    """
+    Formats the statistics of pipeline stages as a table. The stage with the highest
+    utilization is the bottleneck of the run. Latencies are given in milliseconds.
+
+    Args:
+        stats (List[dict]): Statistics per stage, see `Pipeline.stats`, e.g. as reported by a reconstruction service.
+
+    Returns:
+        str: Table with one row per stage.
+    """
+    lines = [
+        f"{'stage':<10}{'workers':>8}{'queue':>10}{'processed':>11}{'items/s':>10}{'busy':>8}{'batch':>7}"
+        f"{'wait p50':>10}{'p99':>8}{'latency p50':>13}{'p99':>8}"
+    ]
+    for stage in stats:
+        wait, latency = stage["wait_latency"], stage["process_latency"]
+        lines.append(
+            f"{stage['name']:<10}{stage['workers']:>8}{stage['queue_depth']:>6}/{stage['queue_size']:<3}"
+            f"{stage['processed']:>11}{stage['throughput']:>10.2f}{stage['utilization']:>7.0%}{stage['batch_size']:>7.1f}"
+            f"{1000 * wait['p50']:>10.0f}{1000 * wait['p99']:>8.0f}{1000 * latency['p50']:>13.0f}{1000 * latency['p99']:>8.0f}"
+        )
+
+    return "\n".join(lines)
+
+
+def _put(target_queue: queue.Queue, item, stop: threading.Event):
+    """
+    Puts an item into a bounded queue, giving up once the pipeline is stopped.
+    """
+    while not stop.is_set():
+        try:
+            target_queue.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+def _get(source_queue: queue.Queue, stop: threading.Event):
+    """
+    Gets an item from a queue, returning None once the pipeline is stopped.
+    """
+    while not stop.is_set():
+        try:
+            return source_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+    return None
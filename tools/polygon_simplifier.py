@@ -26,18 +26,20 @@ class PolygonSimplifier:
         self.approx_method = approx_method
 
 
-    def simplify(self, mask: np.ndarray) :
+    def simplify(self, mask: np.ndarray, offset: tuple = (0, 0)) :
         """
         Simplifies the longest contour found in the input mask and returns it as a polygon.
 
         Args:
             mask (np.ndarray): Binary mask where the target shape is represented by foreground pixels.
+            offset (tuple): Position (x, y) of the mask in the image, for masks cropped from the image. 
+                The polygon is returned in image coordinates.
 
         Returns:
             shapely.geometry.Polygon or None: A simplified and validated polygon representation of the detected contour, 
             or None if no valid contour is found.
         """
-        contours = self._find_contours(mask)
+        contours = self._find_contours(mask, offset)
         polygon = self._find_longest_polygon(contours)
         if polygon is None:
             return None
@@ -50,12 +52,13 @@ class PolygonSimplifier:
         return simplified_polygon
     
 
-    def _find_contours(self, mask: np.ndarray):
+    def _find_contours(self, mask: np.ndarray, offset: tuple = (0, 0)):
         """
         Finds contours in the provided binary mask image.
 
         Args:
             mask (np.ndarray): Binary mask where object pixels have value 1, and background pixels have value 0.
+            offset (tuple): Shift (x, y) added to all contour points.
 
         Returns:
             list: Detected contours, each represented as an array of contour points.
@@ -64,7 +67,8 @@ class PolygonSimplifier:
         contours, _ = cv2.findContours(
             mask_uint8,
             cv2.RETR_EXTERNAL,
-            self.approx_method
+            self.approx_method,
+            offset=tuple(int(value) for value in offset)
         )
 
         return contours
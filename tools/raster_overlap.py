@@ -0,0 +1,121 @@
+import math
+import numpy as np
+import shapely
+from shapely import Polygon
+
+
+class RasterOverlap:
+    """
+    Approximates the overlap area between a fixed reference polygon and candidate polygons
+    on a cropped occupancy grid.
+
+    The reference polygon is rasterized once into a grid of fractional cell coverages covering
+    its bounding box. The intersection with a candidate is the integral of this coverage over the
+    candidate's interior, which by Green's theorem equals the boundary integral of the per-row
+    cumulative coverage along the candidate's edges. Each edge is therefore clipped against the
+    grid rows (scanline bands) it spans and evaluated with a single lookup per band, so an evaluation
+    costs NumPy work proportional to the spanned bands, about twice the rows covered by the candidate,
+    independent of the number of grid cells. Unlike counting
+    covered cell centers, the result varies continuously with the candidate vertices, which keeps
+    the local search of the optimizer effective.
+
+    Args:
+        reference_polygon (Polygon): Target polygon that all candidates are compared against.
+        resolution (int): Number of grid cells along the longer side of the reference bounding box.
+        supersampling (int): Samples per cell and axis used to estimate the fractional cell coverage.
+
+    Attributes:
+        cell_size (float): Edge length of a square grid cell.
+        coverage (np.ndarray): Fractional coverage of each grid cell by the reference, of shape (rows, cols).
+        area (float): Rasterized area of the reference polygon.
+        centroid (np.ndarray): Exact centroid of the reference polygon as [x, y].
+        bounds (np.ndarray): Exact bounds of the reference polygon as [min_x, min_y, max_x, max_y].
+    """
+
+    def __init__(self, reference_polygon: Polygon, resolution: int = 256, supersampling: int = 4):
+        min_x, min_y, max_x, max_y = reference_polygon.bounds
+
+        self.cell_size = max(max_x - min_x, max_y - min_y) / resolution
+        self.origin = np.array([min_x, min_y])
+
+        n_cols = max(1, math.ceil((max_x - min_x) / self.cell_size))
+        n_rows = max(1, math.ceil((max_y - min_y) / self.cell_size))
+
+        # Sample the reference on a finer grid and average the samples within each cell
+        sample_size = self.cell_size / supersampling
+        samples_x = min_x + (np.arange(n_cols * supersampling) + 0.5) * sample_size
+        samples_y = min_y + (np.arange(n_rows * supersampling) + 0.5) * sample_size
+        grid_x, grid_y = np.meshgrid(samples_x, samples_y)
+
+        inside = shapely.contains_xy(reference_polygon, grid_x, grid_y)
+        self.coverage = inside.reshape(n_rows, supersampling, n_cols, supersampling).mean(axis=(1, 3))
+
+        # Cumulative coverage left of each cell boundary, per row: (rows, cols + 1)
+        self.row_cumulative_coverage = np.zeros((n_rows, n_cols + 1))
+        np.cumsum(self.coverage, axis=1, out=self.row_cumulative_coverage[:, 1:])
+
+        # Flattened copies with a common row stride, for a single index per lookup
+        self._flat_cumulative_coverage = self.row_cumulative_coverage.ravel()
+        self._flat_coverage = np.pad(self.coverage, ((0, 0), (0, 1))).ravel()
+
+        self.area = self.coverage.sum() * self.cell_size ** 2
+        self.centroid = np.array(reference_polygon.centroid.coords[0])
+        self.bounds = np.array(reference_polygon.bounds)
+
+
+    def intersection_area(self, vertices: np.ndarray):
+        """
+        Computes the approximate intersection area between the reference and candidate polygons.
+
+        Args:
+            vertices (np.ndarray): Candidate vertices of shape (V, 2) or (N, V, 2), implicitly closed.
+
+        Returns:
+            np.ndarray: Intersection areas of shape () or (N,).
+        """
+        # Edges in grid units, flattened over all candidates: (M,)
+        n_rows, n_cols = self.coverage.shape
+        points = (vertices - self.origin) / self.cell_size
+        x0, y0 = points.reshape(-1, 2).T
+        x1, y1 = np.roll(points, -1, axis=-2).reshape(-1, 2).T
+
+        # Horizontal edges span no band height, the denominator guard only avoids warnings
+        dy = y1 - y0
+        slope = (x1 - x0) / np.where(dy == 0, 1e-10, dy)
+        intercept = x0 - y0 * slope
+        direction = np.sign(dy)
+
+        # Scanline bands spanned by every edge, clipped to the grid
+        y_low = np.minimum(y0, y1)
+        y_high = np.maximum(y0, y1)
+        first_row = np.clip(np.floor(y_low), 0, n_rows).astype(np.int64)
+        counts = np.clip(np.ceil(y_high), 0, n_rows).astype(np.int64) - first_row
+
+        # One entry per spanned band and edge: (B,)
+        edge = np.repeat(np.arange(len(counts)), counts)
+        row = np.arange(len(edge)) - np.repeat(np.cumsum(counts) - counts - first_row, counts)
+
+        # Portion of the edge inside the band and its midpoint
+        lower = np.maximum(y_low[edge], row)
+        upper = np.minimum(y_high[edge], row + 1)
+        x_mid = intercept[edge] + 0.5 * (lower + upper) * slope[edge]
+
+        # Cumulative reference coverage left of the edge midpoint, linear within a cell
+        u = np.clip(x_mid, 0, n_cols)
+        column = np.minimum(u.astype(np.int64), n_cols - 1)
+        index = row * (n_cols + 1) + column
+        cumulative = self._flat_cumulative_coverage[index] + (u - column) * self._flat_coverage[index]
+
+        # Green's theorem: area integral of the coverage = boundary integral of its x-antiderivative
+        band_integrals = direction[edge] * (upper - lower) * cumulative
+        cross = x0 * y1 - x1 * y0
+        if vertices.ndim == 2:
+            integral = band_integrals.sum()
+            signed_area = cross.sum()
+        else:
+            n_candidates, n_vertices = vertices.shape[:2]
+            integral = np.bincount(edge // n_vertices, weights=band_integrals, minlength=n_candidates)
+            signed_area = cross.reshape(n_candidates, n_vertices).sum(axis=-1)
+
+        # Correct for the orientation of the candidate ring
+        return integral * np.sign(signed_area) * self.cell_size ** 2
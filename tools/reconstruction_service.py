@@ -0,0 +1,456 @@
+import base64
+import collections
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import urlsplit
+import cv2
+import numpy as np
+
+from tools.cross_section_reconstructor import CrossSectionReconstructor
+
+
+DEFAULT_ADDRESS = "http://127.0.0.1:8765"
+
+
+class ReconstructionService:
+    """
+    Keeps a `CrossSectionReconstructor` with loaded models running and reconstructs the
+    drawings of concurrent requests in its single, shared pipeline.
+
+    Drawings are fed into the pipeline as they are submitted, so the detect and segment stages
+    batch drawings of different requests into shared model calls, and model inference of one
+    request overlaps with the fitting of another.
+
+    Each request is a job with its own queue. Whenever the pipeline has room for another
+    drawing, the next one is taken from the job that has received the smallest share of the
+    pipeline relative to its weight ('fair'), so that a small interactive request is not stuck
+    behind all drawings of a large job, or from the oldest job ('fifo').
+
+    Args:
+        reconstructor (CrossSectionReconstructor): Reconstructor whose models are kept loaded.
+        fairness (str): Scheduling of the drawings of concurrent jobs, 'fair' or 'fifo'.
+    """
+    def __init__(self, reconstructor: CrossSectionReconstructor, fairness: str = "fair"):
+        if fairness not in ("fair", "fifo"):
+            raise ValueError(f"Unknown fairness policy: {fairness}")
+
+        self.reconstructor = reconstructor
+        self.fairness = fairness
+
+        # Jobs with waiting drawings, in submission order
+        self._jobs = []
+        self._virtual_time = 0.0
+        self._closed = False
+        self._condition = threading.Condition()
+        # Futures of the drawings in the pipeline, in input order like the outputs
+        self._futures = collections.deque()
+        self._thread = threading.Thread(target=self._run, name="reconstruction-service", daemon=True)
+        self._thread.start()
+
+
+    def submit(self, source, weight: float = 1.0):
+        """
+        Schedules the reconstruction of a drawing as a job of its own.
+
+        Args:
+            source: Path of an image file, or a tuple (file_name, data) of encoded image bytes.
+            weight (float): Share of the pipeline of the job relative to other jobs ('fair' only).
+
+        Returns:
+            Future: Future of the tuple (img_path, img, boxes), see `CrossSectionReconstructor.run`.
+        """
+        return self.submit_batch([source], weight)[0]
+
+
+    def submit_batch(self, sources: Iterable, weight: float = 1.0):
+        """
+        Schedules the reconstruction of several drawings as one job.
+
+        Args:
+            sources (Iterable): Paths of image files, or tuples (file_name, data) of encoded image bytes.
+            weight (float): Share of the pipeline of the job relative to other jobs ('fair' only).
+
+        Returns:
+            list: Future per drawing, see `submit`.
+        """
+        if weight <= 0:
+            raise ValueError(f"The weight of a job must be positive: {weight}")
+
+        entries = collections.deque((source, Future()) for source in sources)
+        futures = [future for _, future in entries]
+        if not entries:
+            return futures
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The reconstruction service is closed.")
+
+            # A new job starts at the current virtual time instead of catching up on the past
+            self._jobs.append(_Job(entries, weight, self._virtual_time))
+            self._condition.notify()
+
+        return futures
+
+
+    def close(self):
+        """
+        Finishes the submitted drawings and releases the reconstructor.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.reconstructor.close()
+
+
+    def _next_entry(self):
+        """
+        Takes the next drawing according to the fairness policy.
+
+        Returns:
+            tuple: (source, future), or None once the service is closed and all drawings are taken.
+        """
+        with self._condition:
+            while not self._jobs:
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+            if self.fairness == "fair":
+                job = min(self._jobs, key=lambda job: job.virtual_time)
+            else:
+                job = self._jobs[0]
+
+            entry = job.entries.popleft()
+            self._virtual_time = job.virtual_time
+            job.virtual_time += 1.0 / job.weight
+            if not job.entries:
+                self._jobs.remove(job)
+
+            return entry
+
+
+    def _iter_sources(self):
+        """
+        Yields the submitted drawings until the service is closed. The pipeline pulls the
+        next drawing only when it has room for it, so the order is decided at that time.
+        """
+        while (entry := self._next_entry()) is not None:
+            source, future = entry
+            self._futures.append(future)
+            yield source
+
+
+    def _run(self):
+        """
+        Runs the pipeline and resolves the futures of its outputs.
+        """
+        try:
+            for output in self.reconstructor.run(self._iter_sources(), return_exceptions=True):
+                future = self._futures.popleft()
+                if isinstance(output, Exception):
+                    future.set_exception(output)
+                else:
+                    future.set_result(output)
+        finally:
+            while self._futures:
+                self._futures.popleft().set_exception(RuntimeError("The reconstruction service stopped."))
+
+
+class _Job:
+    """
+    Waiting drawings of a request with its weight and virtual time, i.e. the drawings
+    it has received so far divided by its weight, offset by its start time.
+    """
+    def __init__(self, entries: collections.deque, weight: float, virtual_time: float):
+        self.entries = entries
+        self.weight = weight
+        self.virtual_time = virtual_time
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP interface of the service:
+
+    - GET /health: Status of the service and of its models.
+    - GET /stats: Statistics of the pipeline stages, see `Pipeline.stats`, including batch sizes
+      and latency histograms, and of the result cache, see `FitCache.stats`.
+    - POST /reconstruct: JSON body {"images": [...], "draw_results": bool, "save_coco": bool, "weight": float},
+      where each image is {"path": str} for a file readable by the service or {"file_name": str,
+      "data": str} with base64-encoded image bytes. The response streams one JSON line per
+      image in request order, either the image result of `CrossSectionReconstructor.make_image_result`
+      with base64-encoded PNG drawings, or {"file_name": str, "error": str}. The images of a
+      request form one job of the service, "weight" is its share of the pipeline (default 1).
+    """
+    server_version = "CrossSectAI"
+
+    def do_GET(self):
+        if self.path == "/stats":
+            reconstructor = self.server.service.reconstructor
+            self._send_json(200, {
+                "stages": reconstructor.pipeline.stats(),
+                "result_cache": reconstructor.result_cache.stats() if reconstructor.result_cache is not None else None,
+            })
+            return
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+
+        reconstructor = self.server.service.reconstructor
+        self._send_json(200, {
+            "status": "ok",
+            "models": {
+                "cross_section_detector": all(model.is_loaded for model in reconstructor.cross_section_detectors),
+                "mask_generator": all(model.is_loaded for model in reconstructor.mask_generators),
+                "cross_section_fitter": reconstructor.cross_section_fitter.is_loaded,
+            },
+        })
+
+
+    def do_POST(self):
+        if self.path != "/reconstruct":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            sources = [_decode_source(image) for image in request["images"]]
+            draw_results = bool(request.get("draw_results", False))
+            save_coco = bool(request.get("save_coco", False))
+            weight = float(request.get("weight", 1.0))
+            if weight <= 0:
+                raise ValueError(f"The weight must be positive: {weight}")
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json(400, {"error": f"Invalid request: {error}"})
+            return
+
+        service = self.server.service
+        # Submit all drawings before waiting, so that they share the pipeline with other requests
+        futures = service.submit_batch(sources, weight)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        for source, future in zip(sources, futures):
+            try:
+                image_result = service.reconstructor.make_image_result(*future.result(), draw_results, save_coco)
+                image_result["drawings"] = {
+                    name: base64.b64encode(cv2.imencode(".png", drawing)[1].tobytes()).decode("ascii")
+                    for name, drawing in image_result["drawings"].items()
+                }
+            except Exception as error:
+                file_name = source[0] if isinstance(source, tuple) else Path(source).name
+                image_result = {"file_name": Path(file_name).name, "error": f"{type(error).__name__}: {error}"}
+
+            try:
+                self.wfile.write(json.dumps(image_result, default=_json_default).encode() + b"\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client is gone; the remaining drawings finish in the pipeline regardless
+                return
+
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "local"
+
+
+    def _send_json(self, status: int, content: dict):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: ReconstructionService, address: str = DEFAULT_ADDRESS):
+    """
+    Creates the HTTP server of a reconstruction service. Requests are handled in threads.
+
+    Args:
+        service (ReconstructionService): Service answering the requests.
+        address (str): 'http://host:port' for a TCP socket or 'unix:/path/to/socket' for a Unix socket.
+
+    Returns:
+        socketserver.BaseServer: Server, started with `serve_forever`.
+    """
+    scheme, location = parse_address(address)
+
+    if scheme == "unix":
+        if os.path.exists(location):
+            # Left behind by a service that was not shut down
+            os.remove(location)
+        server = _UnixHTTPServer(location, _RequestHandler)
+    else:
+        server = ThreadingHTTPServer(location, _RequestHandler)
+
+    server.service = service
+    return server
+
+
+def parse_address(address: str):
+    """
+    Parses the address of a reconstruction service.
+
+    Args:
+        address (str): 'http://host:port' or 'unix:/path/to/socket'.
+
+    Returns:
+        tuple: ('unix', socket path) or ('http', (host, port)).
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+
+    parts = urlsplit(address)
+    if parts.scheme != "http" or parts.hostname is None:
+        raise ValueError(f"Invalid service address: {address}")
+
+    return "http", (parts.hostname, parts.port or 80)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ReconstructionClient:
+    """
+    Client of a running reconstruction service, see `make_server`.
+
+    Args:
+        address (str): 'http://host:port' or 'unix:/path/to/socket'.
+        timeout (float, optional): Socket timeout in seconds.
+    """
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float = None):
+        self.address = address
+        self.timeout = timeout
+        self.scheme, self.location = parse_address(address)
+
+
+    def health(self):
+        """
+        Queries the status of the service.
+
+        Returns:
+            dict: Status and loaded models of the service.
+        """
+        connection = self._connect()
+        try:
+            connection.request("GET", "/health")
+            return json.loads(connection.getresponse().read())
+        finally:
+            connection.close()
+
+
+    def stats(self):
+        """
+        Queries the statistics of the pipeline stages and of the result cache of the service.
+
+        Returns:
+            dict: Statistics per stage under 'stages', see `Pipeline.stats`, and those of the
+                result cache under 'result_cache', see `FitCache.stats`, or None without a cache.
+        """
+        connection = self._connect()
+        try:
+            connection.request("GET", "/stats")
+            return json.loads(connection.getresponse().read())
+        finally:
+            connection.close()
+
+
+    def reconstruct(
+        self,
+        images: Iterable,
+        draw_results: bool = False,
+        save_coco: bool = False,
+        send_data: bool = False,
+        weight: float = 1.0
+    ):
+        """
+        Reconstructs drawings with the service.
+
+        Args:
+            images (Iterable): Paths of the image files.
+            draw_results (bool): Request the drawn results.
+            save_coco (bool): Request COCO annotations.
+            send_data (bool): Send the image bytes instead of the paths, for services without access to the files.
+            weight (float): Share of the service's pipeline of this request relative to concurrent requests.
+
+        Yields:
+            dict: Image result per drawing in the order of the images, see `CrossSectionReconstructor.make_image_result`.
+        """
+        if send_data:
+            sources = [
+                {"file_name": Path(image).name, "data": base64.b64encode(Path(image).read_bytes()).decode("ascii")}
+                for image in images
+            ]
+        else:
+            sources = [{"path": str(Path(image).resolve())} for image in images]
+
+        body = json.dumps({"images": sources, "draw_results": draw_results, "save_coco": save_coco, "weight": weight}).encode()
+
+        connection = self._connect()
+        try:
+            connection.request("POST", "/reconstruct", body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            if response.status != 200:
+                raise RuntimeError(f"The reconstruction service failed with status {response.status}: {response.read().decode()}")
+
+            while line := response.readline():
+                image_result = json.loads(line)
+                if "error" in image_result:
+                    raise RuntimeError(f"Reconstruction of {image_result['file_name']} failed: {image_result['error']}")
+
+                image_result["drawings"] = {
+                    name: cv2.imdecode(np.frombuffer(base64.b64decode(drawing), dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+                    for name, drawing in image_result["drawings"].items()
+                }
+                yield image_result
+        finally:
+            connection.close()
+
+
+    def _connect(self):
+        if self.scheme == "unix":
+            return _UnixHTTPConnection(self.location, timeout=self.timeout)
+        return http.client.HTTPConnection(*self.location, timeout=self.timeout)
+
+
+def _decode_source(image: dict):
+    """
+    Converts an image of a request to a source of `CrossSectionReconstructor.run`.
+    """
+    if "data" in image:
+        return image["file_name"], base64.b64decode(image["data"])
+    return Path(image["path"])
+
+
+def _json_default(value):
+    """
+    Converts NumPy values of the image results for JSON.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
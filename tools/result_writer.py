@@ -0,0 +1,182 @@
+import csv
+import json
+from pathlib import Path
+import cv2
+
+from tools.run_manifest import RunManifest
+from utils import general_utils
+
+
+class ResultWriter:
+    """
+    Writes the outputs of a run to the output directory: one CSV file per drawing, the Allplan
+    Bridge parameter file of the first cross-section, the drawn results and the COCO file.
+
+    The image results are created by `CrossSectionReconstructor.make_image_result`, either in
+    the same process or by the reconstruction service. Drawings without cross-sections are skipped.
+
+    With a run manifest, every written drawing is marked complete and the COCO file is assembled
+    from the annotations of all complete drawings in the manifest, including those of earlier runs.
+    The parameter file belongs to the first drawing of the full input list with a cross-section.
+    A resumed run only overwrites it if it is missing, if the drawing it was created from is
+    processed again or if an earlier drawing of the input list now yields it; the manifest
+    records which drawing it was created from.
+
+    Args:
+        output_dir (Path): Output directory.
+        save_coco (bool): Collect the annotations in a COCO file, written by `close`.
+        draw_results (bool): Save the drawn results in the subfolder 'Results'.
+        manifest (RunManifest, optional): Manifest of the output directory, see `RunManifest`.
+        input_files (list, optional): File names of all drawings of the run in input order,
+            including those skipped as complete.
+    """
+    def __init__(self, output_dir: Path, save_coco: bool = False, draw_results: bool = False, manifest: RunManifest = None, input_files: list = None):
+        self.output_dir = Path(output_dir)
+        self.save_coco = save_coco
+        self.draw_results = draw_results
+        self.manifest = manifest
+        self.input_positions = {file_name: position for position, file_name in enumerate(input_files or [])}
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if draw_results:
+            self.result_image_folder = Path.joinpath(self.output_dir, "Results")
+            self.result_image_folder.mkdir(parents=True, exist_ok=True)
+
+        if save_coco:
+            self.coco_results = general_utils.create_coco_result_file()
+            self.img_counter = 0
+            self.annotation_counter = 0
+
+        # Drawing that the parameter file in the output directory was created from
+        self.allplan_filepath = Path.joinpath(self.output_dir, general_utils.ALLPLAN_PARAMETER_FILE)
+        self.allplan_source = None
+        if manifest is not None and self.allplan_filepath.exists():
+            self.allplan_source = manifest.output_source(general_utils.ALLPLAN_PARAMETER_FILE)
+
+
+    def write(self, image_result: dict):
+        """
+        Writes the outputs of a drawing.
+
+        Args:
+            image_result (dict): Result of a drawing, see `CrossSectionReconstructor.make_image_result`.
+        """
+        file_stem = Path(image_result["file_name"]).stem
+
+        if len(image_result["csv"]) <= 1:
+            self._write_allplan_script(image_result["file_name"], None)
+            if self.manifest is not None:
+                # Outputs of an earlier run of the drawing are outdated
+                Path.joinpath(self.output_dir, f"{file_stem}.csv").unlink(missing_ok=True)
+                self.manifest.complete(image_result["file_name"], None, self.save_coco, self.draw_results)
+            return
+
+        coco_entry = None
+        if self.save_coco:
+            coco_entry = {
+                "image": {
+                    "width": image_result["width"],
+                    "height": image_result["height"],
+                    "file_name": image_result["file_name"],
+                    "license": 0,
+                    "flickr_url": "",
+                    "coco_url": "",
+                    "date_captured": "",
+                },
+                "annotations": image_result["annotations"],
+            }
+
+            if self.manifest is None:
+                self._add_coco_entry(coco_entry)
+
+        self._write_allplan_script(image_result["file_name"], image_result["tcl"])
+
+        if self.draw_results:
+            for name, result_image in image_result["drawings"].items():
+                img_filepath = Path.joinpath(self.result_image_folder, f"{file_stem}_{name}.png")
+                cv2.imwrite(str(img_filepath), result_image)
+
+        csv_filepath = Path.joinpath(self.output_dir, f"{file_stem}.csv")
+        with open(str(csv_filepath), 'w') as fw:
+            writer = csv.writer(fw, delimiter=';')
+            writer.writerows(image_result["csv"])
+
+        # The drawing is complete once all of its outputs are written
+        if self.manifest is not None:
+            self.manifest.complete(image_result["file_name"], coco_entry, self.save_coco, self.draw_results)
+
+
+    def _write_allplan_script(self, file_name: str, tcl: str = None):
+        """
+        Writes the Allplan Bridge parameter file if the drawing precedes the drawing it was
+        created from in the input list, or removes it if that drawing no longer yields one.
+        Currently, only the first cross-section is exported to the Allplan Bridge script.
+
+        Args:
+            file_name (str): File name of the drawing.
+            tcl (str, optional): Parameter file of the first cross-section of the drawing.
+        """
+        if file_name == self.allplan_source:
+            if tcl is None:
+                self.allplan_filepath.unlink(missing_ok=True)
+                self._set_allplan_source(None)
+                return
+
+        elif tcl is None or not self._precedes_allplan_source(file_name):
+            return
+
+        with open(str(self.allplan_filepath), "w") as fw:
+            fw.write(tcl)
+        self._set_allplan_source(file_name)
+
+
+    def _precedes_allplan_source(self, file_name: str):
+        """
+        Checks whether a drawing comes before the source of the parameter file in the input list.
+        """
+        if self.allplan_source is None:
+            return True
+
+        unknown = len(self.input_positions)
+        return self.input_positions.get(file_name, unknown) < self.input_positions.get(self.allplan_source, unknown)
+
+
+    def _set_allplan_source(self, file_name: str = None):
+        """
+        Records the drawing that the parameter file was created from.
+        """
+        self.allplan_source = file_name
+        if self.manifest is not None:
+            self.manifest.set_output_source(general_utils.ALLPLAN_PARAMETER_FILE, file_name)
+
+
+    def _add_coco_entry(self, coco_entry: dict):
+        """
+        Adds the image entry and annotations of a drawing to the COCO file with new ids.
+        """
+        for annotation in coco_entry["annotations"]:
+            self.coco_results["annotation"].append({
+                "id": self.annotation_counter,
+                "image_id": self.img_counter,
+                **annotation,
+            })
+
+            self.annotation_counter += 1
+
+        self.coco_results["images"].append({"id": self.img_counter, **coco_entry["image"]})
+
+        self.img_counter += 1
+
+
+    def close(self):
+        """
+        Writes the COCO file.
+        """
+        if self.save_coco:
+            if self.manifest is not None:
+                for coco_entry in self.manifest.coco_entries():
+                    self._add_coco_entry(coco_entry)
+
+            coco_filepath = Path.joinpath(self.output_dir, "coco.json")
+            with open(str(coco_filepath), "w") as fw:
+                json.dump(self.coco_results, fw)
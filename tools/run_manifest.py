@@ -0,0 +1,215 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+
+class RunManifest:
+    """
+    Manifest of the drawings processed into an output directory, stored in an SQLite database.
+
+    Per drawing, it records the content hash of the image file, the hash of the configuration
+    that affects the results, which outputs were written and whether the drawing is complete.
+    Reruns skip complete drawings whose image and configuration are unchanged, so an interrupted
+    job resumes where it stopped. The COCO annotations of each drawing are kept in the manifest,
+    so that the COCO file is assembled from all complete drawings without reprocessing them, and
+    the drawing that each output shared by the run, like the Allplan Bridge parameter file, was
+    created from is recorded.
+
+    Args:
+        output_dir (Path): Output directory, which holds the manifest file.
+    """
+    FILE_NAME = "manifest.sqlite"
+
+    # Configuration sections that affect the outputs, without keys that only affect speed or resources
+    RESULT_SECTIONS = ("General", "CrossSectionDetector", "MaskGenerator", "PolygonSimplifier", "ParameterOptimizer")
+    EXCLUDED_KEYS = {
+        "CrossSectionDetector": ("device", "batch_size", "max_wait"),
+        "MaskGenerator": ("device", "batch_size", "max_wait", "cache_dir", "cache_size", "onnx_threads"),
+        "ParameterOptimizer": ("workers",),
+    }
+
+    def __init__(self, output_dir: Path):
+        self.path = Path(output_dir) / self.FILE_NAME
+
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                file_name TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                config_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                has_coco INTEGER NOT NULL DEFAULT 0,
+                has_drawings INTEGER NOT NULL DEFAULT 0,
+                coco TEXT,
+                updated REAL NOT NULL
+            )
+        """)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS outputs (
+                output_name TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+
+    @staticmethod
+    def hash_file(path: Path):
+        """
+        Computes the content hash of a file.
+
+        Args:
+            path (Path): Path of the file.
+
+        Returns:
+            str: Hexadecimal hash.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        with open(str(path), "rb") as file:
+            while chunk := file.read(1 << 20):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+
+    @classmethod
+    def hash_config(cls, config: dict):
+        """
+        Computes the hash of the configuration values that affect the outputs. Model weights
+        are identified by their paths, not by their content.
+
+        Args:
+            config (dict): Configuration, see `default.yaml`.
+
+        Returns:
+            str: Hexadecimal hash.
+        """
+        relevant = {
+            section: {
+                key: value for key, value in config.get(section, {}).items()
+                if key not in cls.EXCLUDED_KEYS.get(section, ())
+            }
+            for section in cls.RESULT_SECTIONS
+        }
+
+        return hashlib.blake2b(json.dumps(relevant, sort_keys=True).encode(), digest_size=20).hexdigest()
+
+
+    def is_complete(self, file_name: str, content_hash: str, config_hash: str, save_coco: bool = False, draw_results: bool = False):
+        """
+        Checks whether a drawing is complete with unchanged inputs and the requested outputs.
+
+        Args:
+            file_name (str): File name of the drawing.
+            content_hash (str): Content hash of the image file, see `hash_file`.
+            config_hash (str): Hash of the configuration, see `hash_config`.
+            save_coco (bool): COCO annotations are requested.
+            draw_results (bool): Drawn results are requested.
+
+        Returns:
+            bool: True if the drawing can be skipped.
+        """
+        row = self.connection.execute(
+            "SELECT content_hash, config_hash, status, has_coco, has_drawings FROM images WHERE file_name = ?",
+            (file_name,)
+        ).fetchone()
+
+        if row is None:
+            return False
+
+        stored_content_hash, stored_config_hash, status, has_coco, has_drawings = row
+        return (
+            status == "done"
+            and stored_content_hash == content_hash
+            and stored_config_hash == config_hash
+            and (has_coco or not save_coco)
+            and (has_drawings or not draw_results)
+        )
+
+
+    def start(self, entries: list, config_hash: str):
+        """
+        Marks drawings as pending before they are processed.
+
+        Args:
+            entries (list): Tuples (file_name, content_hash) of the drawings.
+            config_hash (str): Hash of the configuration, see `hash_config`.
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO images (file_name, content_hash, config_hash, status, updated) VALUES (?, ?, ?, 'pending', ?)",
+                [(file_name, content_hash, config_hash, now) for file_name, content_hash in entries]
+            )
+
+
+    def complete(self, file_name: str, coco: dict = None, has_coco: bool = False, has_drawings: bool = False):
+        """
+        Marks a pending drawing as complete once its outputs are written.
+
+        Args:
+            file_name (str): File name of the drawing.
+            coco (dict, optional): COCO image entry and annotations of the drawing without ids,
+                as {"image": dict, "annotations": list}; None if it has no cross-sections.
+            has_coco (bool): COCO annotations were created.
+            has_drawings (bool): Drawn results were written.
+        """
+        with self.connection:
+            self.connection.execute(
+                "UPDATE images SET status = 'done', coco = ?, has_coco = ?, has_drawings = ?, updated = ? WHERE file_name = ?",
+                (json.dumps(coco) if coco is not None else None, int(has_coco), int(has_drawings), time.time(), file_name)
+            )
+
+
+    def output_source(self, output_name: str):
+        """
+        Looks up the drawing that an output shared by the run was created from.
+
+        Args:
+            output_name (str): File name of the output, e.g. the Allplan Bridge parameter file.
+
+        Returns:
+            str: File name of the drawing, or None if not recorded.
+        """
+        row = self.connection.execute("SELECT file_name FROM outputs WHERE output_name = ?", (output_name,)).fetchone()
+
+        return row[0] if row is not None else None
+
+
+    def set_output_source(self, output_name: str, file_name: str = None):
+        """
+        Records the drawing that an output shared by the run was created from.
+
+        Args:
+            output_name (str): File name of the output.
+            file_name (str, optional): File name of the drawing; None removes the record.
+        """
+        with self.connection:
+            if file_name is None:
+                self.connection.execute("DELETE FROM outputs WHERE output_name = ?", (output_name,))
+            else:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO outputs (output_name, file_name) VALUES (?, ?)", (output_name, file_name)
+                )
+
+
+    def coco_entries(self):
+        """
+        Yields the COCO entries of all complete drawings with cross-sections, ordered by file name.
+
+        Yields:
+            dict: COCO image entry and annotations without ids, see `complete`.
+        """
+        rows = self.connection.execute(
+            "SELECT coco FROM images WHERE status = 'done' AND coco IS NOT NULL ORDER BY file_name"
+        )
+        for (coco,) in rows:
+            yield json.loads(coco)
+
+
+    def close(self):
+        self.connection.close()
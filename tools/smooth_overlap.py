@@ -0,0 +1,160 @@
+import math
+import cv2
+import numpy as np
+import shapely
+from shapely import Polygon
+
+
+class SmoothOverlap:
+    """
+    Smooth surrogate of the overlap area between a fixed reference polygon and candidate polygons,
+    with an analytic gradient with respect to the candidate vertices.
+
+    The reference is rasterized into fractional cell coverages as in `RasterOverlap` and blurred
+    with a Gaussian kernel, which turns the occupancy into a smooth density. The overlap with a
+    candidate is the integral of this density over the candidate's interior, evaluated by Green's
+    theorem as the boundary integral of its x-antiderivative along the candidate's edges. The
+    antiderivative is interpolated bilinearly and the edges are sampled by the midpoint rule, so
+    value and gradient are exact for this discretization and consistent with each other, as
+    required by gradient-based optimizers such as L-BFGS-B.
+
+    Args:
+        reference_polygon (Polygon): Target polygon that all candidates are compared against.
+        resolution (int): Number of grid cells along the longer side of the reference bounding box.
+        sigma (float): Standard deviation of the Gaussian blur in grid cells.
+        supersampling (int): Samples per cell and axis used to estimate the fractional cell coverage.
+
+    Attributes:
+        cell_size (float): Edge length of a square grid cell.
+        area (float): Total mass of the blurred reference density, i.e. its smoothed area.
+        centroid (np.ndarray): Exact centroid of the reference polygon as [x, y].
+        bounds (np.ndarray): Exact bounds of the reference polygon as [min_x, min_y, max_x, max_y].
+    """
+
+    def __init__(self, reference_polygon: Polygon, resolution: int = 256, sigma: float = 1.0, supersampling: int = 4):
+        min_x, min_y, max_x, max_y = reference_polygon.bounds
+
+        self.cell_size = max(max_x - min_x, max_y - min_y) / resolution
+
+        # Empty margin around the reference, so that the blurred density vanishes at the border of the grid
+        margin = math.ceil(3 * sigma) + 2
+        n_cols = max(1, math.ceil((max_x - min_x) / self.cell_size)) + 2 * margin
+        n_rows = max(1, math.ceil((max_y - min_y) / self.cell_size)) + 2 * margin
+        self.origin = np.array([min_x, min_y]) - margin * self.cell_size
+
+        sample_size = self.cell_size / supersampling
+        samples_x = self.origin[0] + (np.arange(n_cols * supersampling) + 0.5) * sample_size
+        samples_y = self.origin[1] + (np.arange(n_rows * supersampling) + 0.5) * sample_size
+        grid_x, grid_y = np.meshgrid(samples_x, samples_y)
+
+        inside = shapely.contains_xy(reference_polygon, grid_x, grid_y)
+        coverage = inside.reshape(n_rows, supersampling, n_cols, supersampling).mean(axis=(1, 3))
+        density = cv2.GaussianBlur(coverage, (0, 0), sigmaX=sigma, sigmaY=sigma, borderType=cv2.BORDER_CONSTANT) if sigma > 0 else coverage
+
+        # x-antiderivative of the density at the cell boundaries along x and the cell centers along y: (rows, cols + 1)
+        self.antiderivative = np.zeros((n_rows, n_cols + 1))
+        np.cumsum(density, axis=1, out=self.antiderivative[:, 1:])
+        self.antiderivative *= self.cell_size
+
+        self.area = float(density.sum()) * self.cell_size ** 2
+        self.centroid = np.array(reference_polygon.centroid.coords[0])
+        self.bounds = np.array(reference_polygon.bounds)
+
+
+    def intersection_area(self, vertices: np.ndarray):
+        """
+        Computes the smoothed intersection area between the reference and a candidate polygon.
+
+        Args:
+            vertices (np.ndarray): Candidate vertices of shape (V, 2), implicitly closed.
+
+        Returns:
+            float: Intersection area.
+        """
+        return self.intersection_area_and_gradient(vertices)[0]
+
+
+    def intersection_area_and_gradient(self, vertices: np.ndarray):
+        """
+        Computes the smoothed intersection area and its gradient with respect to the candidate vertices.
+
+        Args:
+            vertices (np.ndarray): Candidate vertices of shape (V, 2), implicitly closed.
+
+        Returns:
+            tuple: Intersection area (float) and its gradient of shape (V, 2).
+        """
+        start = vertices
+        end = np.roll(vertices, -1, axis=0)
+        dy = end[:, 1] - start[:, 1]
+
+        # Midpoint rule with about two samples per cell along the longest edge
+        edge_length = np.hypot(*(end - start).T).max()
+        n_samples = int(np.clip(math.ceil(2 * edge_length / self.cell_size), 8, 4096))
+        t = (np.arange(n_samples) + 0.5) / n_samples
+
+        points = start[:, None, :] + t[None, :, None] * (end - start)[:, None, :]
+        value, d_dx, d_dy = self._interpolate(points)
+
+        # Green's theorem: area integral of the density = boundary integral of its x-antiderivative over y
+        mean_value = value.mean(axis=1)
+        integral = (dy * mean_value).sum()
+
+        # Derivatives of every edge term with respect to its start and end vertex
+        gradient_start = np.stack([
+            dy * (d_dx * (1 - t)).mean(axis=1),
+            -mean_value + dy * (d_dy * (1 - t)).mean(axis=1),
+        ], axis=-1)
+        gradient_end = np.stack([
+            dy * (d_dx * t).mean(axis=1),
+            mean_value + dy * (d_dy * t).mean(axis=1),
+        ], axis=-1)
+        gradient = gradient_start + np.roll(gradient_end, 1, axis=0)
+
+        # Correct for the orientation of the candidate ring
+        x = vertices[:, 0]
+        y = vertices[:, 1]
+        orientation = np.sign((x * np.roll(y, -1) - np.roll(x, -1) * y).sum()) or 1.0
+
+        return float(orientation * integral), orientation * gradient
+
+
+    def _interpolate(self, points: np.ndarray):
+        """
+        Interpolates the x-antiderivative bilinearly at the given points.
+
+        Returns:
+            tuple: Values and their partial derivatives along x and y, each of the shape of `points` without the last axis.
+        """
+        n_rows, n_nodes = self.antiderivative.shape
+
+        # Node coordinates: x at the cell boundaries, y at the cell centers
+        u = (points[..., 0] - self.origin[0]) / self.cell_size
+        w = (points[..., 1] - self.origin[1]) / self.cell_size - 0.5
+
+        # The antiderivative is constant outside the grid: 0 left of it and above/below it, the row total right of it
+        inside_u = (u > 0) & (u < n_nodes - 1)
+        inside_w = (w > 0) & (w < n_rows - 1)
+        u = np.clip(u, 0, n_nodes - 1)
+        w = np.clip(w, 0, n_rows - 1)
+
+        column = np.minimum(u.astype(np.int64), n_nodes - 2)
+        row = np.minimum(w.astype(np.int64), n_rows - 2) if n_rows > 1 else np.zeros_like(column)
+        fu = u - column
+        fw = w - row
+
+        grid = self.antiderivative
+        next_row = np.minimum(row + 1, n_rows - 1)
+        top_left = grid[row, column]
+        top_right = grid[row, column + 1]
+        bottom_left = grid[next_row, column]
+        bottom_right = grid[next_row, column + 1]
+
+        top = top_left + fu * (top_right - top_left)
+        bottom = bottom_left + fu * (bottom_right - bottom_left)
+        value = top + fw * (bottom - top)
+
+        d_dx = inside_u * ((1 - fw) * (top_right - top_left) + fw * (bottom_right - bottom_left)) / self.cell_size
+        d_dy = inside_w * (bottom - top) / self.cell_size
+
+        return value, d_dx, d_dy
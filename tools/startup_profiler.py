@@ -0,0 +1,81 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """
+    Records the wall-clock time of imports, model loads and other startup steps of a run.
+
+    Steps are measured with the `measure` context manager and may be nested, e.g. the import of
+    a model's dependencies within the model load. Steps of different threads, like models that
+    are loaded lazily by the pipeline workers, are recorded independently.
+
+    Args:
+        start_time (float, optional): `time.perf_counter()` value that the step times refer to,
+            e.g. taken before the first import; defaults to the creation of the profiler.
+    """
+    def __init__(self, start_time: float = None):
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.records = []
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+    def add(self, name: str, start: float, end: float = None):
+        """
+        Records a step that has been measured by the caller.
+
+        Args:
+            name (str): Name of the step.
+            start (float): `time.perf_counter()` value at the start of the step.
+            end (float, optional): `time.perf_counter()` value at the end of the step; a point in time without duration if None.
+        """
+        depth = getattr(self._local, "depth", 0)
+        with self._lock:
+            self.records.append((start - self.start_time, None if end is None else end - start, depth, name))
+
+
+    @contextmanager
+    def measure(self, name: str):
+        """
+        Measures the duration of the enclosed block as a step.
+
+        Args:
+            name (str): Name of the step.
+        """
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._local.depth = depth
+            self.add(name, start, end)
+
+
+    def mark(self, name: str):
+        """
+        Records the current point in time, e.g. the first result of a run.
+
+        Args:
+            name (str): Name of the point in time.
+        """
+        self.add(name, time.perf_counter())
+
+
+    def format_report(self):
+        """
+        Formats the recorded steps in the order of their start, with nested steps indented.
+
+        Returns:
+            str: Table of the steps with their start and duration in seconds.
+        """
+        lines = [f"{'start [s]':>10}{'duration [s]':>14}  step"]
+        for start, duration, depth, name in sorted(self.records, key=lambda record: (record[0], record[2])):
+            duration = f"{duration:>14.3f}" if duration is not None else " " * 14
+            lines.append(f"{start:>10.3f}{duration}  {'  ' * depth}{name}")
+
+        return "\n".join(lines)
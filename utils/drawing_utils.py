@@ -1,5 +1,4 @@
 from PIL import ImageColor
-import matplotlib.pyplot as plt
 import cv2
 import io
 import numpy as np
@@ -247,6 +246,9 @@ def draw_point_star(
     Returns:
         np.ndarray: A copy of the input image with the star marker drawn.
     """
+    # Deferred, since importing matplotlib is slow and only this function needs it
+    import matplotlib.pyplot as plt
+
     color_rgb = hex_to_bgr(color_hex)[::-1]
     color_rgb = [c/255 for c in color_rgb]
     
@@ -279,7 +281,7 @@ def draw_point_star(
     return img_bgr
 
 
-def draw_mask(img: np.ndarray, mask: np.ndarray, color_hex: str, alpha: float = 1.0):
+def draw_mask(img: np.ndarray, mask: np.ndarray, color_hex: str, alpha: float = 1.0, offset: tuple = (0, 0)):
     """
     Draws a binary mask as a colored overlay on a copy of the input image.
 
@@ -288,6 +290,7 @@ def draw_mask(img: np.ndarray, mask: np.ndarray, color_hex: str, alpha: float =
         mask (np.ndarray): Binary mask as a 2D array, where nonzero values indicate the masked region.
         color_hex (str): Color specified as an RGB hex string (e.g., "#00FF00").
         alpha (float, optional): Transparency of the mask overlay (0 = fully opaque, 1 = fully transparent). Default is 1.0.
+        offset (tuple, optional): Position (x, y) of the mask in the image, for masks cropped from the image. Default is (0, 0).
 
     Returns:
         np.ndarray: A copy of the input image with the colored mask overlay applied.
@@ -296,16 +299,18 @@ def draw_mask(img: np.ndarray, mask: np.ndarray, color_hex: str, alpha: float =
     color_bgr = np.array(hex_to_bgr(color_hex), dtype=np.uint8)
     output_image = clone_image(img)
 
-    # Ensure mask shape matches image
-    if mask.shape != img.shape[:2]:
+    # Ensure mask fits into the image
+    x0, y0 = offset
+    if x0 < 0 or y0 < 0 or y0 + mask.shape[0] > img.shape[0] or x0 + mask.shape[1] > img.shape[1]:
         raise ValueError("Mask shape does not match image dimensions.")
 
     mask_bool = mask.astype(bool)
+    output_region = output_image[y0:y0 + mask.shape[0], x0:x0 + mask.shape[1]]
 
     # Blend only on masked pixels
     for c in range(3):
-        output_image[:, :, c][mask_bool] = (
-            alpha * output_image[:, :, c][mask_bool] +
+        output_region[:, :, c][mask_bool] = (
+            alpha * output_region[:, :, c][mask_bool] +
             (1 - alpha) * color_bgr[c]
         ).astype(np.uint8)
 
@@ -2,7 +2,6 @@ from typing import Sequence
 from pathlib import Path
 import numpy as np
 from itertools import groupby
-from pycocotools import mask
 
 def binary_mask_to_rle_uncompressed(binary_mask: np.ndarray):
     """
@@ -51,12 +50,64 @@ def binary_mask_to_rle_compressed(binary_mask: np.ndarray):
     
     binary_mask = np.asfortranarray(binary_mask.astype(np.uint8))
     
+    # Deferred, since pycocotools is only needed for COCO output
+    from pycocotools import mask
+
     rle = mask.encode(binary_mask)  
     rle["counts"] = rle["counts"].decode("utf-8")
 
     return rle
 
 
+def binary_mask_crop_to_rle_compressed(binary_mask: np.ndarray, offset: Sequence[int], image_size: Sequence[int]):
+    """
+    Converts a 2D binary mask cropped from an image to COCO-style run-length encoding (RLE)
+    of the full image, without creating an image-sized mask.
+
+    Args:
+        binary_mask (np.ndarray): A 2D array containing 0s and 1s, cropped from the image.
+        offset (Sequence[int]): Position (x, y) of the crop in the image.
+        image_size (Sequence[int]): Size of the image as [height, width].
+
+    Returns:
+        dict: A dictionary with the following keys:
+            - 'counts': RLE as a UTF-8 string 
+            - 'size': The image size as [height, width].
+    """
+    height, width = image_size
+    x0, y0 = offset
+
+    # Foreground runs per crop column, in column-major order as required by COCO
+    padded = np.pad(binary_mask.astype(np.int8), ((1, 1), (0, 0)))
+    changes = np.diff(padded, axis=0).T
+    start_columns, start_rows = np.nonzero(changes == 1)
+    end_columns, end_rows = np.nonzero(changes == -1)
+
+    starts = (start_columns + x0) * height + start_rows + y0
+    ends = (end_columns + x0) * height + end_rows + y0
+
+    # Runs touching the bottom and top of consecutive columns are continuous in the image
+    continued = ends[:-1] == starts[1:]
+    starts = np.delete(starts, np.nonzero(continued)[0] + 1)
+    ends = np.delete(ends, np.nonzero(continued)[0])
+
+    boundaries = np.concatenate([[0], np.column_stack([starts, ends]).ravel(), [height * width]])
+    counts = np.diff(boundaries).tolist()
+    if counts[-1] == 0:
+        # Foreground reaches the last pixel
+        counts.pop()
+
+    from pycocotools import mask
+
+    rle = mask.frPyObjects({"counts": counts, "size": [height, width]}, height, width)
+    rle["counts"] = rle["counts"].decode("utf-8")
+
+    return rle
+
+
+ALLPLAN_PARAMETER_FILE = "variables.tcl"
+
+
 def write_allplan_parameter_file(output_dir: str, params: Sequence[float], template_type: int):
     """
     Writes a TCL parameter file for Allplan based on the given template type and parameter values.
@@ -69,6 +120,23 @@ def write_allplan_parameter_file(output_dir: str, params: Sequence[float], templ
     Returns:
         None
     """
+    output_path = Path.joinpath(Path(output_dir), ALLPLAN_PARAMETER_FILE)
+
+    with open(str(output_path), "w") as file:
+        file.write(format_allplan_parameter_file(params, template_type))
+
+
+def format_allplan_parameter_file(params: Sequence[float], template_type: int):
+    """
+    Formats the content of a TCL parameter file for Allplan, see `write_allplan_parameter_file`.
+
+    Args:
+        params (Sequence[float]): List of parameter values. Offset parameters 1 and 2 are skipped.
+        template_type (int): Identifier for the type of cross-section template to be used in the TCL file.
+
+    Returns:
+        str: Content of the parameter file.
+    """
 
     lines = [
         "# Define template and parameters",
@@ -81,10 +149,7 @@ def write_allplan_parameter_file(output_dir: str, params: Sequence[float], templ
         value = float(params[i])
         lines.append(f"set P{i} {value}")
 
-    output_path = Path.joinpath(Path(output_dir), "variables.tcl")
-
-    with open(str(output_path), "w") as file:
-        file.write("\n".join(lines) + "\n")
+    return "\n".join(lines) + "\n"
 
 
 
@@ -0,0 +1,347 @@
+import numpy as np
+
+
+def polygon_area_centroid(vertices: np.ndarray):
+    """
+    Computes the area and centroid of one or more simple polygons using the shoelace formula.
+
+    A single polygon is evaluated in plain Python, which is considerably faster than NumPy
+    for the handful of vertices of a template polygon.
+
+    Args:
+        vertices (np.ndarray): Polygon vertices of shape (V, 2) or (N, V, 2). The ring is treated
+            as implicitly closed, i.e. the first vertex must not be repeated at the end.
+
+    Returns:
+        tuple: Absolute polygon area, centroid x and centroid y, each a float or of shape (N,).
+    """
+    if vertices.ndim == 2:
+        points = vertices.tolist()
+        twice_area = centroid_x = centroid_y = 0.0
+
+        x0, y0 = points[-1]
+        for x1, y1 in points:
+            cross = x0 * y1 - x1 * y0
+            twice_area += cross
+            centroid_x += (x0 + x1) * cross
+            centroid_y += (y0 + y1) * cross
+            x0, y0 = x1, y1
+
+        # Guard degenerate polygons against division by zero
+        denominator = 3 * twice_area or 1e-10
+        return abs(0.5 * twice_area), centroid_x / denominator, centroid_y / denominator
+
+    next_vertices = np.concatenate([vertices[..., 1:, :], vertices[..., :1, :]], axis=-2)
+    x = vertices[..., 0]
+    y = vertices[..., 1]
+    x_next = next_vertices[..., 0]
+    y_next = next_vertices[..., 1]
+
+    cross = x * y_next - x_next * y
+    twice_area = cross.sum(axis=-1)
+
+    denominator = 3 * twice_area + (twice_area == 0) * 1e-10
+    centroid_x = ((x + x_next) * cross).sum(axis=-1) / denominator
+    centroid_y = ((y + y_next) * cross).sum(axis=-1) / denominator
+
+    return np.abs(0.5 * twice_area), centroid_x, centroid_y
+
+
+def polygon_bounds(vertices: np.ndarray):
+    """
+    Computes the axis-aligned bounding box of one or more polygons.
+
+    Args:
+        vertices (np.ndarray): Polygon vertices of shape (V, 2) or (N, V, 2).
+
+    Returns:
+        tuple: Bounds as (min_x, min_y, max_x, max_y), each a scalar or of shape (N,).
+    """
+    min_x, min_y = vertices.min(axis=-2).T
+    max_x, max_y = vertices.max(axis=-2).T
+
+    return min_x, min_y, max_x, max_y
+
+
+def triangulate_polygon(vertices: np.ndarray):
+    """
+    Triangulates a simple polygon by ear clipping. Raises a ValueError if no ear is left to clip,
+    which only happens for polygons that are not simple or not counter-clockwise.
+
+    Args:
+        vertices (np.ndarray): Vertices of a simple, counter-clockwise polygon of shape (V, 2), implicitly closed.
+
+    Returns:
+        list: Triangles as lists of three vertex indices in counter-clockwise order.
+    """
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    points = vertices.tolist()
+    remaining = list(range(len(points)))
+    triangles = []
+
+    while len(remaining) > 3:
+        for i in range(len(remaining)):
+            prev_index, index, next_index = remaining[i - 1], remaining[i], remaining[(i + 1) % len(remaining)]
+            a, b, c = points[prev_index], points[index], points[next_index]
+
+            # Collinear vertices enclose no area and can be dropped directly
+            turn = cross(a, b, c)
+            if turn == 0:
+                remaining.pop(i)
+                break
+            if turn < 0:
+                continue
+
+            # An ear must not contain any other remaining vertex
+            contains_vertex = any(
+                cross(a, b, p) >= 0 and cross(b, c, p) >= 0 and cross(c, a, p) >= 0
+                for p in (points[j] for j in remaining if j not in (prev_index, index, next_index))
+                if p not in (a, b, c)
+            )
+            if not contains_vertex:
+                triangles.append([prev_index, index, next_index])
+                remaining.pop(i)
+                break
+        else:
+            # Every simple, counter-clockwise polygon has an ear, and a fan of the rest would miscount the area
+            raise ValueError("Polygon cannot be triangulated, it is not simple or not counter-clockwise")
+
+    if len(remaining) == 3:
+        triangles.append(remaining)
+
+    return triangles
+
+
+def convex_decomposition(vertices: np.ndarray):
+    """
+    Decomposes a simple polygon into convex pieces by merging the triangles of an ear-clipping
+    triangulation across shared diagonals as long as the result stays convex (Hertel-Mehlhorn).
+
+    Args:
+        vertices (np.ndarray): Vertices of a simple, counter-clockwise polygon of shape (V, 2), implicitly closed.
+
+    Returns:
+        list: Convex pieces as lists of vertex indices in counter-clockwise order.
+    """
+    points = vertices.tolist()
+
+    def is_convex(piece):
+        for i in range(len(piece)):
+            (x0, y0), (x1, y1), (x2, y2) = points[piece[i - 2]], points[piece[i - 1]], points[piece[i]]
+            if (x1 - x0) * (y2 - y1) - (y1 - y0) * (x2 - x1) < 0:
+                return False
+        return True
+
+    def merge(first, second):
+        # Find an edge (a, b) of the first piece that appears as (b, a) in the second one
+        for i in range(len(first)):
+            a, b = first[i], first[(i + 1) % len(first)]
+            for j in range(len(second)):
+                if second[j] == b and second[(j + 1) % len(second)] == a:
+                    # Walk the second piece from a around to b, excluding both
+                    path = [second[(j + 2 + k) % len(second)] for k in range(len(second) - 2)]
+                    return first[:i + 1] + path + first[i + 1:]
+        return None
+
+    pieces = triangulate_polygon(vertices)
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(pieces)):
+            for j in range(i + 1, len(pieces)):
+                candidate = merge(pieces[i], pieces[j])
+                if candidate is not None and is_convex(candidate):
+                    pieces[i] = candidate
+                    pieces.pop(j)
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return pieces
+
+
+def pad_polygons(polygons: list):
+    """
+    Stacks polygons with different vertex counts into one array by repeating their last vertex.
+    Repeated vertices form zero-length edges and do not change area or clipping results.
+
+    Args:
+        polygons (list): Polygon vertex arrays of shape (V_i, 2).
+
+    Returns:
+        np.ndarray: Stacked vertices of shape (len(polygons), max(V_i), 2).
+    """
+    max_vertices = max(len(polygon) for polygon in polygons)
+
+    return np.stack([
+        np.concatenate([polygon, np.repeat(polygon[-1:], max_vertices - len(polygon), axis=0)])
+        for polygon in polygons
+    ])
+
+
+def convex_intersection_area(subject: np.ndarray, clip: np.ndarray):
+    """
+    Computes the intersection areas of pairs of convex polygons with a batched Sutherland-Hodgman clipper.
+
+    The subject polygons are clipped against every edge of the clip polygons in turn. Each clipping
+    step emits at most two points per subject edge (the start vertex if inside, the edge crossing if
+    any), which are compacted to a fixed number of slots. Unused slots repeat the last emitted point,
+    so all batch entries keep a common shape and no Python loop over the batch is needed.
+
+    Args:
+        subject (np.ndarray): Convex subject polygons of shape (..., S, 2), any orientation.
+        clip (np.ndarray): Convex, counter-clockwise clip polygons of shape (..., K, 2).
+            The batch dimensions of subject and clip must be broadcastable.
+
+    Returns:
+        np.ndarray: Intersection areas with the broadcast batch shape.
+    """
+    batch_shape = np.broadcast_shapes(subject.shape[:-2], clip.shape[:-2])
+    polygon = np.broadcast_to(subject, batch_shape + subject.shape[-2:])
+    clip = np.broadcast_to(clip, batch_shape + clip.shape[-2:])
+    n_slots = polygon.shape[-2]
+
+    clip_next = np.concatenate([clip[..., 1:, :], clip[..., :1, :]], axis=-2)
+
+    for k in range(clip.shape[-2]):
+        edge_start = clip[..., k, None, :]
+        edge = clip_next[..., k, None, :] - edge_start
+
+        # Signed distance (scaled) of the vertices to the clip edge, inside is non-negative
+        relative = polygon - edge_start
+        distance = edge[..., 0] * relative[..., 1] - edge[..., 1] * relative[..., 0]
+
+        polygon_next = np.concatenate([polygon[..., 1:, :], polygon[..., :1, :]], axis=-2)
+        distance_next = np.concatenate([distance[..., 1:], distance[..., :1]], axis=-1)
+
+        inside = distance >= 0
+        crossing = inside != (distance_next >= 0)
+
+        denominator = np.where(crossing, distance - distance_next, 1.0)
+        t = (distance / denominator)[..., None]
+        crossing_point = polygon + t * (polygon_next - polygon)
+
+        # Interleave start vertices and crossings: (..., 2 * slots, 2)
+        slots = np.stack([polygon, crossing_point], axis=-2).reshape(batch_shape + (2 * n_slots, 2))
+        valid = np.stack([inside, crossing], axis=-1).reshape(batch_shape + (2 * n_slots,))
+
+        # Compact valid points to the front and repeat the last valid point in unused slots
+        n_slots += 1
+        order = np.argsort(~valid, axis=-1, kind="stable")[..., :n_slots]
+        last_valid = np.maximum(valid.sum(axis=-1, keepdims=True) - 1, 0)
+        order = np.take_along_axis(order, np.minimum(np.arange(n_slots), last_valid), axis=-1)
+
+        polygon = np.take_along_axis(slots, order[..., None], axis=-2)
+
+    area, _, _ = polygon_area_centroid(polygon)
+
+    return area
+
+
+def convex_clip_area(subject: list, clip: list):
+    """
+    Computes the intersection area of a single pair of convex polygons with the Sutherland-Hodgman
+    clipper in plain Python, which is considerably faster than `convex_intersection_area` for the
+    handful of vertices of a template piece.
+
+    Args:
+        subject (list): Vertices (x, y) of a convex polygon, any orientation, implicitly closed.
+        clip (list): Vertices (x, y) of a convex, counter-clockwise polygon, implicitly closed.
+
+    Returns:
+        float: Intersection area.
+    """
+    polygon = subject
+    start_x, start_y = clip[-1]
+    for end_x, end_y in clip:
+        edge_x = end_x - start_x
+        edge_y = end_y - start_y
+
+        # Signed distance (scaled) of the vertices to the clip edge, inside is non-negative
+        clipped = []
+        x0, y0 = polygon[-1]
+        distance0 = edge_x * (y0 - start_y) - edge_y * (x0 - start_x)
+        for x1, y1 in polygon:
+            distance1 = edge_x * (y1 - start_y) - edge_y * (x1 - start_x)
+            if (distance0 >= 0) != (distance1 >= 0):
+                t = distance0 / (distance0 - distance1)
+                clipped.append((x0 + t * (x1 - x0), y0 + t * (y1 - y0)))
+            if distance1 >= 0:
+                clipped.append((x1, y1))
+            x0, y0, distance0 = x1, y1, distance1
+
+        if len(clipped) < 3:
+            return 0.0
+        polygon = clipped
+        start_x, start_y = end_x, end_y
+
+    twice_area = 0.0
+    x0, y0 = polygon[-1]
+    for x1, y1 in polygon:
+        twice_area += x0 * y1 - x1 * y0
+        x0, y0 = x1, y1
+
+    return abs(0.5 * twice_area)
+
+
+def box_intersection_areas(boxes_a: np.ndarray, boxes_b: np.ndarray):
+    """
+    Computes the pairwise intersection areas of two sets of axis-aligned boxes.
+
+    Args:
+        boxes_a (np.ndarray): Boxes of shape (N, 4) as [x0, y0, x1, y1].
+        boxes_b (np.ndarray): Boxes of shape (M, 4) as [x0, y0, x1, y1].
+
+    Returns:
+        np.ndarray: Intersection areas of shape (N, M).
+    """
+    boxes_a = boxes_a[:, None, :]
+    width = np.minimum(boxes_a[..., 2], boxes_b[:, 2]) - np.maximum(boxes_a[..., 0], boxes_b[:, 0])
+    height = np.minimum(boxes_a[..., 3], boxes_b[:, 3]) - np.maximum(boxes_a[..., 1], boxes_b[:, 1])
+
+    return np.clip(width, 0, None) * np.clip(height, 0, None)
+
+
+def non_max_suppression(
+    boxes: np.ndarray, 
+    priorities: np.ndarray, 
+    classes: np.ndarray, 
+    iou_threshold: float, 
+    containment_threshold: float = 1.0
+):
+    """
+    Class-aware greedy non-maximum suppression of axis-aligned boxes.
+
+    Boxes are visited by decreasing priority. A box suppresses the remaining boxes of its class
+    whose IoU with it exceeds `iou_threshold`, or whose intersection covers more than 
+    `containment_threshold` of the smaller of both boxes. The latter removes fragments
+    of an object, e.g. boxes cut off at tile seams, that overlap a complete box only little.
+
+    Args:
+        boxes (np.ndarray): Boxes of shape (N, 4) as [x0, y0, x1, y1].
+        priorities (np.ndarray): Priorities of shape (N,), usually the confidence scores.
+        classes (np.ndarray): Class ids of shape (N,).
+        iou_threshold (float): IoU above which boxes are suppressed.
+        containment_threshold (float): Intersection over the smaller area above which boxes are suppressed.
+
+    Returns:
+        np.ndarray: Indices of the kept boxes, by decreasing priority.
+    """
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    intersections = box_intersection_areas(boxes, boxes)
+    iou = intersections / np.maximum(areas[:, None] + areas - intersections, 1e-12)
+    containment = intersections / np.maximum(np.minimum(areas[:, None], areas), 1e-12)
+
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for index in np.argsort(-priorities, kind="stable"):
+        if suppressed[index]:
+            continue
+        keep.append(index)
+        suppressed |= (classes == classes[index]) & ((iou[index] > iou_threshold) | (containment[index] > containment_threshold))
+
+    return np.array(keep, dtype=int)